@@ -0,0 +1,190 @@
+"""Benchmarks the truck factor pipeline stage by stage on synthetic (or given) repositories.
+
+Usage:
+    python -m benchmarks.run_benchmarks --shape small -o results.json
+    python -m benchmarks.run_benchmarks --shape medium --compare baseline.json
+    python -m benchmarks.run_benchmarks --repo path/to/repo --repeat 5
+
+Each stage reports wall time, CPU time (including git subprocesses), peak RSS and rows per second.
+Results are written as JSON, with the environment they were measured in, so runs can be compared over time.
+The installed truck_factor_gdeluisi package is measured, run from a checkout with PYTHONPATH=src to measure the sources
+"""
+from argparse import ArgumentParser
+from dataclasses import dataclass,asdict,fields
+from datetime import datetime,timezone
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any,Callable,Optional
+import platform
+import subprocess
+import json
+import os
+import sys
+import time
+try:
+    import resource
+except ImportError:
+    # not available on Windows, CPU time falls back to os.times and peak memory is not reported
+    resource=None
+from .synthetic import SHAPES,RepoShape,generate_repository
+
+@dataclass
+class StageResult:
+    stage:str
+    wall_seconds:float
+    cpu_seconds:float
+    peak_rss_mb:Optional[float]
+    rows:int
+    rows_per_second:Optional[float]
+
+def _cpu_time()->float:
+    if resource is None:
+        t=os.times()
+        return t.user+t.system+t.children_user+t.children_system
+    own=resource.getrusage(resource.RUSAGE_SELF)
+    children=resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime+own.ru_stime+children.ru_utime+children.ru_stime
+
+def _reset_peak_rss()->bool:
+    # writing 5 to clear_refs resets VmHWM on Linux, elsewhere only the peak of the whole run is available
+    try:
+        with open("/proc/self/clear_refs","w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_mb(resettable:bool)->Optional[float]:
+    if resettable:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])/1024
+    if resource is None:
+        return None
+    maxrss=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return maxrss/(1024*1024) if sys.platform=="darwin" else maxrss/1024
+
+def _rows(result:Any)->int:
+    if isinstance(result,int):
+        return 1
+    if isinstance(result,str):
+        return result.count("\n")
+    try:
+        return len(result)
+    except TypeError:
+        return 0
+
+def measure(stage:str,func:Callable[[],Any],repeat:int=1)->tuple[StageResult,Any]:
+    """Runs func repeat times and keeps the fastest run
+
+    Args:
+        stage (str): stage name
+        func (Callable[[],Any]): stage to benchmark
+        repeat (int, optional): number of runs. Defaults to 1.
+
+    Returns:
+        tuple[StageResult,Any]: measures of the fastest run and the result of the last run
+    """
+    best=None
+    for _ in range(max(1,repeat)):
+        resettable=_reset_peak_rss()
+        cpu=_cpu_time()
+        start=time.perf_counter()
+        result=func()
+        wall=time.perf_counter()-start
+        cpu=_cpu_time()-cpu
+        rows=_rows(result)
+        measures=StageResult(stage,wall,cpu,_peak_rss_mb(resettable),rows,rows/wall if wall>0 else None)
+        if best is None or measures.wall_seconds<best.wall_seconds:
+            best=measures
+    return best,result
+
+def run_pipeline(repo:str,repeat:int=1)->list[StageResult]:
+    """Benchmarks every stage of the truck factor computation, each stage is fed with the output of the previous one.
+    Stages are the ones create_contribution_dataframe runs, followed by the end to end call and the DOA and truck factor computations
+
+    Args:
+        repo (str): repository path
+        repeat (int, optional): runs per stage. Defaults to 1.
+
+    Returns:
+        list[StageResult]: measures of every stage
+    """
+    from truck_factor_gdeluisi.helper import iter_log_blocks,get_tracked_files,parse_blocks_columnar
+    from truck_factor_gdeluisi.main import columns_to_dataframe,create_contribution_dataframe,compute_DOA,compute_truck_factor_from_contributions
+    results=[]
+    stage,blocks=measure("iter_log_blocks",lambda:list(iter_log_blocks(repo)),repeat)
+    results.append(stage)
+    stage,_=measure("get_tracked_files",lambda:get_tracked_files(repo),repeat)
+    results.append(stage)
+    stage,columns=measure("parse_blocks_columnar",lambda:parse_blocks_columnar(blocks),repeat)
+    results.append(stage)
+    stage,_=measure("columns_to_dataframe",lambda:columns_to_dataframe(columns),repeat)
+    results.append(stage)
+    stage,df=measure("create_contribution_dataframe",lambda:create_contribution_dataframe(repo),repeat)
+    results.append(stage)
+    stage,doa=measure("compute_DOA",lambda:compute_DOA(df),repeat)
+    results.append(stage)
+    stage,_=measure("compute_truck_factor_from_contributions",lambda:compute_truck_factor_from_contributions(doa),repeat)
+    results.append(stage)
+    return results
+
+def _git_version()->str:
+    try:
+        return subprocess.check_output(["git","--version"],text=True).strip()
+    except (OSError,subprocess.CalledProcessError):
+        return "not available"
+
+def environment()->dict:
+    from truck_factor_gdeluisi import __version__
+    return dict(version=__version__,python=platform.python_version(),platform=platform.platform(),git=_git_version(),
+                timestamp=datetime.now(timezone.utc).isoformat(timespec="seconds"))
+
+def compare(current:list[dict],baseline:list[dict])->list[str]:
+    """Formats the wall time and peak RSS change of every stage against a previous run"""
+    previous={r["stage"]:r for r in baseline}
+    lines=[]
+    for r in current:
+        old=previous.get(r["stage"])
+        if old is None:
+            lines.append(f"{r['stage']:<42} new")
+            continue
+        wall=r["wall_seconds"]/old["wall_seconds"] if old["wall_seconds"] else float("nan")
+        rss=""
+        if r["peak_rss_mb"] is not None and old["peak_rss_mb"]:
+            rss=f" rss x{r['peak_rss_mb']/old['peak_rss_mb']:.2f}"
+        lines.append(f"{r['stage']:<42} wall x{wall:.2f} ({old['wall_seconds']:.3f}s -> {r['wall_seconds']:.3f}s){rss}")
+    return lines
+
+def main(argv:Optional[list[str]]=None)->int:
+    parser=ArgumentParser(prog="run_benchmarks",description="Benchmark the truck factor pipeline")
+    parser.add_argument("--repo",help="benchmark an existing repository instead of a synthetic one")
+    parser.add_argument("--shape",choices=sorted(SHAPES),default="small",help="synthetic repository preset")
+    for f in fields(RepoShape):
+        parser.add_argument(f"--{f.name.replace('_','-')}",type=int,default=None,help=f"override the {f.name} of the shape")
+    parser.add_argument("--repeat",type=int,default=1,help="runs per stage, the fastest is kept")
+    parser.add_argument("-o","--output",help="write results as JSON to this file")
+    parser.add_argument("--compare",help="JSON results of a previous run to compare with")
+    args=parser.parse_args(argv)
+    shape=RepoShape(**{**SHAPES[args.shape].as_dict(),**{f.name:getattr(args,f.name) for f in fields(RepoShape) if getattr(args,f.name) is not None}})
+    with TemporaryDirectory() as tmp:
+        repo=args.repo
+        if repo is None:
+            repo=generate_repository(Path(tmp).joinpath("repo").as_posix(),shape)
+        stages=[asdict(s) for s in run_pipeline(repo,args.repeat)]
+    report=dict(environment=environment(),repo=args.repo,shape=None if args.repo else shape.as_dict(),repeat=args.repeat,stages=stages)
+    for s in stages:
+        rss=f"{s['peak_rss_mb']:.1f}MB" if s["peak_rss_mb"] is not None else "n/a"
+        print(f"{s['stage']:<42} {s['wall_seconds']:>9.3f}s wall {s['cpu_seconds']:>9.3f}s cpu {rss:>10} {s['rows']:>9} rows")
+    if args.compare:
+        with open(args.compare,encoding="utf-8") as f:
+            print("\n".join(compare(stages,json.load(f)["stages"])))
+    if args.output:
+        with open(args.output,"w",encoding="utf-8") as f:
+            json.dump(report,f,indent=2)
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Synthetic git repository generator for benchmarks.
+Repositories are written through git fast-import, so even large shapes are generated in seconds and no network access is needed
+"""
+from dataclasses import dataclass,asdict
+from pathlib import Path
+import random
+import subprocess
+
+@dataclass
+class RepoShape:
+    """Size of a synthetic repository. Merges bring in one extra commit from a side branch each"""
+    commits:int=200
+    authors:int=10
+    files:int=100
+    renames:int=10
+    binary_files:int=5
+    merges:int=5
+    files_per_commit:int=3
+    max_lines:int=200
+    seed:int=0
+
+    def as_dict(self)->dict:
+        return asdict(self)
+
+SHAPES={
+    "tiny":RepoShape(commits=40,authors=4,files=20,renames=3,binary_files=2,merges=2),
+    "small":RepoShape(),
+    "medium":RepoShape(commits=5000,authors=60,files=2000,renames=200,binary_files=50,merges=100),
+    "large":RepoShape(commits=50000,authors=400,files=20000,renames=2000,binary_files=500,merges=1000,files_per_commit=4),
+}
+
+_EXTENSIONS=[".py",".c",".js",".java",".go",".md",".json"]
+
+class _Writer:
+    def __init__(self,stream):
+        self.stream=stream
+        self.mark=0
+
+    def data(self,content:bytes):
+        self.stream.write(b"data %d\n" % len(content))
+        self.stream.write(content)
+        self.stream.write(b"\n")
+
+    def commit(self,ref:str,author:str,timestamp:int,changes:list[bytes],parent:int=None,merge:int=None)->int:
+        self.mark+=1
+        email=author.lower().replace(" ",".")+"@example.com"
+        self.stream.write(f"commit {ref}\nmark :{self.mark}\n".encode())
+        self.stream.write(f"author {author} <{email}> {timestamp} +0000\n".encode())
+        self.stream.write(f"committer {author} <{email}> {timestamp} +0000\n".encode())
+        self.data(f"commit {self.mark}".encode())
+        if parent is not None:
+            self.stream.write(f"from :{parent}\n".encode())
+        if merge is not None:
+            self.stream.write(f"merge :{merge}\n".encode())
+        for change in changes:
+            self.stream.write(change)
+        self.stream.write(b"\n")
+        return self.mark
+
+def _modify(path:str,content:bytes)->bytes:
+    return f"M 100644 inline {path}\n".encode()+b"data %d\n" % len(content)+content+b"\n"
+
+def generate_repository(path:str,shape:RepoShape=RepoShape())->str:
+    """Creates a git repository with the given shape under path (which must not exist or be empty)
+
+    Args:
+        path (str): repository directory
+        shape (RepoShape, optional): size of the repository. Defaults to RepoShape().
+
+    Returns:
+        str: the repository path
+    """
+    rng=random.Random(shape.seed)
+    repo=Path(path)
+    repo.mkdir(parents=True,exist_ok=True)
+    subprocess.check_call(["git","init","-q","-b","main",repo.as_posix()])
+    authors=[f"Author {i}" for i in range(shape.authors)]
+    # a few authors write most of the code, as in real projects
+    weights=[1/(i+1) for i in range(shape.authors)]
+    names=[f"dir{i%max(1,shape.files//50)}/file{i}{_EXTENSIONS[i%len(_EXTENSIONS)]}" for i in range(shape.files)]
+    binaries=set(rng.sample(range(shape.files),min(shape.binary_files,shape.files)))
+    contents:dict[int,list[bytes]]=dict()
+    rename_at=set(rng.sample(range(1,shape.commits),min(shape.renames,shape.commits-1))) if shape.commits>1 else set()
+    merge_at=set(rng.sample(range(1,shape.commits),min(shape.merges,shape.commits-1))) if shape.commits>1 else set()
+    timestamp=1_500_000_000
+    with subprocess.Popen(["git","-C",repo.as_posix(),"fast-import","--quiet"],stdin=subprocess.PIPE) as proc:
+        writer=_Writer(proc.stdin)
+        head=None
+        def edit(i:int,author:str)->bytes:
+            if i in binaries:
+                content=bytes(rng.getrandbits(8) for _ in range(64))+b"\x00"
+                return _modify(names[i],content)
+            lines=[l for l in contents.get(i,[]) if rng.random()>0.1]
+            for _ in range(rng.randint(1,20)):
+                if len(lines)<shape.max_lines:
+                    lines.insert(rng.randint(0,len(lines)),f"{author} {rng.random()}".encode())
+            contents[i]=lines
+            return _modify(names[i],b"\n".join(lines)+b"\n")
+        for c in range(shape.commits):
+            timestamp+=rng.randint(600,86400)
+            author=rng.choices(authors,weights)[0]
+            changed=rng.sample(range(shape.files),min(rng.randint(1,shape.files_per_commit),shape.files))
+            changes=[edit(i,author) for i in changed]
+            if c in rename_at:
+                i=rng.choice([i for i in contents if i not in changed] or [changed[0]])
+                if i not in changed:
+                    old=names[i]
+                    names[i]=f"moved{c}/{old.rsplit('/',1)[-1]}"
+                    changes.append(f"R {old} {names[i]}\n".encode())
+            merge=None
+            if c in merge_at and head is not None:
+                side_author=rng.choice(authors)
+                side_file=rng.choice([i for i in range(shape.files) if i not in changed])
+                side_change=edit(side_file,side_author)
+                merge=writer.commit("refs/heads/side",side_author,timestamp-300,[side_change],parent=head)
+                changes.append(side_change)
+            head=writer.commit("refs/heads/main",author,timestamp,changes,parent=head,merge=merge)
+        proc.stdin.close()
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode,"git fast-import")
+    subprocess.check_call(["git","-C",repo.as_posix(),"checkout","-q","-f","main"])
+    return repo.as_posix()
@@ -1,5 +1,11 @@
-from importlib.metadata import version
-try:
-    __version__=version(__package__) 
-except Exception:
-    __version__="not available"
\ No newline at end of file
+def __getattr__(name:str):
+    # resolved on first access, importlib.metadata alone would double the import time of the command line tool
+    if name=="__version__":
+        from importlib.metadata import version
+        try:
+            value=version(__package__)
+        except Exception:
+            value="not available"
+        globals()["__version__"]=value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
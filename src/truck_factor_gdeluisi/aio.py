@@ -0,0 +1,166 @@
+"""Asyncio variants of the entry points, for services running many analyses on one event loop.
+git runs in asyncio subprocesses whose output is parsed as it streams, the number of git processes running at once on a loop is capped by the
+max_git_processes of the execution context. Cancelling a call (or reaching its timeout) kills its git processes
+"""
+from contextlib import aclosing
+from pathlib import Path
+from typing import AsyncIterator,Iterable,Optional
+import asyncio
+import subprocess
+import signal
+import os
+import pandas as pd
+from .helper import (FULL_HISTORY,ContributionColumns,HistoryWindow,_LogBlocks,_log_blocks_command,_log_pathspecs,_tracked_files_command,
+                     build_pathspecs,is_git_available)
+from .main import _contributions_from_columns,compute_DOA,compute_truck_factor_from_contributions
+from .execution import ExecutionContext,current_context,use_context
+
+# longest line read from git, paths longer than the default 64KiB limit of asyncio streams are legal
+_LINE_LIMIT=1<<24
+
+async def _kill(proc:asyncio.subprocess.Process):
+    if proc.returncode is None:
+        # the shell may have forked git, the whole process group is killed so nothing keeps writing to the pipe
+        try:
+            if os.name=="posix":
+                os.killpg(proc.pid,signal.SIGKILL)
+            else:
+                proc.kill()
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+
+async def _astream_command(cmd:str,input:Optional[str]=None)->AsyncIterator[str]:
+    """Streams the output of a shell command line by line, holding an asyncio git slot of the current execution context (look at ExecutionContext.async_git_slot)
+
+    Args:
+        cmd (str): command line
+        input (Optional[str], optional): standard input of the command. Defaults to None.
+
+    Raises:
+        subprocess.CalledProcessError: If the command exits with a non zero status
+
+    Yields:
+        Iterator[str]: decoded output lines, without the trailing newline
+    """
+    async with current_context().async_git_slot():
+        stdin=subprocess.PIPE if input is not None else None
+        proc=await asyncio.create_subprocess_shell(cmd,stdin=stdin,stdout=subprocess.PIPE,stderr=subprocess.DEVNULL,limit=_LINE_LIMIT,
+                                                   start_new_session=os.name=="posix")
+        try:
+            if input is not None:
+                proc.stdin.write(input.encode())
+                await proc.stdin.drain()
+                proc.stdin.close()
+            async for line in proc.stdout:
+                yield line.decode().rstrip("\n")
+            returncode=await proc.wait()
+        finally:
+            # cancelled or abandoned before git exited
+            await _kill(proc)
+    if returncode:
+        raise subprocess.CalledProcessError(returncode,cmd)
+
+async def _acheck_output(cmd:str)->str:
+    async with aclosing(_astream_command(cmd)) as lines:
+        return "\n".join([line async for line in lines])
+
+async def _aresolve_commit(repo:str,rev:str="HEAD")->Optional[str]:
+    """rev's commit sha, None when repo is not a git repository or rev does not name a commit"""
+    try:
+        return (await _acheck_output(f"git -C \"{Path(repo).resolve().as_posix()}\" rev-parse --verify --quiet \"{rev}^{{commit}}\"")).strip()
+    except subprocess.CalledProcessError:
+        return None
+
+async def _read_columns(repo:str,head:str,pathspecs:list[str],window:HistoryWindow)->ContributionColumns:
+    cmd,stdin=_log_blocks_command(repo,head,pathspecs=pathspecs,window=window)
+    columns=ContributionColumns()
+    blocks=_LogBlocks()
+    async with aclosing(_astream_command(cmd,stdin)) as lines:
+        async for line in lines:
+            block=blocks.feed(line)
+            if block is not None:
+                columns.append_block(block)
+    block=blocks.close()
+    if block is not None:
+        columns.append_block(block)
+    return columns
+
+async def _acreate_contribution_dataframe(repo:str,head:str,only_of_files:bool,include:Optional[Iterable[str]],exclude:Optional[Iterable[str]],window:HistoryWindow)->pd.DataFrame:
+    selection=build_pathspecs(include,exclude)
+    current_files=set((await _acheck_output(_tracked_files_command(repo,head,selection))).splitlines())
+    columns=await _read_columns(repo,head,_log_pathspecs(current_files,selection,only_of_files),window)
+    # building the dataframe is CPU bound, it runs in a thread so the loop keeps serving other analyses
+    return await asyncio.to_thread(_contributions_from_columns,columns,current_files,only_of_files)
+
+async def _with_timeout(coro,timeout:Optional[float]):
+    return await asyncio.wait_for(coro,timeout) if timeout is not None else await coro
+
+async def acreate_contribution_dataframe(repo:str,only_of_files:bool=True,include:Optional[Iterable[str]]=None,exclude:Optional[Iterable[str]]=None,timeout:Optional[float]=None,context:Optional[ExecutionContext]=None,window:Optional[HistoryWindow]=None)->pd.DataFrame:
+    """Asyncio variant of create_contribution_dataframe, reading the repository through the git CLI
+
+    Args:
+        repo (str): The path to the repository
+        only_of_files (bool, optional): Keep only files written in a known programming language. Defaults to True.
+        include (Optional[Iterable[str]], optional): globs of the files to analyze (look at create_contribution_dataframe). Defaults to every file.
+        exclude (Optional[Iterable[str]], optional): globs of the files to leave out. Defaults to None.
+        timeout (Optional[float], optional): Seconds after which the call is cancelled. Defaults to None.
+        context (Optional[ExecutionContext], optional): Limits of git subprocesses, look at ExecutionContext.async_git_slot. Defaults to the current execution context.
+        window (Optional[HistoryWindow], optional): Revision to analyze, branches, dates and number of commits to read (look at HistoryWindow). Defaults to the whole history of every ref.
+
+    Raises:
+        ValueError: If submitted repo does not point to a git repository or the window's ref does not name a commit
+        Exception: If git CLI is not on PATH
+        asyncio.TimeoutError: If the timeout expires
+
+    Returns:
+        pd.DataFrame: contributions dataframe
+    """
+    async def run()->pd.DataFrame:
+        head=await _aresolve_commit(repo)
+        if head is None:
+            raise ValueError(f"Path {repo} is not a git directory")
+        if window.ref is not None:
+            head=await _aresolve_commit(repo,window.ref)
+            if head is None:
+                raise ValueError(f"Revision {window.ref} not found in {repo}")
+        return await _acreate_contribution_dataframe(repo,head,only_of_files,include,exclude,window)
+    # checked before any subprocess starts, a missing git would otherwise look like a path which is not a repository
+    if not is_git_available():
+        raise Exception("No git CLI found on PATH")
+    window=window if window is not None else FULL_HISTORY
+    with use_context(context):
+        return await _with_timeout(run(),timeout)
+
+async def acompute_truck_factor(repo:str,orphan_files_threashold:float=0.5,authorship_threshold:float=0.7,include:Optional[Iterable[str]]=None,exclude:Optional[Iterable[str]]=None,timeout:Optional[float]=None,context:Optional[ExecutionContext]=None,window:Optional[HistoryWindow]=None)->int:
+    """Asyncio variant of compute_truck_factor, reading the repository through the git CLI
+
+    Args:
+        repo (str): The path to the repository
+        orphan_files_threashold (float, optional): Look at compute_truck_factor. Defaults to 0.5.
+        authorship_threshold (float, optional): Look at compute_truck_factor. Defaults to 0.7.
+        include (Optional[Iterable[str]], optional): globs of the files to analyze (look at create_contribution_dataframe). Defaults to every file.
+        exclude (Optional[Iterable[str]], optional): globs of the files to leave out. Defaults to None.
+        timeout (Optional[float], optional): Seconds after which the call is cancelled. Defaults to None.
+        context (Optional[ExecutionContext], optional): Limits of git subprocesses, look at ExecutionContext.async_git_slot. Defaults to the current execution context.
+        window (Optional[HistoryWindow], optional): Revision to analyze, branches, dates and number of commits to read (look at HistoryWindow). Defaults to the whole history of every ref.
+
+    Raises:
+        ValueError: Whether the thresholds are not in the range limit, the path is not a repository or the repository is not suited for truck factor calculation
+        Exception: If git CLI is not on PATH
+        asyncio.TimeoutError: If the timeout expires
+
+    Returns:
+        int: The integer representing the truck factor for the repository
+    """
+    if not( (orphan_files_threashold >0 and orphan_files_threashold <=1 ) and (authorship_threshold >0 and authorship_threshold <=1 )):
+        raise ValueError("All threshold values must have a value between 0 and 1")
+    if not is_git_available():
+        raise Exception("No git CLI found on PATH")
+    async def run()->int:
+        df=await acreate_contribution_dataframe(repo,include=include,exclude=exclude,window=window)
+        if df.empty:
+            raise ValueError("Repository not suited for truck factor calculation, no source code found")
+        return await asyncio.to_thread(lambda:compute_truck_factor_from_contributions(compute_DOA(df),orphan_files_threashold,authorship_threshold))
+    with use_context(context):
+        return await _with_timeout(run(),timeout)
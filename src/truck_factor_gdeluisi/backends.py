@@ -0,0 +1,156 @@
+from pathlib import Path
+from datetime import datetime,timedelta,timezone
+from typing import Iterator,NamedTuple,Optional,Protocol,runtime_checkable
+from . import helper
+from .helper import ContributionColumns
+
+class CommitStats(NamedTuple):
+    """Diffstat of a single commit, as printed by git log --numstat"""
+    author:str
+    date:str
+    stats:list[tuple[int,int,str]]
+    renames:list[tuple[str,str]]
+
+@runtime_checkable
+class GitBackend(Protocol):
+    """Reads the repository data needed by the truck factor computation.
+    Revisions default to HEAD, history is walked from the revision and all refs
+    """
+    def is_repo(self,path:str)->bool:
+        ...
+
+    def get_head_commit(self,path:str)->str:
+        ...
+
+    def count_commits(self,path:str,commit_sha:Optional[str]=None)->int:
+        ...
+
+    def get_tracked_files(self,path:str,commit_sha:Optional[str]=None)->set[str]:
+        ...
+
+    def iter_commits(self,path:str,commit_sha:Optional[str]=None)->Iterator[CommitStats]:
+        ...
+
+    def get_renames(self,path:str,commit_sha:Optional[str]=None)->dict[str,str]:
+        ...
+
+    def read_contributions(self,path:str,commit_sha:Optional[str]=None)->ContributionColumns:
+        ...
+
+class CLIBackend:
+    """Backend running the git CLI, one subprocess per call"""
+    def is_repo(self,path:str)->bool:
+        return helper.is_dir_a_repo(path)
+
+    def get_head_commit(self,path:str)->str:
+        return helper.get_head_commit(path)
+
+    def count_commits(self,path:str,commit_sha:Optional[str]=None)->int:
+        return helper.count_commits(path,commit_sha)
+
+    def get_tracked_files(self,path:str,commit_sha:Optional[str]=None)->set[str]:
+        return helper.get_tracked_files(path,commit_sha)
+
+    def iter_commits(self,path:str,commit_sha:Optional[str]=None)->Iterator[CommitStats]:
+        for block in helper.iter_log_blocks(path,commit_sha):
+            commit=helper.parse_commit_block(block)
+            if commit is not None:
+                yield CommitStats(*commit)
+
+    def get_renames(self,path:str,commit_sha:Optional[str]=None)->dict[str,str]:
+        return self.read_contributions(path,commit_sha).renames
+
+    def read_contributions(self,path:str,commit_sha:Optional[str]=None)->ContributionColumns:
+        return helper.parse_blocks_columnar(helper.iter_log_blocks(path,commit_sha))
+
+class PyGit2Backend:
+    """In-process backend reading objects and packfiles through libgit2 (requires pygit2), no process is spawned.
+    Merge commits have no diffstat and renames are detected with git's default similarity, as git log --numstat -M does
+    """
+    def __init__(self,rename_limit:int=1000):
+        try:
+            import pygit2
+        except ImportError as e:
+            raise ImportError("PyGit2Backend requires pygit2, install it with 'pip install pygit2'") from e
+        self.pygit2=pygit2
+        self.rename_limit=rename_limit
+
+    def _open(self,path:str):
+        return self.pygit2.Repository(Path(path).resolve().as_posix())
+
+    def _resolve(self,repo,commit_sha:Optional[str]):
+        return repo.revparse_single(commit_sha if commit_sha else "HEAD").peel(self.pygit2.Commit)
+
+    def _walk(self,repo,commit_sha:Optional[str]):
+        # same commits as "git log <commit_sha> --all"
+        walker=repo.walk(self._resolve(repo,commit_sha).id,self.pygit2.enums.SortMode.TIME)
+        for ref in repo.references.objects:
+            try:
+                walker.push(ref.peel(self.pygit2.Commit).id)
+            except (self.pygit2.InvalidSpecError,ValueError,KeyError,self.pygit2.GitError):
+                continue
+        return walker
+
+    def is_repo(self,path:str)->bool:
+        try:
+            self._resolve(self._open(path),None)
+            return True
+        except (self.pygit2.GitError,KeyError):
+            return False
+
+    def get_head_commit(self,path:str)->str:
+        return str(self._resolve(self._open(path),None).id)
+
+    def count_commits(self,path:str,commit_sha:Optional[str]=None)->int:
+        return sum(1 for _ in self._walk(self._open(path),commit_sha))
+
+    def get_tracked_files(self,path:str,commit_sha:Optional[str]=None)->set[str]:
+        repo=self._open(path)
+        files=set()
+        trees=[("",self._resolve(repo,commit_sha).tree)]
+        while trees:
+            prefix,tree=trees.pop()
+            for entry in tree:
+                if entry.type_str=="tree":
+                    trees.append((f"{prefix}{entry.name}/",repo[entry.id]))
+                else:
+                    files.add(prefix+entry.name)
+        return files
+
+    def iter_commits(self,path:str,commit_sha:Optional[str]=None)->Iterator[CommitStats]:
+        pygit2=self.pygit2
+        repo=self._open(path)
+        for commit in self._walk(repo,commit_sha):
+            author=commit.author
+            date=datetime.fromtimestamp(author.time,timezone(timedelta(minutes=author.offset))).strftime("%Y-%m-%d")
+            if len(commit.parents)>1:
+                yield CommitStats(author.name,date,[],[])
+                continue
+            if commit.parents:
+                diff=repo.diff(commit.parents[0].tree,commit.tree)
+            else:
+                diff=commit.tree.diff_to_tree(swap=True)
+            diff.find_similar(flags=pygit2.enums.DiffFind.FIND_RENAMES,rename_limit=self.rename_limit)
+            stats=[]
+            renames=[]
+            for patch in diff:
+                delta=patch.delta
+                if delta.is_binary:
+                    inserted=deleted=0
+                else:
+                    _,inserted,deleted=patch.line_stats
+                if delta.status==pygit2.enums.DeltaStatus.RENAMED:
+                    renames.append((delta.old_file.path,delta.new_file.path))
+                stats.append((inserted,deleted,delta.new_file.path))
+            yield CommitStats(author.name,date,stats,renames)
+
+    def get_renames(self,path:str,commit_sha:Optional[str]=None)->dict[str,str]:
+        return self.read_contributions(path,commit_sha).renames
+
+    def read_contributions(self,path:str,commit_sha:Optional[str]=None)->ContributionColumns:
+        columns=ContributionColumns()
+        for commit in self.iter_commits(path,commit_sha):
+            columns.append_commit(commit.author,commit.date,commit.stats,commit.renames)
+        return columns
+
+DEFAULT_BACKEND=CLIBackend()
@@ -0,0 +1,176 @@
+from pathlib import Path
+from concurrent.futures import as_completed
+from dataclasses import replace
+from typing import Iterable,Iterator,Optional,TextIO
+from argparse import ArgumentParser
+import json
+import sys
+import time
+from contextlib import nullcontext
+from . import tracing
+from .execution import ExecutionContext,current_context
+from .cli import positive_int
+
+RESULT_FIELDS=["repo","truck_factor","authors","n_files","seconds","error"]
+
+def find_repositories(root:str)->list[str]:
+    """Lists the git repositories directly contained in a directory, both bare (e.g. mirrors) and with a working tree
+
+    Args:
+        root (str): directory containing the repositories
+
+    Returns:
+        list[str]: sorted repository paths
+    """
+    repos=[]
+    for child in Path(root).resolve().iterdir():
+        if not child.is_dir():
+            continue
+        if child.joinpath(".git").exists() or (child.joinpath("HEAD").is_file() and child.joinpath("objects").is_dir()):
+            repos.append(child.as_posix())
+    return sorted(repos)
+
+def _worker_context(context:ExecutionContext,workers:int)->ExecutionContext:
+    # repositories are already spread across workers, nested pools would only oversubscribe the machine
+    if context.mode=="thread":
+        return context.single_worker()
+    # processes cannot share the git slots, each one gets its share
+    return replace(context,workers=1,max_git_processes=max(1,context.max_git_processes//workers))
+
+def _analyze(repo:str,orphan_files_threashold:float,authorship_threshold:float,profile:bool=False,context:Optional[ExecutionContext]=None)->dict:
+    from .main import create_contribution_dataframe,compute_DOA,compute_truck_factor_details
+    start=time.perf_counter()
+    record=dict(repo=repo,truck_factor=None,authors=None,n_files=None,seconds=None,error=None)
+    tracer=tracing.Tracer() if profile else None
+    try:
+        with tracing.profile(tracer) if profile else nullcontext():
+            df=create_contribution_dataframe(repo,context=context)
+            if df.empty:
+                raise ValueError("Repository not suited for truck factor calculation, no source code found")
+            result=compute_truck_factor_details(compute_DOA(df),orphan_files_threashold,authorship_threshold)
+        record.update(truck_factor=result.truck_factor,authors=[str(a) for a in result.removed_authors],n_files=result.n_files)
+    except Exception as e:
+        record["error"]=f"{type(e).__name__}: {e}"
+    record["seconds"]=time.perf_counter()-start
+    if profile:
+        record["profile"]=tracer.report()["stages"]
+    return record
+
+def compute_truck_factor_batch(repos:Iterable[str],workers:Optional[int]=None,orphan_files_threashold:float=0.5,authorship_threshold:float=0.7,profile:bool=False,context:Optional[ExecutionContext]=None)->Iterator[dict]:
+    """Computes the truck factor of many repositories on a shared, bounded pool of workers.
+    Each repository is analyzed by a single worker, results are yielded as soon as repositories are done
+
+    Args:
+        repos (Iterable[str]): repository paths
+        workers (Optional[int], optional): Number of workers. Defaults to the workers of the execution context.
+        orphan_files_threashold (float, optional): Look at compute_truck_factor. Defaults to 0.5.
+        authorship_threshold (float, optional): Look at compute_truck_factor. Defaults to 0.7.
+        profile (bool, optional): Add to each record a profile key with the per stage measures (look at Tracer.report). Defaults to False.
+        context (Optional[ExecutionContext], optional): Mode of the workers and git subprocesses limit, shared by all repositories. Defaults to the current execution context.
+
+    Raises:
+        ValueError: Whether the thresholds are not in the range limit
+
+    Yields:
+        Iterator[dict]: one record per repository with the RESULT_FIELDS keys. Failed repositories have a non null error and no truck factor
+    """
+    if not( (orphan_files_threashold >0 and orphan_files_threashold <=1 ) and (authorship_threshold >0 and authorship_threshold <=1 )):
+        raise ValueError("All threshold values must have a value between 0 and 1")
+    repos=list(repos)
+    if not repos:
+        return
+    context=context if context is not None else current_context()
+    workers=min(workers if workers else context.workers,len(repos))
+    worker_context=_worker_context(context,workers)
+    with context.executor(workers) as executor:
+        futures={executor.submit(_analyze,repo,orphan_files_threashold,authorship_threshold,profile,worker_context):repo for repo in repos}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                # the worker itself died (e.g. killed by the OOM killer)
+                yield dict(repo=futures[future],truck_factor=None,authors=None,n_files=None,seconds=None,error=f"{type(e).__name__}: {e}")
+
+class _JSONLinesSink:
+    def __init__(self,path:Optional[str]=None):
+        self.out:TextIO=open(path,"w",encoding="utf-8") if path else sys.stdout
+
+    def write(self,record:dict):
+        print(json.dumps(record),file=self.out,flush=True)
+
+    def close(self):
+        if self.out is not sys.stdout:
+            self.out.close()
+
+class _ParquetSink:
+    """Writes records as parquet row groups of batch_size rows, so results are persisted while the batch runs"""
+    def __init__(self,path:str,batch_size:int=64,profile:bool=False):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet output requires pyarrow, install it with 'pip install pyarrow'") from e
+        self.pa=pa
+        self.schema=pa.schema([("repo",pa.string()),("truck_factor",pa.int64()),("authors",pa.list_(pa.string())),
+                               ("n_files",pa.int64()),("seconds",pa.float64()),("error",pa.string())])
+        if profile:
+            # stage measures are nested records, they are stored as JSON text
+            self.schema=self.schema.append(pa.field("profile",pa.string()))
+        self.writer=pq.ParquetWriter(path,self.schema)
+        self.batch_size=batch_size
+        self.records=[]
+
+    def write(self,record:dict):
+        if "profile" in record:
+            record=dict(record,profile=json.dumps(record["profile"]))
+        self.records.append(record)
+        if len(self.records)>=self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self.records:
+            self.writer.write_table(self.pa.Table.from_pylist(self.records,schema=self.schema))
+            self.records=[]
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+def main(argv:Optional[list[str]]=None)->int:
+    parser=ArgumentParser(prog="truck-factor-gdeluisi-batch",description="Compute the truck factor of many git repositories")
+    parser.add_argument("repos",nargs="*",help="paths to git repositories")
+    parser.add_argument("--mirrors",help="directory whose git repositories (bare or not) are all analyzed")
+    parser.add_argument("-w","--workers",type=positive_int,default=None,help="number of workers, defaults to the usable CPUs")
+    parser.add_argument("--mode",choices=["process","thread"],default="process",help="run workers as processes or threads")
+    parser.add_argument("--max-git-processes",type=positive_int,default=None,help="maximum number of git subprocesses running at once")
+    parser.add_argument("--orphan-files-threshold",type=float,default=0.5)
+    parser.add_argument("--authorship-threshold",type=float,default=0.7)
+    parser.add_argument("--format",choices=["jsonl","parquet"],default="jsonl")
+    parser.add_argument("-o","--output",help="output file, standard output for jsonl when missing")
+    parser.add_argument("--profile",action="store_true",help="add the time, memory and rows of every stage to each record")
+    args=parser.parse_args(argv)
+    repos=list(args.repos)
+    if args.mirrors:
+        repos.extend(find_repositories(args.mirrors))
+    if not repos:
+        parser.error("no repository to analyze")
+    if args.format=="parquet":
+        if not args.output:
+            parser.error("--output is required for parquet output")
+        sink=_ParquetSink(args.output,profile=args.profile)
+    else:
+        sink=_JSONLinesSink(args.output)
+    context=ExecutionContext(workers=args.workers,mode=args.mode,max_git_processes=args.max_git_processes)
+    failures=0
+    try:
+        for record in compute_truck_factor_batch(repos,None,args.orphan_files_threshold,args.authorship_threshold,args.profile,context):
+            failures+=record["error"] is not None
+            sink.write(record)
+    finally:
+        sink.close()
+    if failures:
+        print(f"{failures} of {len(repos)} repositories failed",file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__=="__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+from pathlib import Path
+from hashlib import sha1
+from typing import Optional
+import subprocess
+import json
+import os
+import pandas as pd
+from .helper import RepoSession,count_commits,get_head_commit,get_ref_tips,iter_log_blocks,open_session,parse_blocks_columnar
+from .main import columns_to_dataframe,concat_contribution_dataframes
+from .store import load_contributions,save_contributions
+
+CACHE_VERSION=4
+_META_FILE="meta.json"
+_CONTRIBUTIONS_FILE="contributions.feather"
+_RENAMES_FILE="renames.json"
+# files of older cache versions, removed when an entry is rewritten
+_LEGACY_FILES=("contributions.pkl",)
+
+def default_cache_dir()->str:
+    """Default location of the contribution cache, private to the current user: $XDG_CACHE_HOME/truck_factor_gdeluisi or ~/.cache/truck_factor_gdeluisi
+
+    Returns:
+        str: cache directory
+    """
+    base=os.environ.get("XDG_CACHE_HOME")
+    # relative values are invalid and ignored, as the XDG specification requires
+    if not base or not os.path.isabs(base):
+        base=Path.home().joinpath(".cache").as_posix()
+    return Path(base).joinpath("truck_factor_gdeluisi").as_posix()
+
+def _private_dir(path:Path)->Path:
+    """Creates a directory only the current user can access, refusing existing ones other users could write to"""
+    path.mkdir(mode=0o700,parents=True,exist_ok=True)
+    if os.name=="posix":
+        st=path.stat()
+        if st.st_uid!=os.getuid() or st.st_mode & 0o022:
+            raise ValueError(f"Cache directory {path} is owned or writable by other users")
+    return path
+
+def _entry_dir(repo:str,cache_dir:str)->Path:
+    return _private_dir(Path(cache_dir)).joinpath(sha1(repo.encode()).hexdigest())
+
+def _read_entry(entry:Path,repo:str)->Optional[tuple[dict,pd.DataFrame,dict[str,str]]]:
+    try:
+        with entry.joinpath(_META_FILE).open("r") as f:
+            meta=json.load(f)
+        if meta.get("version")!=CACHE_VERSION or meta.get("repo")!=repo:
+            return None
+        with entry.joinpath(_RENAMES_FILE).open("r",encoding="utf-8") as f:
+            renames=json.load(f)
+        # Feather holds plain columns, a tampered file can not run code when loaded
+        df=load_contributions(entry.joinpath(_CONTRIBUTIONS_FILE),memory_map=False)
+    except (OSError,ValueError,KeyError):
+        return None
+    return meta,df,renames
+
+def _write_entry(entry:Path,meta:dict,df:pd.DataFrame,renames:dict[str,str]):
+    _private_dir(entry)
+    # meta is replaced last: an interrupted write leaves a stale meta which fails validation on the next run
+    meta_file=entry.joinpath(_META_FILE)
+    if meta_file.exists():
+        meta_file.unlink()
+    for name in _LEGACY_FILES:
+        entry.joinpath(name).unlink(missing_ok=True)
+    save_contributions(df,entry.joinpath(_CONTRIBUTIONS_FILE))
+    for name,content in ((_RENAMES_FILE,renames),(_META_FILE,meta)):
+        tmp=entry.joinpath(name+".tmp")
+        with tmp.open("w",encoding="utf-8") as f:
+            json.dump(content,f)
+        os.replace(tmp,entry.joinpath(name))
+
+def _read_history(repo:str,tips:list[str],exclude:Optional[list[str]]=None)->tuple[pd.DataFrame,dict[str,str]]:
+    columns=parse_blocks_columnar(iter_log_blocks(repo,revisions=tips,exclude=exclude))
+    return columns_to_dataframe(columns),columns.renames
+
+def _count_new_commits(repo:str,meta:dict,tips:list[str])->Optional[int]:
+    """Counts the commits added since the cached run, None if cached history is no longer part of the repository's history"""
+    try:
+        new_commits=count_commits(repo,revisions=tips,exclude=meta["tips"])
+        total=count_commits(repo,revisions=tips)
+    except subprocess.CalledProcessError:
+        # cached tips have been garbage collected
+        return None
+    # every cached commit is still reachable only if the new commits make up for the whole difference
+    if total!=meta["commit_count"]+new_commits:
+        return None
+    return new_commits
+
+def update_contribution_cache(repo:str,cache_dir:Optional[str]=None)->tuple[pd.DataFrame,dict[str,str]]:
+    """Loads the cached contributions of a repository, reading from git only commits added since the last run.
+    The cache is rebuilt from scratch when history has been rewritten (e.g. force-push) or refs have been deleted
+
+    Args:
+        repo (str): The path to the repository, or a RepoSession to reuse (look at RepoSession)
+        cache_dir (Optional[str], optional): Cache directory. Defaults to default_cache_dir().
+
+    Raises:
+        ValueError: If the cache directory is owned or writable by other users
+        ImportError: If pyarrow is not installed, entries are stored as Feather files (look at save_contributions)
+
+    Returns:
+        tuple[pd.DataFrame,dict[str,str]]: raw contributions dataframe (look at columns_to_dataframe) and raw renames (look at ContributionColumns)
+    """
+    with open_session(repo) as session:
+        return _update_contribution_cache(session,cache_dir)
+
+def _update_contribution_cache(session:RepoSession,cache_dir:Optional[str])->tuple[pd.DataFrame,dict[str,str]]:
+    repo=session.path
+    entry=_entry_dir(repo,cache_dir if cache_dir is not None else default_cache_dir())
+    head=get_head_commit(session)
+    tips=get_ref_tips(session,head)
+    cached=_read_entry(entry,repo)
+    if cached is not None:
+        meta,cached_df,cached_renames=cached
+        if meta["tips"]==tips and meta["head"]==head:
+            return cached_df,cached_renames
+        new_commits=_count_new_commits(session,meta,tips)
+        if new_commits is not None:
+            new_df,new_renames=_read_history(session,tips,meta["tips"])
+            df=concat_contribution_dataframes([new_df,cached_df])
+            # older renames take precedence, as in ContributionColumns
+            renames={**new_renames,**cached_renames}
+            meta=dict(version=CACHE_VERSION,repo=repo,head=head,tips=tips,commit_count=meta["commit_count"]+new_commits)
+            _write_entry(entry,meta,df,renames)
+            return df,renames
+    df,renames=_read_history(session,tips)
+    meta=dict(version=CACHE_VERSION,repo=repo,head=head,tips=tips,commit_count=count_commits(session,revisions=tips))
+    _write_entry(entry,meta,df,renames)
+    return df,renames
+
+def clear_contribution_cache(repo:str,cache_dir:Optional[str]=None):
+    """Removes the cached contributions of a repository
+
+    Args:
+        repo (str): The path to the repository
+        cache_dir (Optional[str], optional): Cache directory. Defaults to default_cache_dir().
+    """
+    repo=Path(repo).resolve().as_posix()
+    entry=_entry_dir(repo,cache_dir if cache_dir is not None else default_cache_dir())
+    for name in (_META_FILE,_CONTRIBUTIONS_FILE,_RENAMES_FILE,*_LEGACY_FILES):
+        entry.joinpath(name).unlink(missing_ok=True)
+    if entry.exists():
+        entry.rmdir()
@@ -0,0 +1,75 @@
+"""Command line tool computing the truck factor of a git repository.
+It runs the pandas-free computation of core, so it starts fast enough to be called from git hooks
+"""
+from argparse import ArgumentParser,ArgumentTypeError
+from contextlib import nullcontext
+from typing import Optional
+import json
+import sys
+import time
+from .core import compute_truck_factor_by_directory_result,compute_truck_factor_result
+from .execution import ExecutionContext
+from .helper import HistoryWindow
+from . import tracing
+
+def positive_int(value:str)->int:
+    """argparse type of counts which must be at least 1, such as worker numbers"""
+    try:
+        number=int(value)
+    except ValueError:
+        raise ArgumentTypeError(f"invalid int value: {value!r}") from None
+    if number<1:
+        raise ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+def main(argv:Optional[list[str]]=None)->int:
+    parser=ArgumentParser(prog="truck-factor-gdeluisi",description="Compute the truck factor of a git repository")
+    parser.add_argument("repo",nargs="?",default=".",help="path to the git repository, defaults to the current directory")
+    parser.add_argument("--orphan-files-threshold",type=float,default=0.5)
+    parser.add_argument("--authorship-threshold",type=float,default=0.7)
+    parser.add_argument("--json",action="store_true",help="print truck factor, removed authors, files and seconds as JSON")
+    parser.add_argument("-w","--workers",type=positive_int,default=None,help="parse logs on this many processes, defaults to the calling process only")
+    parser.add_argument("--include",action="append",default=None,metavar="GLOB",help="analyze only the files matching GLOB (git glob syntax, ** matches directories), can be repeated")
+    parser.add_argument("--exclude",action="append",default=None,metavar="GLOB",help="leave out the files matching GLOB, can be repeated")
+    parser.add_argument("--ref",default=None,help="analyze the files tracked at REF and start the history walk from it, defaults to HEAD")
+    parser.add_argument("--single-ref",action="store_true",help="walk the history of REF only instead of every branch and tag")
+    parser.add_argument("--since",default=None,metavar="DATE",help="read only commits more recent than DATE, in any format git accepts (e.g. \"12 months ago\")")
+    parser.add_argument("--until",default=None,metavar="DATE",help="read only commits older than DATE")
+    parser.add_argument("--max-count",type=int,default=None,metavar="N",help="read only the N most recent commits")
+    parser.add_argument("--by-directory",type=int,default=None,metavar="DEPTH",help="truck factor of every directory down to DEPTH levels, one per line")
+    parser.add_argument("--profile",action="store_true",help="print the time, memory and rows of every stage to standard error")
+    args=parser.parse_args(argv)
+    if args.max_count is not None and args.max_count<0:
+        parser.error("--max-count must not be negative")
+    window=HistoryWindow(args.ref,not args.single_ref,args.since,args.until,args.max_count)
+    context=None
+    if args.workers is not None:
+        context=ExecutionContext(workers=args.workers,parallel_parsing=args.workers>1)
+    start=time.perf_counter()
+    with tracing.profile() if args.profile else nullcontext() as tracer:
+        try:
+            if args.by_directory is not None:
+                results=compute_truck_factor_by_directory_result(args.repo,args.by_directory,args.orphan_files_threshold,args.authorship_threshold,context=context,include=args.include,exclude=args.exclude,window=window)
+            else:
+                result=compute_truck_factor_result(args.repo,args.orphan_files_threshold,args.authorship_threshold,context=context,include=args.include,exclude=args.exclude,window=window)
+        except ValueError as e:
+            print(f"{parser.prog}: {e}",file=sys.stderr)
+            return 1
+    seconds=time.perf_counter()-start
+    if args.by_directory is not None:
+        if args.json:
+            directories=[dict(directory=d,truck_factor=r.truck_factor,authors=r.removed_authors,n_files=r.n_files) for d,r in results.items()]
+            print(json.dumps(dict(repo=args.repo,directories=directories,seconds=seconds)))
+        else:
+            for directory,r in results.items():
+                print(f"{directory}\t{r.truck_factor}")
+    elif args.json:
+        print(json.dumps(dict(repo=args.repo,truck_factor=result.truck_factor,authors=result.removed_authors,n_files=result.n_files,seconds=seconds)))
+    else:
+        print(result.truck_factor)
+    if tracer is not None:
+        print(json.dumps(tracer.report()["stages"],indent=2),file=sys.stderr)
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
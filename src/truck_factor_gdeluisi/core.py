@@ -0,0 +1,249 @@
+"""Truck factor computation without pandas, for callers which only need the result (e.g. the command line tool).
+Contributions are summed while the log streams (look at ContributionAggregator), so memory does not grow with the length of the history.
+Results are the same as main.compute_truck_factor_details on create_contribution_dataframe and compute_DOA
+"""
+from math import log1p
+from bisect import bisect_left,bisect_right
+from itertools import islice
+from typing import Iterable,Optional
+from collections.abc import Hashable
+from .helper import (FULL_HISTORY,ContributionAggregator,HistoryWindow,TruckFactorResult,aggregate_blocks,check_window,greedy_truck_factor,
+                     is_dir_a_repo,is_git_available,iter_log_blocks,open_session,select_files)
+from .execution import ExecutionContext,use_context
+from . import tracing
+
+def aggregate_authorship(aggregator:ContributionAggregator,current_files:Iterable[str],only_of_files:bool=True)->dict[str,dict[str,int]]:
+    """Sums the changed lines of each author to each current file, following renames, as aggregate_contributions does on create_contribution_dataframe
+
+    Args:
+        aggregator (ContributionAggregator): aggregated contributions (look at aggregate_blocks)
+        current_files (Iterable[str]): files tracked at the analyzed revision
+        only_of_files (bool, optional): Keep only files written in a known programming language. Defaults to True.
+
+    Returns:
+        dict[str,dict[str,int]]: file -> author -> inserted plus deleted lines, authors who never changed a line of a file are left out
+    """
+    return {fname:{a:inserted+deleted for a,(inserted,deleted) in per_author.items()} for fname,per_author in aggregator.per_file(current_files,only_of_files).items()}
+
+def compute_doa(authorship:dict[str,dict[str,int]])->dict[str,dict[str,float]]:
+    """Computes the normalized Degree Of Authorship, as compute_DOA_from_aggregates does
+
+    Args:
+        authorship (dict[str,dict[str,int]]): changed lines per file and author (look at aggregate_authorship)
+
+    Returns:
+        dict[str,dict[str,float]]: file -> author -> normalized DOA
+    """
+    #DOA=3.293 + 1.098 × FA(md, fp) + 0.164×DL(md, fp) − 0.321 × ln(1 + AC (md, fp))
+    doa:dict[str,dict[str,float]]=dict()
+    for fname,per_author in authorship.items():
+        total=sum(per_author.values())
+        # known deviation kept from compute_DOA_from_aggregates: FA goes to the first author in name order, not to the file's creator
+        first=min(per_author)
+        values={a:3.293 + 1.098 * (a==first) + 0.164 * lines - 0.321 * log1p(total-lines) for a,lines in per_author.items()}
+        top=max(values.values())
+        doa[fname]={a:v/top for a,v in values.items()}
+    return doa
+
+def truck_factor_from_doa(doa:dict[str,dict[str,float]],orphan_files_threashold:float=0.5,authorship_threshold:float=0.7)->TruckFactorResult:
+    """Runs the greedy truck factor algorithm on the authors whose normalized DOA reaches authorship_threshold
+
+    Args:
+        doa (dict[str,dict[str,float]]): normalized DOA per file and author (look at compute_doa)
+        orphan_files_threashold (float, optional): Look at compute_truck_factor. Defaults to 0.5.
+        authorship_threshold (float, optional): Look at compute_truck_factor. Defaults to 0.7.
+
+    Returns:
+        TruckFactorResult: truck factor, removed authors and files orphaned at each step
+    """
+    with tracing.stage("truck_factor"):
+        return greedy_truck_factor(((fname,a) for fname,per_author in doa.items() for a,v in per_author.items() if v>=authorship_threshold),orphan_files_threashold)
+
+def directory_prefixes(fname:str,depth:int)->list[str]:
+    """Lists the directories containing a file, from the repository root (".") down to depth levels
+
+    Args:
+        fname (str): file path relative to the repository root
+        depth (int): deepest directory level, 0 is the root only
+
+    Returns:
+        list[str]: "." followed by the enclosing directories, shallowest first
+    """
+    parts=fname.split("/")[:-1]
+    return ["."]+["/".join(parts[:i]) for i in range(1,min(depth,len(parts))+1)]
+
+def rollup_truck_factor(authorship:Iterable[tuple[str,Hashable]],depth:int=1,orphan_files_threashold:float=0.5)->dict[str,TruckFactorResult]:
+    """Runs the greedy truck factor algorithm on every directory up to depth levels.
+    Each (file, major author) pair is added to the directories containing the file, so the work grows with files times depth rather than files times directories
+
+    Args:
+        authorship (Iterable[tuple[str,Hashable]]): (file path, major author) pairs
+        depth (int, optional): deepest directory level, 0 computes the repository truck factor only. Defaults to 1.
+        orphan_files_threashold (float, optional): Look at compute_truck_factor. Defaults to 0.5.
+
+    Returns:
+        dict[str,TruckFactorResult]: truck factor of every directory holding files with a major author, by directory path ("." is the repository root)
+    """
+    if depth<0:
+        raise ValueError("depth must not be negative")
+    per_directory:dict[str,list[tuple[str,Hashable]]]=dict()
+    prefixes:dict[str,list[str]]=dict()
+    for fname,author in authorship:
+        if fname not in prefixes:
+            prefixes[fname]=directory_prefixes(fname,depth)
+        for directory in prefixes[fname]:
+            per_directory.setdefault(directory,[]).append((fname,author))
+    with tracing.stage("truck_factor") as span:
+        span.rows=len(per_directory)
+        return {directory:greedy_truck_factor(per_directory[directory],orphan_files_threashold) for directory in sorted(per_directory)}
+
+def truck_factor_by_directory(doa:dict[str,dict[str,float]],depth:int=1,orphan_files_threashold:float=0.5,authorship_threshold:float=0.7)->dict[str,TruckFactorResult]:
+    """Computes the truck factor of every directory up to depth levels out of a single DOA table (look at rollup_truck_factor)
+
+    Args:
+        doa (dict[str,dict[str,float]]): normalized DOA per file and author (look at compute_doa)
+        depth (int, optional): deepest directory level, 0 computes the repository truck factor only. Defaults to 1.
+        orphan_files_threashold (float, optional): Look at compute_truck_factor. Defaults to 0.5.
+        authorship_threshold (float, optional): Look at compute_truck_factor. Defaults to 0.7.
+
+    Returns:
+        dict[str,TruckFactorResult]: truck factor by directory path ("." is the repository root)
+    """
+    return rollup_truck_factor(((fname,a) for fname,per_author in doa.items() for a,v in per_author.items() if v>=authorship_threshold),depth,orphan_files_threashold)
+
+def truck_factor_sweep(scored:Iterable[tuple[Hashable,Hashable,float]],orphan_files_thresholds:Iterable[float],authorship_thresholds:Iterable[float])->list[list[int]]:
+    """Computes the truck factor for every pair of thresholds out of a single DOA table.
+    Pairs are sorted by DOA once, so the major authors of each authorship threshold are a prefix of them.
+    The greedy algorithm removes authors in an order which does not depend on orphan_files_threashold, so it runs once per authorship threshold
+    and the truck factor of each orphan files threshold is the first removal leaving few enough files with a major author
+
+    Args:
+        scored (Iterable[tuple[Hashable,Hashable,float]]): (file, author, normalized DOA) triples
+        orphan_files_thresholds (Iterable[float]): values of orphan_files_threashold, look at compute_truck_factor
+        authorship_thresholds (Iterable[float]): values of authorship_threshold, look at compute_truck_factor
+
+    Raises:
+        ValueError: Whether a threshold is not in the range limit
+
+    Returns:
+        list[list[int]]: truck factors, a row per authorship threshold and a column per orphan files threshold
+    """
+    orphan_files_thresholds=list(orphan_files_thresholds)
+    authorship_thresholds=list(authorship_thresholds)
+    for orphan in orphan_files_thresholds:
+        for authorship in authorship_thresholds:
+            _check_thresholds(orphan,authorship)
+    scored=sorted(scored,key=lambda t:t[2],reverse=True)
+    neg_doa=[-t[2] for t in scored]
+    matrix=[]
+    with tracing.stage("truck_factor_sweep") as span:
+        for authorship in authorship_thresholds:
+            # DOA>=authorship holds for a prefix of the sorted pairs
+            n=bisect_right(neg_doa,-authorship)
+            # no quorum can be reached before every file is orphaned, so the whole removal order is computed
+            full=greedy_truck_factor(((fname,a) for fname,a,_ in islice(scored,n)),0)
+            # negated files still having a major author after each removal, they never grow so the list is sorted
+            remaining=[]
+            left=full.n_files
+            for orphaned in full.orphaned_files:
+                left-=len(orphaned)
+                remaining.append(-left)
+            row=[]
+            for orphan in orphan_files_thresholds:
+                # the truck factor is the first removal reaching the quorum
+                k=bisect_left(remaining,-full.n_files*orphan)
+                row.append(k+1 if k<len(remaining) else len(remaining))
+            matrix.append(row)
+        span.rows=len(scored)
+    return matrix
+
+def _check_thresholds(orphan_files_threashold:float,authorship_threshold:float):
+    if not( (orphan_files_threashold >0 and orphan_files_threashold <=1 ) and (authorship_threshold >0 and authorship_threshold <=1 )):
+        raise ValueError("All threshold values must have a value between 0 and 1")
+
+def read_doa(repo:str,only_of_files:bool=True,context:Optional[ExecutionContext]=None,include:Optional[Iterable[str]]=None,exclude:Optional[Iterable[str]]=None,window:Optional[HistoryWindow]=None)->dict[str,dict[str,float]]:
+    """Reads the history of a git repository into the normalized DOA table of its tracked files, without building dataframes.
+    Path globs and the extensions which are not source code are passed to git as pathspecs (look at select_files)
+
+    Args:
+        repo (str): The path to the repository, or a RepoSession to reuse (look at RepoSession). A session is opened for the call otherwise
+        only_of_files (bool, optional): Keep only files written in a known programming language. Defaults to True.
+        context (Optional[ExecutionContext], optional): Workers and git subprocesses limits. Defaults to the current execution context.
+        include (Optional[Iterable[str]], optional): globs of the files to analyze, in git's glob syntax (look at build_pathspecs). Defaults to every file.
+        exclude (Optional[Iterable[str]], optional): globs of the files to leave out. Defaults to None.
+        window (Optional[HistoryWindow], optional): Revision to analyze, branches, dates and number of commits to read (look at HistoryWindow). Defaults to the whole history of every ref.
+
+    Raises:
+        ValueError: Whether the path is not a repository, the window's ref does not name a commit or the repository is not suited for truck factor calculation
+        Exception: If git CLI is not on PATH
+
+    Returns:
+        dict[str,dict[str,float]]: file -> author -> normalized DOA
+    """
+    if not is_git_available():
+        raise Exception("No git CLI found on PATH")
+    with use_context(context),open_session(repo) as session:
+        if not is_dir_a_repo(session):
+            raise ValueError(f"Path {repo} is not a git directory")
+        window=window if window is not None else FULL_HISTORY
+        check_window(session,window)
+        with tracing.stage("tracked_files"):
+            current_files,pathspecs=select_files(session,include,exclude,only_of_files,window.ref)
+        with tracing.stage("read_contributions") as span:
+            # contributions are summed while the log streams, the history is never held in memory
+            aggregator=aggregate_blocks(iter_log_blocks(session,window.ref,pathspecs=pathspecs,window=window))
+            span.rows=len(aggregator)
+        with tracing.stage("aggregate_contributions") as span:
+            authorship=aggregate_authorship(aggregator,current_files,only_of_files)
+            span.rows=len(authorship)
+    if not authorship:
+        raise ValueError("Repository not suited for truck factor calculation, no source code found")
+    with tracing.stage("compute_DOA"):
+        return compute_doa(authorship)
+
+def compute_truck_factor_result(repo:str,orphan_files_threashold:float=0.5,authorship_threshold:float=0.7,only_of_files:bool=True,context:Optional[ExecutionContext]=None,include:Optional[Iterable[str]]=None,exclude:Optional[Iterable[str]]=None,window:Optional[HistoryWindow]=None)->TruckFactorResult:
+    """Computes the truck factor of a git repository without building dataframes
+
+    Args:
+        repo (str): The path to the repository
+        orphan_files_threashold (float, optional): Look at compute_truck_factor. Defaults to 0.5.
+        authorship_threshold (float, optional): Look at compute_truck_factor. Defaults to 0.7.
+        only_of_files (bool, optional): Keep only files written in a known programming language. Defaults to True.
+        context (Optional[ExecutionContext], optional): Workers and git subprocesses limits. Defaults to the current execution context.
+        include (Optional[Iterable[str]], optional): globs of the files to analyze (look at read_doa). Defaults to every file.
+        exclude (Optional[Iterable[str]], optional): globs of the files to leave out. Defaults to None.
+        window (Optional[HistoryWindow], optional): Revision to analyze, branches, dates and number of commits to read (look at read_doa). Defaults to the whole history of every ref.
+
+    Raises:
+        ValueError: Whether the thresholds are not in the range limit, the path is not a repository or the repository is not suited for truck factor calculation
+        Exception: If git CLI is not on PATH
+
+    Returns:
+        TruckFactorResult: truck factor, removed authors and files orphaned at each step
+    """
+    _check_thresholds(orphan_files_threashold,authorship_threshold)
+    return truck_factor_from_doa(read_doa(repo,only_of_files,context,include,exclude,window),orphan_files_threashold,authorship_threshold)
+
+def compute_truck_factor_by_directory_result(repo:str,depth:int=1,orphan_files_threashold:float=0.5,authorship_threshold:float=0.7,only_of_files:bool=True,context:Optional[ExecutionContext]=None,include:Optional[Iterable[str]]=None,exclude:Optional[Iterable[str]]=None,window:Optional[HistoryWindow]=None)->dict[str,TruckFactorResult]:
+    """Computes the truck factor of every directory of a git repository up to depth levels, without building dataframes
+
+    Args:
+        repo (str): The path to the repository
+        depth (int, optional): deepest directory level, 0 computes the repository truck factor only. Defaults to 1.
+        orphan_files_threashold (float, optional): Look at compute_truck_factor. Defaults to 0.5.
+        authorship_threshold (float, optional): Look at compute_truck_factor. Defaults to 0.7.
+        only_of_files (bool, optional): Keep only files written in a known programming language. Defaults to True.
+        context (Optional[ExecutionContext], optional): Workers and git subprocesses limits. Defaults to the current execution context.
+        include (Optional[Iterable[str]], optional): globs of the files to analyze (look at read_doa). Defaults to every file.
+        exclude (Optional[Iterable[str]], optional): globs of the files to leave out. Defaults to None.
+        window (Optional[HistoryWindow], optional): Revision to analyze, branches, dates and number of commits to read (look at read_doa). Defaults to the whole history of every ref.
+
+    Raises:
+        ValueError: Whether the thresholds are not in the range limit, the path is not a repository or the repository is not suited for truck factor calculation
+        Exception: If git CLI is not on PATH
+
+    Returns:
+        dict[str,TruckFactorResult]: truck factor by directory path ("." is the repository root)
+    """
+    _check_thresholds(orphan_files_threashold,authorship_threshold)
+    return truck_factor_by_directory(read_doa(repo,only_of_files,context,include,exclude,window),depth,orphan_files_threashold,authorship_threshold)
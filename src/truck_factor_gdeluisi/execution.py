@@ -0,0 +1,188 @@
+from concurrent.futures import Executor,ProcessPoolExecutor,ThreadPoolExecutor
+from contextlib import asynccontextmanager,contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass,field
+from multiprocessing import get_context
+from pathlib import Path
+from math import ceil
+from typing import AsyncIterator,Callable,Iterator,Optional
+from weakref import WeakKeyDictionary
+import threading
+import copy
+import os
+
+MODES=("process","thread")
+MAX_DEFAULT_WORKERS=32
+
+def _cgroup_cpu_quota(root:str="/sys/fs/cgroup")->Optional[float]:
+    """Reads the CPU quota (in CPUs) of the cgroup the process runs in, None when unlimited or unknown"""
+    base=Path(root)
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        quota,period=base.joinpath("cpu.max").read_text().split()
+        return None if quota=="max" else int(quota)/int(period)
+    except (OSError,ValueError):
+        pass
+    for controller in ("cpu","cpu,cpuacct"):
+        try:
+            quota=int(base.joinpath(controller,"cpu.cfs_quota_us").read_text())
+            period=int(base.joinpath(controller,"cpu.cfs_period_us").read_text())
+        except (OSError,ValueError):
+            continue
+        return quota/period if quota>0 and period>0 else None
+    return None
+
+def available_cpus(cgroup_root:str="/sys/fs/cgroup")->int:
+    """Number of CPUs the process may actually use: CPU affinity and container (cgroup) CPU quotas are taken into account
+
+    Args:
+        cgroup_root (str, optional): mount point of the cgroup filesystem. Defaults to "/sys/fs/cgroup".
+
+    Returns:
+        int: usable CPUs, at least 1
+    """
+    try:
+        cpus=len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus=os.cpu_count() or 1
+    quota=_cgroup_cpu_quota(cgroup_root)
+    if quota is not None:
+        cpus=min(cpus,ceil(quota))
+    return max(1,cpus)
+
+def default_workers()->int:
+    return min(MAX_DEFAULT_WORKERS,available_cpus())
+
+@dataclass
+class ExecutionContext:
+    """Concurrency settings shared by every stage of the computation
+
+    Args:
+        workers (Optional[int], optional): Maximum number of parallel workers (processes or threads). Defaults to the usable CPUs, up to 32.
+        mode (str, optional): "process" runs parallel work in spawned processes, "thread" in threads of the calling process. Defaults to "process".
+        max_git_processes (Optional[int], optional): Maximum number of git subprocesses running at once in this process, a streamed log holds its slot until it is fully read. Defaults to workers.
+        parallel_parsing (bool, optional): Parse logs on a pool of workers instead of the calling process. Spawned processes re-import the main module,
+            so in process mode the calling script must guard its entry point with if __name__=="__main__". Defaults to False.
+    """
+    workers:Optional[int]=None
+    mode:str="process"
+    max_git_processes:Optional[int]=None
+    parallel_parsing:bool=False
+    _git_slots:threading.BoundedSemaphore=field(init=False,repr=False,compare=False)
+    _async_git_slots:WeakKeyDictionary=field(init=False,repr=False,compare=False)
+
+    def __post_init__(self):
+        if self.workers is None:
+            self.workers=default_workers()
+        if self.max_git_processes is None:
+            self.max_git_processes=self.workers
+        if self.mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        if self.workers<1 or self.max_git_processes<1:
+            raise ValueError("workers and max_git_processes must be at least 1")
+        self._git_slots=threading.BoundedSemaphore(self.max_git_processes)
+        self._async_git_slots=WeakKeyDictionary()
+
+    def __getstate__(self)->dict:
+        # semaphores cannot cross process boundaries, each process gets its own
+        state=self.__dict__.copy()
+        del state["_git_slots"]
+        del state["_async_git_slots"]
+        return state
+
+    def __setstate__(self,state:dict):
+        self.__dict__.update(state)
+        self._git_slots=threading.BoundedSemaphore(self.max_git_processes)
+        self._async_git_slots=WeakKeyDictionary()
+
+    @contextmanager
+    def git_slot(self)->Iterator[None]:
+        """Holds one of the max_git_processes slots while a git subprocess runs"""
+        with self._git_slots:
+            yield
+
+    @asynccontextmanager
+    async def async_git_slot(self)->AsyncIterator[None]:
+        """Holds one of the max_git_processes slots of the running event loop while an asyncio git subprocess runs.
+        Each event loop has its own slots, separate from the ones of git_slot, so waiting never blocks the loop"""
+        # imported here, asyncio would add to the import time of the command line tool
+        import asyncio
+        loop=asyncio.get_running_loop()
+        slots=self._async_git_slots.get(loop)
+        if slots is None:
+            slots=self._async_git_slots[loop]=asyncio.Semaphore(self.max_git_processes)
+        async with slots:
+            yield
+
+    def executor(self,workers:Optional[int]=None,initializer:Optional[Callable]=None,initargs:tuple=())->Executor:
+        """Creates a pool of the context's mode
+
+        Args:
+            workers (Optional[int], optional): Pool size. Defaults to workers.
+            initializer (Optional[Callable], optional): Called at the start of each worker. Defaults to None.
+            initargs (tuple, optional): Arguments of initializer. Defaults to ().
+
+        Returns:
+            Executor: process pool (spawn start method) or thread pool
+        """
+        workers=workers if workers is not None else self.workers
+        if self.mode=="thread":
+            return ThreadPoolExecutor(workers,initializer=initializer,initargs=initargs)
+        # spawn avoids forking a process which may be running other threads
+        return ProcessPoolExecutor(workers,mp_context=get_context("spawn"),initializer=initializer,initargs=initargs)
+
+    @property
+    def parse_workers(self)->int:
+        """Workers used to parse logs, 1 unless parallel_parsing is enabled"""
+        return self.workers if self.parallel_parsing else 1
+
+    def single_worker(self)->"ExecutionContext":
+        """Copy of the context running everything sequentially, which shares the git subprocess slots of this context"""
+        context=copy.copy(self)
+        context.workers=1
+        context._git_slots=self._git_slots
+        context._async_git_slots=self._async_git_slots
+        return context
+
+_default_context:Optional[ExecutionContext]=None
+_current_context:ContextVar[Optional[ExecutionContext]]=ContextVar("execution_context",default=None)
+
+def current_context()->ExecutionContext:
+    """Returns the execution context in use, look at use_context.
+    The default context is created on first use, so CPU quotas are read when the library runs rather than when it is imported
+
+    Returns:
+        ExecutionContext: active context
+    """
+    global _default_context
+    context=_current_context.get()
+    if context is not None:
+        return context
+    if _default_context is None:
+        _default_context=ExecutionContext()
+    return _default_context
+
+def set_default_context(context:Optional[ExecutionContext]):
+    """Replaces the context used when no other is active, None restores the automatically detected one"""
+    global _default_context
+    _default_context=context
+
+@contextmanager
+def use_context(context:Optional[ExecutionContext])->Iterator[ExecutionContext]:
+    """Makes context the active execution context for the duration of the with block, in the calling thread only.
+    None keeps the current one, so entry points can forward their optional context argument
+
+    Args:
+        context (Optional[ExecutionContext]): context to activate
+
+    Yields:
+        Iterator[ExecutionContext]: the active context
+    """
+    if context is None:
+        yield current_context()
+        return
+    token=_current_context.set(context)
+    try:
+        yield context
+    finally:
+        _current_context.reset(token)
@@ -4,68 +4,378 @@ import sys
 import os
 import subprocess
 from typing import Optional
-import pandas as pd
-from concurrent.futures import ProcessPoolExecutor,ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
 from math import floor,ceil
-from functools import partial
-from typing import Iterable
+from functools import partial,lru_cache
+from typing import Iterable,Iterator
 import json
-max_worker = min(32,os.cpu_count())
-def write_logs(path:str,commit_sha:Optional[str]=None)->str:
+from array import array
+from collections import deque
+from dataclasses import dataclass,field
+from collections.abc import Hashable
+from contextlib import contextmanager
+from weakref import finalize
+import threading
+from . import tracing
+from .execution import current_context
+PARSE_CHUNK_SIZE=1<<22
+# hash of the tree without entries
+EMPTY_TREE="4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+
+@dataclass(frozen=True)
+class HistoryWindow:
+    """Part of the history to read. Limits are passed to git, so commits outside of the window are neither walked nor parsed
+
+    Args:
+        ref (Optional[str], optional): Revision whose tracked files are analyzed and where the walk starts. Defaults to HEAD.
+        all_refs (bool, optional): Walk the history of every branch and tag along with ref's, like git log --all. Defaults to True.
+        since (Optional[str], optional): Read only commits more recent than this date, in any format git accepts (e.g. "2024-01-01" or "12 months ago"). Defaults to None.
+        until (Optional[str], optional): Read only commits older than this date. Defaults to None.
+        max_count (Optional[int], optional): Read only the max_count most recent commits. Defaults to None.
+
+    Raises:
+        ValueError: If max_count is negative
+    """
+    ref:Optional[str]=None
+    all_refs:bool=True
+    since:Optional[str]=None
+    until:Optional[str]=None
+    max_count:Optional[int]=None
+
+    def __post_init__(self):
+        if self.max_count is not None and self.max_count<0:
+            raise ValueError("max_count must not be negative")
+
+    def is_full(self)->bool:
+        """Whether the window is the whole history of every ref, the default"""
+        return self==FULL_HISTORY
+
+FULL_HISTORY=HistoryWindow()
+
+def _window_args(window:HistoryWindow)->list[str]:
+    """Date and count limits of window as git rev-list options, shared by git log and git rev-list"""
+    args=[]
+    if window.max_count is not None:
+        args.append(f"--max-count={window.max_count}")
+    if window.since is not None:
+        args.append(f'--since="{window.since}"')
+    if window.until is not None:
+        args.append(f'--until="{window.until}"')
+    return args
+
+class RepoSession:
+    """A repository opened once for a series of calls. It can be passed to the helper and main functions wherever a repository path is accepted:
+    it is a path-like object, and functions recognising it reuse the repository facts it memoizes (HEAD, resolved revisions, tracked files, commit counts)
+    instead of spawning a git process for each lookup. Revisions are resolved by a single git cat-file --batch-check process kept open until close.
+    The repository is assumed not to change while the session is open, open a new session to see new commits
+
+    Args:
+        path (str): path to git directory
+    """
+    def __init__(self,path:str):
+        self.path=Path(path).resolve().as_posix()
+        self._lock=threading.Lock()
+        self._memo:dict[Hashable,object]={}
+        self._batch:Optional[subprocess.Popen]=None
+        self._finalizer=None
+
+    def __fspath__(self)->str:
+        return self.path
+
+    def __str__(self)->str:
+        return self.path
+
+    def __repr__(self)->str:
+        return f"RepoSession({self.path!r})"
+
+    def __reduce__(self):
+        # the cat-file process stays with the session which started it, other processes open their own
+        return (RepoSession,(self.path,))
+
+    def __enter__(self)->"RepoSession":
+        return self
+
+    def __exit__(self,*exc):
+        self.close()
+
+    def memoize(self,key:Hashable,compute):
+        """Returns the value memoized under key, computing it on first use
+
+        Args:
+            key (Hashable): memo key
+            compute (Callable[[],object]): computes the value, it runs without holding the session's lock
+
+        Returns:
+            object: the memoized value
+        """
+        with self._lock:
+            if key in self._memo:
+                return self._memo[key]
+        value=compute()
+        with self._lock:
+            return self._memo.setdefault(key,value)
+
+    def resolve(self,rev:str)->Optional[str]:
+        """Resolves a revision to a commit hash through the session's cat-file process
+
+        Args:
+            rev (str): revision (hash, ref, relative reference...)
+
+        Returns:
+            Optional[str]: the commit hash, None if rev does not name a commit or the path is not a repository
+        """
+        return self.memoize(("resolve",rev),lambda:self._resolve(rev))
+
+    def _resolve(self,rev:str)->Optional[str]:
+        if "\n" in rev:
+            return None
+        with self._lock:
+            if self._batch is None:
+                self._batch=subprocess.Popen(["git","-C",self.path,"cat-file","--batch-check"],stdin=subprocess.PIPE,stdout=subprocess.PIPE,stderr=subprocess.DEVNULL)
+                self._finalizer=finalize(self,_close_process,self._batch)
+            try:
+                self._batch.stdin.write(f"{rev}^{{commit}}\n".encode())
+                self._batch.stdin.flush()
+                fields=self._batch.stdout.readline().decode().split()
+            except OSError:
+                # git exited, path is not a repository
+                fields=[]
+        # missing and ambiguous names are echoed back followed by the reason
+        return fields[0] if len(fields)==3 and fields[1]=="commit" else None
+
+    def close(self):
+        """Stops the cat-file process, memoized facts stay available"""
+        with self._lock:
+            if self._finalizer is not None:
+                self._finalizer()
+            self._batch=None
+            self._finalizer=None
+
+def _close_process(proc:subprocess.Popen):
+    try:
+        proc.stdin.close()
+    except OSError:
+        pass
+    proc.stdout.close()
+    proc.wait()
+
+@contextmanager
+def open_session(path:str)->Iterator[RepoSession]:
+    """Reuses path when it is already a session, otherwise opens one which is closed on exit
+
+    Args:
+        path (str): path to git directory or RepoSession
+
+    Yields:
+        Iterator[RepoSession]: the session
+    """
+    if isinstance(path,RepoSession):
+        yield path
+        return
+    with RepoSession(path) as session:
+        yield session
+
+def check_window(path:str,window:HistoryWindow):
+    """Validates a history window against a repository before any history is read
+
+    Args:
+        path (str): path to git directory
+        window (HistoryWindow): window to validate
+
+    Raises:
+        ValueError: If the window's ref does not name a commit
+    """
+    if window.ref is not None and resolve_commit(path,window.ref) is None:
+        raise ValueError(f"Revision {window.ref} not found in {path}")
+
+def write_logs(path:str,commit_sha:Optional[str]=None,revisions:Optional[Iterable[str]]=None,exclude:Optional[Iterable[str]]=None,window:Optional[HistoryWindow]=None)->str:
     """Generates formatted logs
 
     Args:
         path (str): path to git directory
         commit_sha (Optional[str], optional): Commit's hash value. Defaults to None.
+        revisions (Optional[Iterable[str]], optional): Revisions to walk instead of commit_sha and all refs. Defaults to None.
+        exclude (Optional[Iterable[str]], optional): Revisions whose history must not be walked. Defaults to None.
+        window (Optional[HistoryWindow], optional): Branches, dates and number of commits to walk, its ref is not used (look at HistoryWindow). Defaults to the whole history of every ref.
 
     Returns:
         str: raw logs as strings (contains control characters)
     """
+    return "\n\n".join(iter_log_blocks(path,commit_sha,revisions,exclude,window=window))
+
+def _stream_command(cmd:str,input:Optional[str]=None)->Iterator[str]:
+    """Runs a command and lazily yields its output line by line
+
+    Args:
+        cmd (str): command to execute
+        input (Optional[str], optional): Data written to the command's standard input. Defaults to None.
+
+    Raises:
+        subprocess.CalledProcessError: If the command exits with a non zero status
+
+    Yields:
+        Iterator[str]: decoded output lines, without the trailing newline
+    """
+    stdin=subprocess.PIPE if input is not None else None
+    with current_context().git_slot(),subprocess.Popen(cmd,shell=True,stdin=stdin,stdout=subprocess.PIPE) as proc:
+        if input is not None:
+            proc.stdin.write(input.encode())
+            proc.stdin.close()
+        for line in tracing.count_bytes(proc.stdout):
+            yield line.decode().rstrip("\n")
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode,cmd)
+
+def _check_output(cmd:str,**kwargs)->bytes:
+    """subprocess.check_output bounded by the git subprocess slots of the current execution context"""
+    with current_context().git_slot():
+        return subprocess.check_output(cmd,**kwargs)
+
+def _check_call(cmd:str,**kwargs)->int:
+    """subprocess.check_call bounded by the git subprocess slots of the current execution context"""
+    with current_context().git_slot():
+        return subprocess.check_call(cmd,**kwargs)
+
+def _is_numstat_line(line:str)->bool:
+    fields=line.split("\t",2)
+    return len(fields)==3 and all(f.isdigit() or f=="-" for f in fields[:2])
+
+def _select_revisions(path:str,commit_sha:Optional[str]=None,revisions:Optional[Iterable[str]]=None,exclude:Optional[Iterable[str]]=None,window:Optional[HistoryWindow]=None)->tuple[str,list[str],Optional[str]]:
+    """Resolves which commits a log or rev-list command has to walk.
+    By default the walk starts from commit_sha (or HEAD) and, unless the window is limited to it, all refs. Otherwise the revisions are passed through standard input
+
+    Args:
+        path (str): path to git directory
+        commit_sha (Optional[str], optional): Commit's hash value. Defaults to None.
+        revisions (Optional[Iterable[str]], optional): Revisions to walk instead of commit_sha and all refs. Defaults to None.
+        exclude (Optional[Iterable[str]], optional): Revisions whose history must not be walked. Defaults to None.
+        window (Optional[HistoryWindow], optional): Branches, dates and number of commits to walk, its ref is not used (look at HistoryWindow). Defaults to the whole history of every ref.
+
+    Returns:
+        tuple[str,list[str],Optional[str]]: starting revision, additional arguments and standard input of the command
+    """
+    window=window if window is not None else FULL_HISTORY
+    if revisions is None and exclude is None:
+        head=commit_sha
+        if not commit_sha:
+            head=get_head_commit(path)
+        return head,(["--all"] if window.all_refs else [])+_window_args(window),None
+    if revisions is None:
+        revisions=get_ref_tips(path,commit_sha) if window.all_refs else [commit_sha if commit_sha else "HEAD"]
+    lines=list(revisions)
+    if exclude:
+        lines.extend(f"^{rev}" for rev in exclude)
+    return "--stdin",_window_args(window),"\n".join(lines)+"\n"
+
+def iter_log_blocks(path:str,commit_sha:Optional[str]=None,revisions:Optional[Iterable[str]]=None,exclude:Optional[Iterable[str]]=None,pretty:str=r'%an|%ad',pathspecs:Optional[Iterable[str]]=None,window:Optional[HistoryWindow]=None)->Iterator[str]:
+    """Streams formatted logs from a single git log process, one commit block at a time.
+    Blocks are yielded as soon as git writes them, so callers can parse while git is still walking the history
+
+    Args:
+        path (str): path to git directory
+        commit_sha (Optional[str], optional): Commit's hash value. Defaults to None.
+        revisions (Optional[Iterable[str]], optional): Revisions to walk instead of commit_sha and all refs. Defaults to None.
+        exclude (Optional[Iterable[str]], optional): Revisions whose history must not be walked. Defaults to None.
+        pretty (str, optional): git pretty format of the first line of each block. Defaults to "%an|%ad".
+        pathspecs (Optional[Iterable[str]], optional): git pathspecs limiting the files whose changes are printed (look at build_pathspecs), commits changing none of them are skipped by git. Defaults to None.
+        window (Optional[HistoryWindow], optional): Branches, dates and number of commits to walk, its ref is not used (look at HistoryWindow). Defaults to the whole history of every ref.
+
+    Yields:
+        Iterator[str]: commit blocks made of the "author|date" line followed by its numstat lines. Renamed files are printed with git's "old => new" notation
+    """
+    cmd,stdin=_log_blocks_command(path,commit_sha,revisions,exclude,pretty,pathspecs,window)
+    blocks=_LogBlocks()
+    for line in _stream_command(cmd,stdin):
+        block=blocks.feed(line)
+        if block is not None:
+            yield block
+    block=blocks.close()
+    if block is not None:
+        yield block
+
+def _log_blocks_command(path:str,commit_sha:Optional[str]=None,revisions:Optional[Iterable[str]]=None,exclude:Optional[Iterable[str]]=None,pretty:str=r'%an|%ad',pathspecs:Optional[Iterable[str]]=None,window:Optional[HistoryWindow]=None)->tuple[str,Optional[str]]:
+    """Builds the git log command read by iter_log_blocks and its standard input"""
     repo=Path(path).resolve().as_posix()
-    head=commit_sha
-    if not commit_sha:
-        head=get_head_commit(path)
-    no_commits=count_commits(repo,head)
-    c_slice=ceil(no_commits/max_worker)
-    cmds=[]
-    for i in range(max_worker):
-        cmds.append(_log_builder(repo,head,r'%an|%ad',False,c_slice,i*c_slice,None,None,"--date=short","--numstat","--all"))
-    with ThreadPoolExecutor(max_workers=max_worker) as executor:
-        worker=partial(subprocess.check_output,shell=True)
-        results=executor.map(worker,cmds)
-    return "\n".join([r.decode() for r in results])
+    head,rev_args,stdin=_select_revisions(path,commit_sha,revisions,exclude,window)
+    return _log_builder(repo,head,pretty,False,None,None,None,None,"--date=short","--numstat","-M",*rev_args,pathspecs=pathspecs),stdin
 
-def get_aliases(path:str,commit_sha:Optional[str]=None)->dict[str]:
+class _LogBlocks:
+    """Groups the lines of git log --numstat into commit blocks, fed one line at a time"""
+    __slots__=("block",)
+    def __init__(self):
+        self.block:list[str]=[]
+
+    def feed(self,line:str)->Optional[str]:
+        """Adds a line, returns the previous block when the line starts a new one"""
+        if not line:
+            return None
+        if self.block and _is_numstat_line(line):
+            self.block.append(line)
+            return None
+        # commits without numstat lines (e.g. merges) are not followed by an empty line, so every line which is not a stat starts a new block
+        done="\n".join(self.block) if self.block else None
+        self.block=[line]
+        return done
+
+    def close(self)->Optional[str]:
+        """Returns the last block, if any"""
+        done="\n".join(self.block) if self.block else None
+        self.block=[]
+        return done
+
+def stream_contributions(path:str,commit_sha:Optional[str]=None,revisions:Optional[Iterable[str]]=None,exclude:Optional[Iterable[str]]=None,window:Optional[HistoryWindow]=None)->Iterator[list[dict[str]]]:
+    """Streams parsed contributions, one commit at a time
+
+    Args:
+        path (str): path to git directory
+        commit_sha (Optional[str], optional): Commit's hash value. Defaults to None.
+        revisions (Optional[Iterable[str]], optional): Revisions to walk instead of commit_sha and all refs. Defaults to None.
+        exclude (Optional[Iterable[str]], optional): Revisions whose history must not be walked. Defaults to None.
+        window (Optional[HistoryWindow], optional): Branches, dates and number of commits to walk, its ref is not used (look at HistoryWindow). Defaults to the whole history of every ref.
+
+    Yields:
+        Iterator[list[dict[str]]]: contributions of each commit (look at parse_block)
+    """
+    for block in iter_log_blocks(path,commit_sha,revisions,exclude,window=window):
+        yield parse_block(block)
+
+def get_renames(path:str,commit_sha:Optional[str]=None,revisions:Optional[Iterable[str]]=None,exclude:Optional[Iterable[str]]=None,window:Optional[HistoryWindow]=None)->dict[str,str]:
+    """Collects the raw file renames found in history, without resolving them against the tracked files
+
+    Args:
+        path (str): path to git directory
+        commit_sha (Optional[str], optional): Commit's hash value. Defaults to None.
+        revisions (Optional[Iterable[str]], optional): Revisions to walk instead of commit_sha and all refs. Defaults to None.
+        exclude (Optional[Iterable[str]], optional): Revisions whose history must not be walked. Defaults to None.
+        window (Optional[HistoryWindow], optional): Branches, dates and number of commits to walk, its ref is not used (look at HistoryWindow). Defaults to the whole history of every ref.
+
+    Returns:
+        dict[str,str]: old path to new path mapping. When a path has been renamed more than once the oldest rename is kept
+    """
     # git log --diff-filter=R --name-status --pretty=format:
     repo=Path(path).resolve().as_posix()
-    head=commit_sha
-    if not commit_sha:
-        head=get_head_commit(path)
-    no_commits=count_commits(repo,head)
-    c_slice=ceil(no_commits/max_worker)
-    cmds=[]
+    head,rev_args,stdin=_select_revisions(path,commit_sha,revisions,exclude,window)
+    cmd=_log_builder(repo,head,'',False,None,None,None,None,"--name-status","--diff-filter=R",*rev_args)
     alias_map=dict()
-    current_files=set(subprocess.check_output(_cmd_builder("ls-files",repo=repo),shell=True).decode()[:-1].split('\n'))
-    for i in range(max_worker):
-        cmds.append(_log_builder(repo,head,'',False,c_slice,i*c_slice,None,None,"--name-status","--all","--diff-filter=R"))
-    with ThreadPoolExecutor(max_workers=max_worker) as executor:
-        worker=partial(subprocess.check_output,shell=True)
-        results=executor.map(worker,cmds)
-    blocks:list[str]=[]
-    for res in results:
-        b=res.decode().split("\n\n")
-        for l_block in b:
-            lines=l_block.split("\n")
-            blocks.extend(lines)
-    for b in blocks:
-        if b=="":
+    for line in _stream_command(cmd,stdin):
+        fields=line.split("\t")
+        if len(fields)!=3:
+            # skip anything which is not a rename line instead of dropping the whole map
             continue
-        try:
-            _,old,new=b.split("\t")
-            alias_map[old]=new.strip("\n")
-        except ValueError:
-            # print([b])
-            return dict()
+        alias_map[fields[1]]=fields[2]
+    return alias_map
+
+def resolve_aliases(alias_map:dict[str,str],current_files:Iterable[str])->dict[str,str]:
+    """Follows rename chains so that every renamed path points to a currently tracked file
+
+    Args:
+        alias_map (dict[str,str]): raw renames (look at get_renames)
+        current_files (Iterable[str]): currently tracked files
+
+    Returns:
+        dict[str,str]: old path to tracked path mapping
+    """
+    current_files=set(current_files)
     final_alias_map=dict()
     for k,v in alias_map.items():
         if v in alias_map:
@@ -88,6 +398,91 @@ def get_aliases(path:str,commit_sha:Optional[str]=None)->dict[str]:
             final_alias_map[k]=v
 
     return final_alias_map
+
+def get_aliases(path:str,commit_sha:Optional[str]=None)->dict[str]:
+    """Maps every renamed path to the currently tracked file it became.
+    This walks the history on its own, when logs are parsed anyway prefer resolving ContributionColumns.renames
+
+    Args:
+        path (str): path to git directory
+        commit_sha (Optional[str], optional): Commit's hash value. Defaults to None.
+
+    Returns:
+        dict[str]: old path to tracked path mapping
+    """
+    return resolve_aliases(get_renames(path,commit_sha),get_tracked_files(path))
+
+def get_tracked_files(path:str,commit_sha:Optional[str]=None,pathspecs:Optional[Iterable[str]]=None)->set[str]:
+    """Lists the files tracked at a certain revision. The tree is read instead of the index, so bare repositories (e.g. mirrors) are supported
+
+    Args:
+        path (str): path to git directory, or a RepoSession memoizing the result
+        commit_sha (Optional[str], optional): Commit's hash value. Defaults to HEAD.
+        pathspecs (Optional[Iterable[str]], optional): git pathspecs the files must match (look at build_pathspecs). Defaults to None.
+
+    Returns:
+        set[str]: tracked file paths
+    """
+    if isinstance(path,RepoSession):
+        pathspecs=tuple(pathspecs) if pathspecs else ()
+        # a copy is returned, callers may change the set
+        return set(path.memoize(("tracked_files",commit_sha,pathspecs),lambda:_read_tracked_files(path,commit_sha,pathspecs)))
+    return _read_tracked_files(path,commit_sha,pathspecs)
+
+def _read_tracked_files(path:str,commit_sha:Optional[str],pathspecs:Optional[Iterable[str]])->set[str]:
+    return set(_check_output(_tracked_files_command(path,commit_sha,pathspecs),shell=True).decode().splitlines())
+
+def _tracked_files_command(path:str,commit_sha:Optional[str]=None,pathspecs:Optional[Iterable[str]]=None)->str:
+    repo=Path(path).resolve().as_posix()
+    head=commit_sha if commit_sha else "HEAD"
+    pathspecs=list(pathspecs) if pathspecs else []
+    if pathspecs:
+        # ls-tree does not support pathspec magic, the tree is compared with the empty one instead
+        return _cmd_builder("diff",repo,"--name-only","--no-renames","--no-ext-diff",EMPTY_TREE,head,"--",*(f'"{p}"' for p in pathspecs))
+    return _cmd_builder("ls-tree",repo,"-r","--name-only",head)
+
+def select_files(path:str,include:Optional[Iterable[str]]=None,exclude:Optional[Iterable[str]]=None,only_of_files:bool=True,commit_sha:Optional[str]=None)->tuple[set[str],list[str]]:
+    """Lists the tracked files matching include and exclude, along with the pathspecs which limit a log to them (look at build_pathspecs).
+    When only_of_files is set the extensions of the tracked files which are not source code are excluded as well, so git does not print their changes at all
+
+    Args:
+        path (str): path to git directory
+        include (Optional[Iterable[str]], optional): globs of the files to analyze. Defaults to every file.
+        exclude (Optional[Iterable[str]], optional): globs of the files to leave out. Defaults to None.
+        only_of_files (bool, optional): Exclude files not written in a known programming language. Defaults to True.
+        commit_sha (Optional[str], optional): Commit's hash value. Defaults to HEAD.
+
+    Returns:
+        tuple[set[str],list[str]]: tracked files and pathspecs for iter_log_blocks
+    """
+    selection=build_pathspecs(include,exclude)
+    current_files=get_tracked_files(path,commit_sha,selection)
+    return current_files,_log_pathspecs(current_files,selection,only_of_files)
+
+def _log_pathspecs(current_files:set[str],selection:list[str],only_of_files:bool)->list[str]:
+    if only_of_files:
+        return selection+build_pathspecs(exclude_extensions=non_source_extensions(current_files))
+    return selection
+
+def get_ref_tips(path:str,commit_sha:Optional[str]=None)->list[str]:
+    """Resolves the commits walked by default: commit_sha (or HEAD) and the tips of all refs
+
+    Args:
+        path (str): path to git directory, or a RepoSession memoizing the result
+        commit_sha (Optional[str], optional): Commit's hash value. Defaults to None.
+
+    Returns:
+        list[str]: sorted, unique commit hashes
+    """
+    if isinstance(path,RepoSession):
+        return list(path.memoize(("ref_tips",commit_sha),lambda:_read_ref_tips(path,commit_sha)))
+    return _read_ref_tips(path,commit_sha)
+
+def _read_ref_tips(path:str,commit_sha:Optional[str])->list[str]:
+    repo=Path(path).resolve().as_posix()
+    head=commit_sha if commit_sha else "HEAD"
+    cmd=_cmd_builder("rev-parse",repo,head,"--all")
+    return sorted(set(_check_output(cmd,shell=True).decode().split()))
         
 def _cmd_builder(command:str,repo:str,*args)->str:
     """Base git command generator
@@ -99,11 +494,12 @@ def _cmd_builder(command:str,repo:str,*args)->str:
     Returns:
         str: The complete command as a string
     """
-    arg_string=f"git -C \"{repo}\" {command}"
+    # paths are printed verbatim (not octal-escaped) so they match the ones read by other backends
+    arg_string=f"git -C \"{repo}\" -c core.quotePath=false {command}"
     arg_string=arg_string + " "+ " ".join(args)
     return arg_string
 
-def _log_builder(repo:str,commit:str,pretty:Optional[str]=None,merges:bool=False,max_count:Optional[int]=None,skip:Optional[int]=None,author:Optional[str]=None,follow:Optional[str]=None,*args)->str:
+def _log_builder(repo:str,commit:str,pretty:Optional[str]=None,merges:bool=False,max_count:Optional[int]=None,skip:Optional[int]=None,author:Optional[str]=None,follow:Optional[str]=None,*args,pathspecs:Optional[Iterable[str]]=None)->str:
     """Builds the complete command string for a log command
 
     Args:
@@ -115,6 +511,7 @@ def _log_builder(repo:str,commit:str,pretty:Optional[str]=None,merges:bool=False
         skip (Optional[int], optional): Parameter  for --skip flag. Defaults to None.
         author (Optional[str], optional): Filter only commits coming authored by the passed author. Defaults to None.
         follow (Optional[str], optional): Filter only commits which changed the passed file. Defaults to None.
+        pathspecs (Optional[Iterable[str]], optional): Limit the log to the files matching these git pathspecs. Defaults to None.
 
     Returns:
         str: Returns the git command string
@@ -133,27 +530,39 @@ def _log_builder(repo:str,commit:str,pretty:Optional[str]=None,merges:bool=False
     arg_list.extend(args)
     if follow!=None:
         arg_list.append(f'--follow -- "{follow}"')
+    if pathspecs:
+        if follow is None:
+            arg_list.append("--")
+        arg_list.extend(f'"{p}"' for p in pathspecs)
     return _cmd_builder("log",repo,*arg_list)
 
 def clear_files_aliases():
     pass
 
-def count_commits(path:str,commit_sha:Optional[str]=None)->int:
+def count_commits(path:str,commit_sha:Optional[str]=None,revisions:Optional[Iterable[str]]=None,exclude:Optional[Iterable[str]]=None,window:Optional[HistoryWindow]=None)->int:
     """Counts all commits reachable from a certain revision (merges excluded)
 
     Args:
-        path (str): Path to git repository
+        path (str): Path to git repository, or a RepoSession memoizing the result
         commit_sha (Optional[str], optional): Commit's hash value. Defaults to None.
+        revisions (Optional[Iterable[str]], optional): Revisions to walk instead of commit_sha and all refs. Defaults to None.
+        exclude (Optional[Iterable[str]], optional): Revisions whose history must not be counted. Defaults to None.
+        window (Optional[HistoryWindow], optional): Branches, dates and number of commits to walk, its ref is not used (look at HistoryWindow). Defaults to the whole history of every ref.
 
     Returns:
         int: number of revisions counted'
     """
+    if isinstance(path,RepoSession):
+        revisions=tuple(revisions) if revisions is not None else None
+        exclude=tuple(exclude) if exclude is not None else None
+        return path.memoize(("count_commits",commit_sha,revisions,exclude,window),lambda:_count_commits(path,commit_sha,revisions,exclude,window))
+    return _count_commits(path,commit_sha,revisions,exclude,window)
+
+def _count_commits(path:str,commit_sha:Optional[str],revisions:Optional[Iterable[str]],exclude:Optional[Iterable[str]],window:Optional[HistoryWindow])->int:
     repo=Path(path).resolve().as_posix()
-    head=commit_sha
-    if not commit_sha:
-        head=get_head_commit(path)
-    cmd=_cmd_builder("rev-list",repo,head, "--count", "--all")
-    return int(subprocess.check_output(cmd,shell=True).decode()[:-1])
+    head,rev_args,stdin=_select_revisions(path,commit_sha,revisions,exclude,window)
+    cmd=_cmd_builder("rev-list",repo,head, "--count", *rev_args)
+    return int(_check_output(cmd,shell=True,input=stdin.encode() if stdin is not None else None).decode()[:-1])
     
 
 def is_git_available()->bool:
@@ -168,29 +577,123 @@ def is_dir_a_repo(path:str)->bool:
     """Checks whether the path points to a git directory
 
     Args:
-        path (str): path to repo dir
+        path (str): path to repo dir, or a RepoSession memoizing the result
 
     Returns:
         bool: Returns wheter the directory is a repo
     """
-    cmd = f"git -C {Path(path).resolve().as_posix()} rev-parse HEAD"
+    if isinstance(path,RepoSession):
+        return path.resolve("HEAD") is not None
+    cmd = f"git -C \"{Path(path).resolve().as_posix()}\" rev-parse HEAD"
     try:
-        subprocess.check_call(cmd,shell=True,stdout=subprocess.DEVNULL)
+        _check_call(cmd,shell=True,stdout=subprocess.DEVNULL,stderr=subprocess.DEVNULL)
         return True
-    except ChildProcessError:
+    except subprocess.CalledProcessError:
         return False
 
 def get_head_commit(path:str)->str:
     """Return head commit
 
     Args:
-        path (str): path to git directory
+        path (str): path to git directory, or a RepoSession memoizing the result
 
     Returns:
         str: Returns HEAD's commit sha
     """
+    if isinstance(path,RepoSession):
+        head=path.resolve("HEAD")
+        if head is None:
+            raise subprocess.CalledProcessError(128,f"git -C \"{path}\" rev-parse HEAD")
+        return head
     cmd = f"git -C \"{Path(path).resolve().as_posix()}\" rev-parse HEAD"
-    return subprocess.check_output(cmd,shell=True).decode()[:-1]
+    return _check_output(cmd,shell=True).decode()[:-1]
+
+def resolve_commit(path:str,rev:str)->Optional[str]:
+    """Resolves a revision to a commit hash
+
+    Args:
+        path (str): path to git directory, or a RepoSession memoizing the result
+        rev (str): revision (hash, ref, relative reference...)
+
+    Returns:
+        Optional[str]: the commit hash, None if rev does not name a commit
+    """
+    if isinstance(path,RepoSession):
+        return path.resolve(rev)
+    cmd=_cmd_builder("rev-parse",Path(path).resolve().as_posix(),"--verify","--quiet",f"\"{rev}^{{commit}}\"")
+    try:
+        return _check_output(cmd,shell=True,stderr=subprocess.DEVNULL).decode().strip()
+    except subprocess.CalledProcessError:
+        return None
+
+def get_commit_date(path:str,commit_sha:str)->str:
+    """Returns the author date of a commit, in the same short format used by the logs (look at iter_log_blocks)
+
+    Args:
+        path (str): path to git directory
+        commit_sha (str): Commit's hash value
+
+    Returns:
+        str: YYYY-MM-DD author date
+    """
+    cmd=_cmd_builder("show",Path(path).resolve().as_posix(),"-s","--date=short",'--pretty="format:%ad"',commit_sha)
+    return _check_output(cmd,shell=True).decode().strip()
+
+def get_commit_delta(path:str,commit_sha:str,base:Optional[str]=None)->tuple[list[str],list[str]]:
+    """Lists the commits which make the history of commit_sha differ from the history of base, out of a single rev-list walk
+
+    Args:
+        path (str): path to git directory
+        commit_sha (str): Commit's hash value
+        base (Optional[str], optional): Commit's hash value. Defaults to None, an empty history.
+
+    Returns:
+        tuple[list[str],list[str]]: commits reachable from commit_sha but not from base, commits reachable from base but not from commit_sha. The latter is empty when base is an ancestor of commit_sha
+    """
+    repo=Path(path).resolve().as_posix()
+    if base is None:
+        return _check_output(_cmd_builder("rev-list",repo,commit_sha),shell=True).decode().split(),[]
+    added,removed=[],[]
+    for line in _check_output(_cmd_builder("rev-list",repo,"--left-right",f"{commit_sha}...{base}"),shell=True).decode().split():
+        (added if line[0]=="<" else removed).append(line[1:])
+    return added,removed
+
+def get_tree_delta(path:str,commit_sha:str,base:str)->tuple[set[str],set[str]]:
+    """Compares the files tracked at two commits without listing either tree
+
+    Args:
+        path (str): path to git directory
+        commit_sha (str): Commit's hash value
+        base (str): Commit's hash value to compare with
+
+    Returns:
+        tuple[set[str],set[str]]: files tracked at commit_sha but not at base, files tracked at base but not at commit_sha
+    """
+    cmd=_cmd_builder("diff",Path(path).resolve().as_posix(),"--name-status","--no-renames","--no-ext-diff",base,commit_sha)
+    added,removed=set(),set()
+    for line in _check_output(cmd,shell=True).decode().splitlines():
+        status,_,fname=line.partition("\t")
+        if status=="A":
+            added.add(fname)
+        elif status=="D":
+            removed.add(fname)
+    return added,removed
+
+def find_commit_before(path:str,date:str,commit_sha:Optional[str]=None)->Optional[str]:
+    """Finds the last commit on the first-parent history of commit_sha committed before a date
+
+    Args:
+        path (str): path to git directory
+        date (str): date accepted by git's --before option
+        commit_sha (Optional[str], optional): Commit's hash value. Defaults to HEAD.
+
+    Returns:
+        Optional[str]: the commit hash, None if history starts after date
+    """
+    head=commit_sha if commit_sha else "HEAD"
+    cmd=_cmd_builder("rev-list",Path(path).resolve().as_posix(),"-1","--first-parent",f"--before=\"{date}\"",head)
+    commit=_check_output(cmd,shell=True).decode().strip()
+    return commit if commit else None
 
 def create_batches(it:Iterable,n:int)->Iterable[Iterable]:
     if not n:
@@ -207,6 +710,32 @@ def create_batches(it:Iterable,n:int)->Iterable[Iterable]:
         batches.append(tmp[i:i+n])
     return tuple(batches)
 
+def _join_rename_path(prefix:str,middle:str,suffix:str)->str:
+    if not middle:
+        # "dir/{ => sub}/file" means "dir/file" became "dir/sub/file"
+        return prefix+suffix[1:] if suffix.startswith("/") else prefix+suffix
+    return prefix+middle+suffix
+
+def parse_rename(fname:str)->Optional[tuple[str,str]]:
+    """Splits the rename notation used by numstat ("old => new" or "dir/{old => new}/file") into the old and new paths
+
+    Args:
+        fname (str): path as printed by git log --numstat
+
+    Returns:
+        Optional[tuple[str,str]]: old and new path, None if fname is not a rename
+    """
+    if " => " not in fname:
+        return None
+    start=fname.find("{")
+    end=fname.find("}",start+1)
+    if start!=-1 and end!=-1 and " => " in fname[start:end]:
+        prefix,suffix=fname[:start],fname[end+1:]
+        old,new=fname[start+1:end].split(" => ",1)
+        return _join_rename_path(prefix,old,suffix),_join_rename_path(prefix,new,suffix)
+    old,new=fname.split(" => ",1)
+    return old,new
+
 def parse_block(block:str)->list[dict[str]]:
     contributions=dict()
     tmp=block.strip("\n").split("\n",1)
@@ -221,6 +750,8 @@ def parse_block(block:str)->list[dict[str]]:
             inserted,deleted,fname=line.split('\t')
             inserted=int(inserted) if inserted!="-" else 0 
             deleted=int(deleted) if deleted!="-" else 0 
+            if " => " in fname:
+                fname=parse_rename(fname)[1]
             contributions.append(dict(author=author,date=date,fname=fname,inserted=inserted,deleted=deleted,tot_contributions=inserted+deleted))
         except ValueError:
             continue
@@ -233,14 +764,351 @@ def _parse_logs(blocks:list[str])->list[str]:
     return contr
 
 def parse_logs(logs:str)->list[dict[str]]:
-    contributions=[]
-    blocks=logs.split('\n\n')
-    batches=create_batches(blocks,ceil(len(blocks)/max_worker))
-    with ThreadPoolExecutor(max_worker) as executor:
-        results=executor.map(_parse_logs,batches)
-    for r in results:
-        contributions.extend(r)
-    return contributions
+    return _parse_logs(logs.split('\n\n'))
+
+def parse_commit_block(block:str)->Optional[tuple[str,str,list[tuple[int,int,str]],list[tuple[str,str]]]]:
+    """Parses a commit block (look at iter_log_blocks)
+
+    Args:
+        block (str): commit block
+
+    Returns:
+        Optional[tuple[str,str,list[tuple[int,int,str]],list[tuple[str,str]]]]: author, date, (inserted, deleted, path) of each changed file and (old path, new path) of each renamed file. None for empty blocks
+    """
+    lines=block.strip("\n").split("\n")
+    if not lines[0]:
+        return None
+    author,date=lines[0].rsplit("|",1)
+    stats=[]
+    renames=[]
+    for line in lines[1:]:
+        try:
+            inserted,deleted,fname=line.split('\t')
+            inserted=int(inserted) if inserted!="-" else 0
+            deleted=int(deleted) if deleted!="-" else 0
+        except ValueError:
+            continue
+        if " => " in fname:
+            rename=parse_rename(fname)
+            renames.append(rename)
+            fname=rename[1]
+        stats.append((inserted,deleted,fname))
+    return author,date,stats,renames
+
+class ContributionColumns:
+    """Column buffers of parsed contributions.
+    Line counts are stored in int32 arrays, authors, dates and file names as integer codes of their interned values.
+    Contributions to renamed files are recorded under the new path, renames collects the old path to new path mapping (look at get_renames)
+    """
+    def __init__(self):
+        self.renames:dict[str,str]=dict()
+        self.authors:dict[str,int]=dict()
+        self.dates:dict[str,int]=dict()
+        self.files:dict[str,int]=dict()
+        self.author=array("i")
+        self.date=array("i")
+        self.fname=array("i")
+        self.inserted=array("i")
+        self.deleted=array("i")
+
+    def __len__(self)->int:
+        return len(self.fname)
+
+    def append_block(self,block:str):
+        """Parses a commit block (look at iter_log_blocks) appending its contributions
+
+        Args:
+            block (str): commit block
+        """
+        commit=parse_commit_block(block)
+        if commit is not None and commit[2]:
+            self.append_commit(*commit)
+
+    def append_commit(self,author:str,date:str,stats:Iterable[tuple[int,int,str]],renames:Iterable[tuple[str,str]]=()):
+        """Appends the contributions of a commit
+
+        Args:
+            author (str): author name
+            date (str): YYYY-MM-DD author date
+            stats (Iterable[tuple[int,int,str]]): inserted lines, deleted lines and path (the new one for renamed files) of each changed file
+            renames (Iterable[tuple[str,str]], optional): old and new path of each renamed file. Defaults to ().
+        """
+        author_code=self.authors.setdefault(author,len(self.authors))
+        date_code=self.dates.setdefault(date,len(self.dates))
+        files=self.files
+        for inserted,deleted,fname in stats:
+            self.author.append(author_code)
+            self.date.append(date_code)
+            self.fname.append(files.setdefault(fname,len(files)))
+            self.inserted.append(inserted)
+            self.deleted.append(deleted)
+        for old,new in renames:
+            self.renames[old]=new
+
+    def extend(self,other:"ContributionColumns"):
+        """Appends the contributions of another buffer, translating its codes into this buffer's ones
+
+        Args:
+            other (ContributionColumns): buffer to append
+        """
+        for column,values,mapping in (("author",other.author,self._merge_values(self.authors,other.authors)),
+                                     ("date",other.date,self._merge_values(self.dates,other.dates)),
+                                     ("fname",other.fname,self._merge_values(self.files,other.files))):
+            getattr(self,column).extend(array("i",[mapping[code] for code in values]))
+        self.inserted.extend(other.inserted)
+        self.deleted.extend(other.deleted)
+        # other holds older commits, whose renames take precedence as in get_renames
+        self.renames.update(other.renames)
+
+    @staticmethod
+    def _merge_values(codes:dict[str,int],other:dict[str,int])->list[int]:
+        return [codes.setdefault(value,len(codes)) for value in other]
+
+def _parse_chunk(chunk:str)->ContributionColumns:
+    columns=ContributionColumns()
+    for block in chunk.split("\n\n"):
+        columns.append_block(block)
+    return columns
+
+def _chunk_blocks(blocks:Iterable[str],chunk_size:int)->Iterator[str]:
+    chunk:list[str]=[]
+    size=0
+    for block in blocks:
+        chunk.append(block)
+        size+=len(block)
+        if size>=chunk_size:
+            yield "\n\n".join(chunk)
+            chunk=[]
+            size=0
+    if chunk:
+        yield "\n\n".join(chunk)
+
+def parse_blocks_columnar(blocks:Iterable[str],workers:Optional[int]=None,chunk_size:int=PARSE_CHUNK_SIZE)->ContributionColumns:
+    """Parses commit blocks into column buffers.
+    Blocks are grouped in chunks of about chunk_size characters; with more than one worker, as soon as there is more than one chunk, chunks are parsed by a pool of workers (look at ExecutionContext) while the rest of the blocks is still being read.
+    Worker processes are spawned, so scripts using them must guard their entry point with if __name__=="__main__"
+
+    Args:
+        blocks (Iterable[str]): commit blocks (look at iter_log_blocks)
+        workers (Optional[int], optional): Maximum number of workers, 1 parses in the calling process. Defaults to the parse_workers of the current execution context, i.e. parsing in the calling process.
+        chunk_size (int, optional): Size in characters of the chunks sent to the workers. Defaults to PARSE_CHUNK_SIZE.
+
+    Returns:
+        ContributionColumns: parsed contributions
+    """
+    workers=workers if workers is not None else current_context().parse_workers
+    with tracing.stage("parse_logs") as span:
+        columns=_parse_blocks_columnar(blocks,workers,chunk_size,span)
+        span.rows=len(columns)
+    return columns
+
+def _parse_blocks_columnar(blocks:Iterable[str],workers:int,chunk_size:int,span:tracing.Span)->ContributionColumns:
+    columns=ContributionColumns()
+    if workers<=1:
+        for block in blocks:
+            columns.append_block(block)
+        return columns
+    executor=None
+    futures=[]
+    pending=None
+    try:
+        for chunk in _chunk_blocks(blocks,chunk_size):
+            if executor is None:
+                if pending is None:
+                    pending=chunk
+                    continue
+                executor=current_context().executor(workers)
+                span.workers=workers
+                futures.append(executor.submit(_parse_chunk,pending))
+            futures.append(executor.submit(_parse_chunk,chunk))
+        if executor is None:
+            return _parse_chunk(pending) if pending is not None else columns
+        for future in futures:
+            columns.extend(future.result())
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return columns
+
+def _split_log(logs:str,n:int)->Iterator[str]:
+    start=0
+    step=ceil(len(logs)/n)
+    while start<len(logs):
+        end=logs.find("\n\n",start+step)
+        if end==-1:
+            end=len(logs)
+        yield logs[start:end]
+        start=end+2
+
+def parse_logs_columnar(logs:str,workers:Optional[int]=None,chunk_size:int=PARSE_CHUNK_SIZE)->ContributionColumns:
+    """Parses formatted logs (look at write_logs) into column buffers, splitting large logs in ranges parsed by a pool of workers (look at ExecutionContext).
+    Worker processes are spawned, so scripts using them must guard their entry point with if __name__=="__main__"
+
+    Args:
+        logs (str): raw logs
+        workers (Optional[int], optional): Maximum number of workers, 1 parses in the calling process. Defaults to the parse_workers of the current execution context, i.e. parsing in the calling process.
+        chunk_size (int, optional): Minimum size in characters of the ranges sent to the workers. Defaults to PARSE_CHUNK_SIZE.
+
+    Returns:
+        ContributionColumns: parsed contributions
+    """
+    workers=workers if workers is not None else current_context().parse_workers
+    n_ranges=min(workers,ceil(len(logs)/chunk_size))
+    if n_ranges<=1:
+        return _parse_chunk(logs)
+    columns=ContributionColumns()
+    with current_context().executor(n_ranges) as executor:
+        for result in executor.map(_parse_chunk,_split_log(logs,n_ranges)):
+            columns.extend(result)
+    return columns
+
+class ContributionAggregator:
+    """Per (path, author) sums of inserted and deleted lines, folded in as commits are parsed.
+    Contributions are not kept, so memory grows with the paths and authors found in history rather than with the number of commits.
+    No first-author record is kept. The DOA definition takes the author who created the file, but compute_DOA has always credited the alphabetically first
+    author among the ones who changed it. That is a known deviation, kept only so that every path gives identical results (look at compute_DOA_from_aggregates)
+    """
+    def __init__(self):
+        self.renames:dict[str,str]=dict()
+        self.authors:dict[str,int]=dict()
+        self.files:dict[str,int]=dict()
+        self.index:dict[tuple[int,int],int]=dict()
+        self.inserted=array("q")
+        self.deleted=array("q")
+
+    def __len__(self)->int:
+        return len(self.index)
+
+    def _add(self,fname:int,author:int,inserted:int,deleted:int):
+        i=self.index.setdefault((fname,author),len(self.index))
+        if i==len(self.inserted):
+            self.inserted.append(inserted)
+            self.deleted.append(deleted)
+        else:
+            self.inserted[i]+=inserted
+            self.deleted[i]+=deleted
+
+    def append_block(self,block:str):
+        """Parses a commit block (look at iter_log_blocks) adding its contributions
+
+        Args:
+            block (str): commit block
+        """
+        commit=parse_commit_block(block)
+        if commit is not None and commit[2]:
+            self.append_commit(*commit)
+
+    def append_commit(self,author:str,date:str,stats:Iterable[tuple[int,int,str]],renames:Iterable[tuple[str,str]]=()):
+        """Adds the contributions of a commit, look at ContributionColumns.append_commit. Dates are not needed by the DOA model and are dropped"""
+        author_code=self.authors.setdefault(author,len(self.authors))
+        files=self.files
+        for inserted,deleted,fname in stats:
+            self._add(files.setdefault(fname,len(files)),author_code,inserted,deleted)
+        for old,new in renames:
+            self.renames[old]=new
+
+    def add_columns(self,columns:ContributionColumns):
+        """Folds parsed contributions of older commits than the ones already added
+
+        Args:
+            columns (ContributionColumns): parsed contributions
+        """
+        authors=ContributionColumns._merge_values(self.authors,columns.authors)
+        files=ContributionColumns._merge_values(self.files,columns.files)
+        for fname,author,inserted,deleted in zip(columns.fname,columns.author,columns.inserted,columns.deleted):
+            self._add(files[fname],authors[author],inserted,deleted)
+        self.renames.update(columns.renames)
+
+    def per_file(self,current_files:Iterable[str],only_of_files:bool=True)->dict[str,dict[str,tuple[int,int]]]:
+        """Sums the contributions of each author to each current file, following renames, as aggregate_contributions does on create_contribution_dataframe
+
+        Args:
+            current_files (Iterable[str]): files tracked at the analyzed revision
+            only_of_files (bool, optional): Keep only files written in a known programming language. Defaults to True.
+
+        Returns:
+            dict[str,dict[str,tuple[int,int]]]: file -> author -> inserted and deleted lines, authors who never changed a line of a file are left out
+        """
+        current_files=set(current_files)
+        alias_map=resolve_aliases(self.renames,current_files)
+        names=[alias_map.get(f,f) for f in self.files]
+        if only_of_files:
+            exts=resolve_programming_languages(infer_programming_language(n for n in names if n in current_files))
+            targets=[n if n in current_files and file_extension(n) in exts else None for n in names]
+        else:
+            targets=[n if n in current_files else None for n in names]
+        authors=list(self.authors)
+        per_file:dict[str,dict[str,tuple[int,int]]]=dict()
+        for (fname,author),i in self.index.items():
+            target=targets[fname]
+            if target is None:
+                continue
+            # paths merged by renames share their target
+            per_author=per_file.setdefault(target,dict())
+            inserted,deleted=per_author.get(authors[author],(0,0))
+            per_author[authors[author]]=(inserted+self.inserted[i],deleted+self.deleted[i])
+        for fname in list(per_file):
+            per_author={a:lines for a,lines in per_file[fname].items() if lines[0]+lines[1]!=0}
+            if per_author:
+                per_file[fname]=per_author
+            else:
+                del per_file[fname]
+        return per_file
+
+def aggregate_blocks(blocks:Iterable[str],workers:Optional[int]=None,chunk_size:int=PARSE_CHUNK_SIZE)->ContributionAggregator:
+    """Parses commit blocks folding them into per (path, author) sums (look at ContributionAggregator), so the whole history is never held in memory.
+    With more than one worker, chunks of about chunk_size characters are parsed by a pool of workers (look at parse_blocks_columnar), at most two chunks per worker are in flight
+
+    Args:
+        blocks (Iterable[str]): commit blocks (look at iter_log_blocks)
+        workers (Optional[int], optional): Maximum number of workers, 1 parses in the calling process. Defaults to the parse_workers of the current execution context.
+        chunk_size (int, optional): Size in characters of the chunks sent to the workers. Defaults to PARSE_CHUNK_SIZE.
+
+    Returns:
+        ContributionAggregator: aggregated contributions
+    """
+    workers=workers if workers is not None else current_context().parse_workers
+    aggregator=ContributionAggregator()
+    with tracing.stage("parse_logs") as span:
+        if workers<=1:
+            for block in blocks:
+                aggregator.append_block(block)
+        else:
+            _aggregate_chunks(aggregator,blocks,workers,chunk_size,span)
+        span.rows=len(aggregator)
+    return aggregator
+
+def _aggregate_chunks(aggregator:ContributionAggregator,blocks:Iterable[str],workers:int,chunk_size:int,span:tracing.Span):
+    executor=None
+    futures=deque()
+    pending=None
+    try:
+        for chunk in _chunk_blocks(blocks,chunk_size):
+            # as in _parse_blocks_columnar, no pool is started for a single chunk
+            if executor is None:
+                if pending is None:
+                    pending=chunk
+                    continue
+                executor=current_context().executor(workers)
+                span.workers=workers
+                futures.append(executor.submit(_parse_chunk,pending))
+            futures.append(executor.submit(_parse_chunk,chunk))
+            if len(futures)>=2*workers:
+                aggregator.add_columns(futures.popleft().result())
+        if executor is None:
+            if pending is not None:
+                aggregator.add_columns(_parse_chunk(pending))
+            return
+        while futures:
+            aggregator.add_columns(futures.popleft().result())
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+def file_extension(fname:str)->str:
+    """Extension of a file path with the leading dot, empty when there is none"""
+    parts=fname.rsplit(".",1)
+    return "."+parts[1] if len(parts)>1 else ""
 
 def infer_programming_language(files:Iterable[str])->set[str]:
         fs=set(files)
@@ -253,8 +1121,88 @@ def infer_programming_language(files:Iterable[str])->set[str]:
                 pass
         return ret_suffixes
 
-def resolve_programming_languages(exts:Iterable[str])->set[str]:
+@lru_cache(maxsize=None)
+def _programming_language_extensions()->frozenset[str]:
     config_file=Path(__file__).parent.joinpath("data","ext.json")
     with config_file.open("r") as f:
-        config=json.load(f)
-    return {ext for ext in exts if ext in config}
\ No newline at end of file
+        return frozenset(json.load(f))
+
+def resolve_programming_languages(exts:Iterable[str])->set[str]:
+    config=_programming_language_extensions()
+    return {ext for ext in exts if ext in config}
+
+def build_pathspecs(include:Optional[Iterable[str]]=None,exclude:Optional[Iterable[str]]=None,exclude_extensions:Iterable[str]=())->list[str]:
+    """Turns path globs and file extensions into git pathspecs, so that git itself skips the files which would be discarded.
+    Globs follow git's glob magic: * does not match /, **/ matches any number of directories
+
+    Args:
+        include (Optional[Iterable[str]], optional): globs of the files to analyze, relative to the repository root. Defaults to every file.
+        exclude (Optional[Iterable[str]], optional): globs of the files to leave out. Defaults to None.
+        exclude_extensions (Iterable[str], optional): extensions (with the leading dot) of the files to leave out, look at non_source_extensions. Defaults to ().
+
+    Returns:
+        list[str]: pathspecs, empty when every file is analyzed
+    """
+    pathspecs=[f":(glob){pattern}" for pattern in include or ()]
+    pathspecs.extend(f":(glob,exclude){pattern}" for pattern in exclude or ())
+    pathspecs.extend(f":(glob,exclude)**/*{ext}" for ext in sorted(exclude_extensions))
+    return pathspecs
+
+def non_source_extensions(files:Iterable[str])->set[str]:
+    """Extensions of the given files which are not of a known programming language, i.e. the ones filter_files_of_interest drops.
+    Excluding them from the log (look at build_pathspecs) means contributions made to a file before it was renamed from one of them to a source file are not counted
+
+    Args:
+        files (Iterable[str]): file paths, usually the tracked ones
+
+    Returns:
+        set[str]: extensions with the leading dot
+    """
+    exts=infer_programming_language(files)
+    return exts-resolve_programming_languages(exts)
+@dataclass
+class TruckFactorResult:
+    """Outcome of the greedy truck factor algorithm.
+    removed_authors lists the authors in removal order, orphaned_files the files left without a major author by each removal
+    """
+    truck_factor:int
+    removed_authors:list[Hashable]=field(default_factory=list)
+    orphaned_files:list[list[Hashable]]=field(default_factory=list)
+    n_files:int=0
+
+def greedy_truck_factor(authorship:Iterable[tuple[Hashable,Hashable]],orphan_files_threashold:float=0.5)->TruckFactorResult:
+    """Greedy truck factor algorithm on an author -> files index.
+    Authors are removed in decreasing order of authored files (ties broken by author) until the files still having a major author are not more than orphan_files_threashold of the total.
+    Every removal only updates the per file author counters of the removed author's files
+
+    Args:
+        authorship (Iterable[tuple[Hashable,Hashable]]): (file, major author) pairs
+        orphan_files_threashold (float, optional): Value between 0 and 1 which determines when to stop calculating the truck factor. Defaults to 0.5.
+
+    Returns:
+        TruckFactorResult: truck factor, removed authors and files orphaned at each step
+    """
+    author_files:dict[Hashable,set[Hashable]]=dict()
+    authors_per_file:dict[Hashable,int]=dict()
+    for fname,author in authorship:
+        files=author_files.setdefault(author,set())
+        if fname not in files:
+            files.add(fname)
+            authors_per_file[fname]=authors_per_file.get(fname,0)+1
+    n_files=len(authors_per_file)
+    quorum=n_files*orphan_files_threashold
+    remaining=n_files
+    result=TruckFactorResult(0,n_files=n_files)
+    for author in sorted(author_files,key=lambda a:(-len(author_files[a]),a)):
+        orphaned=[]
+        for fname in author_files[author]:
+            authors_per_file[fname]-=1
+            if authors_per_file[fname]==0:
+                orphaned.append(fname)
+        remaining-=len(orphaned)
+        result.truck_factor+=1
+        result.removed_authors.append(author)
+        result.orphaned_files.append(sorted(orphaned))
+        if remaining<=quorum:
+            break
+    return result
@@ -1,45 +1,268 @@
 
 from tempfile import gettempdir
+from contextlib import nullcontext
+from contextvars import copy_context
 from .helper import *
+from . import tracing
+from .tracing import Tracer
+from .execution import ExecutionContext,use_context
+from .backends import CLIBackend,DEFAULT_BACKEND,GitBackend
+from .core import rollup_truck_factor,truck_factor_sweep
 import pandas as pd
-from math import log1p
+import numpy as np
+
+CONTRIBUTION_COLUMNS=["author","date","fname","inserted","deleted","tot_contributions"]
 
 def _filter_dead_files(df:pd.DataFrame,current_files:Iterable[str])->pd.DataFrame:
     new_df=df.loc[df["fname"].isin(current_files)]
     return new_df
 
 def filter_files_of_interest(df:pd.DataFrame):
-    files=df["fname"].unique()
-    exts=infer_programming_language(files)
-    # print(exts)
-    exts=resolve_programming_languages(exts)
-    # print(exts)
-    tmp_df=df.copy()
-    tmp_df["ext"]=df["fname"].apply(lambda f: "."+f.rsplit(".",1)[1] if len(f.rsplit(".",1))>1 else "")
-    tmp_df=tmp_df.loc[tmp_df["ext"].isin(exts)]
+    fname=df["fname"]
+    # extensions are classified once per distinct file name instead of once per row
+    if isinstance(fname.dtype,pd.CategoricalDtype):
+        names=fname.cat.categories
+        codes=fname.cat.codes.to_numpy()
+    else:
+        names=pd.Index(fname.unique())
+        codes=names.get_indexer(fname)
+    name_exts=np.array([file_extension(f) for f in names],dtype=object)
+    exts=resolve_programming_languages(name_exts)
+    is_source=np.array([ext in exts for ext in name_exts],dtype=bool)
+    keep=is_source[codes] if len(names) else np.zeros(len(df),dtype=bool)
+    tmp_df=df.loc[keep].copy()
+    tmp_df["ext"]=name_exts[codes[keep]]
     tmp_df.reset_index(drop=True,inplace=True)
     return tmp_df
 
-def create_contribution_dataframe(repo:str,only_of_files=True)->pd.DataFrame:
-    with ThreadPoolExecutor(max_workers=max_worker) as executor:
-        logs=executor.submit(write_logs,repo)
-        alias_map=executor.submit(get_aliases,repo)
-        current_files=set(subprocess.check_output(f"git -C \"{repo}\" ls-files",shell=True).decode()[:-1].split('\n'))
-    contributions=parse_logs(logs.result())
-    df=pd.DataFrame(contributions)
-    df["date"]=pd.to_datetime(df["date"])
-    df.replace(alias_map.result(),inplace=True)
-    df=_filter_dead_files(df,current_files)
+def _categorical(values:dict[str,int],codes:array)->pd.Categorical:
+    # categories are sorted so that grouping orders categorical keys as it would order plain strings
+    categorical=pd.Categorical.from_codes(np.frombuffer(codes,dtype=np.int32),categories=list(values))
+    return categorical.set_categories(sorted(values))
+
+def columns_to_dataframe(columns:ContributionColumns)->pd.DataFrame:
+    """Builds the raw contribution dataframe out of parsed column buffers (look at parse_blocks_columnar)
+
+    Args:
+        columns (ContributionColumns): parsed contributions
+
+    Returns:
+        pd.DataFrame: contributions dataframe with categorical author and fname columns
+    """
+    inserted=np.frombuffer(columns.inserted,dtype=np.int32)
+    deleted=np.frombuffer(columns.deleted,dtype=np.int32)
+    dates=pd.to_datetime(pd.Index(list(columns.dates),dtype=object))
+    return pd.DataFrame({
+        "author":_categorical(columns.authors,columns.author),
+        "date":dates.take(np.frombuffer(columns.date,dtype=np.int32)),
+        "fname":_categorical(columns.files,columns.fname),
+        "inserted":inserted,
+        "deleted":deleted,
+        "tot_contributions":inserted+deleted,
+    },columns=CONTRIBUTION_COLUMNS)
+
+def concat_contribution_dataframes(dfs:Iterable[pd.DataFrame])->pd.DataFrame:
+    """Concatenates contribution dataframes keeping author and fname categorical
+
+    Args:
+        dfs (Iterable[pd.DataFrame]): contributions dataframes
+
+    Returns:
+        pd.DataFrame: concatenated dataframe
+    """
+    dfs=list(dfs)
+    for column in ("author","fname"):
+        categories=sorted(set().union(*(df[column].cat.categories for df in dfs)))
+        dfs=[df.assign(**{column:df[column].cat.set_categories(categories)}) for df in dfs]
+    return pd.concat(dfs,ignore_index=True)
+
+def _apply_aliases(df:pd.DataFrame,alias_map:dict[str,str])->pd.DataFrame:
+    """Renames files by remapping the categories of the fname column, merging categories which end up with the same name"""
+    if not alias_map:
+        return df
+    fname=df["fname"].cat
+    names=[alias_map.get(c,c) for c in fname.categories]
+    new_codes,new_categories=pd.factorize(pd.Index(names,dtype=object),sort=True)
+    codes=fname.codes.to_numpy()
+    codes=np.where(codes>=0,new_codes[codes],-1)
+    df=df.copy()
+    df["fname"]=pd.Categorical.from_codes(codes,categories=new_categories)
+    return df
+
+def create_contribution_dataframe(repo:str,only_of_files=True,cache_dir:Optional[str]=None,backend:Optional[GitBackend]=None,context:Optional[ExecutionContext]=None,include:Optional[Iterable[str]]=None,exclude:Optional[Iterable[str]]=None,window:Optional[HistoryWindow]=None)->pd.DataFrame:
+    """Creates the dataframe of all contributions to the currently tracked files.
+    With the git CLI backend the path globs and, when only_of_files is set, the extensions of tracked files which are not source code are passed to git as pathspecs (look at select_files), so their changes are never read
+
+    Args:
+        repo (str): The path to the repository
+        only_of_files (bool, optional): Keep only files written in a known programming language. Defaults to True.
+        cache_dir (Optional[str], optional): Directory of the persistent contribution cache (look at default_cache_dir), requires pyarrow. When given, only commits not already cached are read from git. Defaults to None.
+        backend (Optional[GitBackend], optional): Backend used to read the repository. The cache always reads history through the git CLI. Defaults to CLIBackend.
+        context (Optional[ExecutionContext], optional): Workers and git subprocesses limits. Defaults to the current execution context.
+        include (Optional[Iterable[str]], optional): globs of the files to analyze, in git's glob syntax (look at build_pathspecs). Defaults to every file.
+        exclude (Optional[Iterable[str]], optional): globs of the files to leave out. Defaults to None.
+        window (Optional[HistoryWindow], optional): Revision to analyze, branches, dates and number of commits to read (look at HistoryWindow). Defaults to the whole history of every ref.
+
+    Raises:
+        ValueError: If path globs or a history window are given along with a backend other than the git CLI one
+        ValueError: If a history window is given along with cache_dir, the cache stores the whole history
+        ValueError: If the window's ref does not name a commit
+
+    Returns:
+        pd.DataFrame: contributions dataframe
+    """
+    with use_context(context):
+        return _create_contribution_dataframe(repo,only_of_files,cache_dir,backend,include,exclude,window)
+
+def _check_cli_backend(backend:GitBackend,include:Optional[Iterable[str]],exclude:Optional[Iterable[str]],window:HistoryWindow):
+    if (include or exclude) and not isinstance(backend,CLIBackend):
+        raise ValueError("Path globs are matched by git, they require the git CLI backend")
+    if not window.is_full() and not isinstance(backend,CLIBackend):
+        raise ValueError("History windows are applied by git, they require the git CLI backend")
+
+def _create_contribution_dataframe(repo:str,only_of_files:bool,cache_dir:Optional[str],backend:Optional[GitBackend],include:Optional[Iterable[str]],exclude:Optional[Iterable[str]],window:Optional[HistoryWindow])->pd.DataFrame:
+    backend=backend if backend is not None else DEFAULT_BACKEND
+    window=window if window is not None else FULL_HISTORY
+    if cache_dir is not None:
+        if not window.is_full():
+            raise ValueError("The contribution cache stores the whole history, it can not be read through a history window")
+        from .cache import update_contribution_cache
+        with tracing.stage("read_contributions") as span:
+            df,renames=update_contribution_cache(repo,cache_dir)
+            span.rows=len(df)
+        with tracing.stage("tracked_files"):
+            # the cache holds every file, globs only select the tracked ones
+            current_files=select_files(repo,include,exclude,False)[0] if include or exclude else backend.get_tracked_files(repo)
+    else:
+        _check_cli_backend(backend,include,exclude,window)
+        check_window(repo,window)
+        if isinstance(backend,CLIBackend):
+            # pathspecs depend on the tracked files, so they are listed before the log starts
+            with tracing.stage("tracked_files"):
+                current_files,pathspecs=select_files(repo,include,exclude,only_of_files,window.ref)
+            with tracing.stage("read_contributions") as span:
+                columns=parse_blocks_columnar(iter_log_blocks(repo,window.ref,pathspecs=pathspecs,window=window))
+                span.rows=len(columns)
+        else:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                # the worker thread runs in a copy of the caller's context, so it shares its git subprocess slots
+                current_files=executor.submit(copy_context().run,backend.get_tracked_files,repo)
+                with tracing.stage("read_contributions") as span:
+                    columns=backend.read_contributions(repo)
+                    span.rows=len(columns)
+            current_files=current_files.result()
+        return _contributions_from_columns(columns,current_files,only_of_files)
+    return _select_contributions(df,renames,current_files,only_of_files)
+
+def _contributions_from_columns(columns:ContributionColumns,current_files:set[str],only_of_files:bool)->pd.DataFrame:
+    with tracing.stage("to_dataframe") as span:
+        df=columns_to_dataframe(columns)
+        span.rows=len(df)
+    return _select_contributions(df,columns.renames,current_files,only_of_files)
+
+def _select_contributions(df:pd.DataFrame,renames:dict[str,str],current_files:set[str],only_of_files:bool)->pd.DataFrame:
+    with tracing.stage("apply_aliases") as span:
+        df=_apply_aliases(df,resolve_aliases(renames,current_files))
+        df=_filter_dead_files(df,current_files)
+        span.rows=len(df)
     if only_of_files:
-        df=filter_files_of_interest(df)
+        with tracing.stage("filter_files") as span:
+            df=filter_files_of_interest(df)
+            span.rows=len(df)
     return df
 
-def _compute_DOA(row:pd.Series):
-    DL=row["tot_contributions"]
-    FA=1 if row["author"] == row["author_FA"] else 0
-    AC=row["tot_contributions_TOT"] - DL
-    DOA=3.293 + 1.098 *  FA + 0.164* DL - 0.321 *  log1p(AC)
-    return DOA
+def aggregate_contributions(contributions:pd.DataFrame)->pd.DataFrame:
+    """Sums the contributions of each author to each file, dropping authors who never changed a line of a file
+
+    Args:
+        contributions (pd.DataFrame): contributions dataframe (Obtained from create_contribution_dataframe function)
+
+    Returns:
+        pd.DataFrame: per (fname, author) sums of inserted, deleted and tot_contributions, sorted by fname and author
+    """
+    per_author_df=contributions.groupby(["fname","author"],observed=True,sort=True)[["inserted","deleted","tot_contributions"]].sum()
+    per_author_df=per_author_df.loc[per_author_df["tot_contributions"]!=0]
+    return per_author_df.reset_index(drop=False)
+
+def aggregate_contributions_streaming(repo:str,only_of_files:bool=True,backend:Optional[GitBackend]=None,context:Optional[ExecutionContext]=None,include:Optional[Iterable[str]]=None,exclude:Optional[Iterable[str]]=None,window:Optional[HistoryWindow]=None)->pd.DataFrame:
+    """Sums the contributions of each author to each currently tracked file while the history streams, without building the contributions dataframe.
+    Memory grows with the paths and authors found in history instead of the number of commits (look at ContributionAggregator)
+
+    Args:
+        repo (str): The path to the repository
+        only_of_files (bool, optional): Keep only files written in a known programming language. Defaults to True.
+        backend (Optional[GitBackend], optional): Backend used to read the repository. Defaults to CLIBackend.
+        context (Optional[ExecutionContext], optional): Workers and git subprocesses limits. Defaults to the current execution context.
+        include (Optional[Iterable[str]], optional): globs of the files to analyze (look at create_contribution_dataframe). Defaults to every file.
+        exclude (Optional[Iterable[str]], optional): globs of the files to leave out. Defaults to None.
+        window (Optional[HistoryWindow], optional): Revision to analyze, branches, dates and number of commits to read (look at HistoryWindow). Defaults to the whole history of every ref.
+
+    Raises:
+        ValueError: If path globs or a history window are given along with a backend other than the git CLI one
+        ValueError: If the window's ref does not name a commit
+
+    Returns:
+        pd.DataFrame: the same per (fname, author) sums aggregate_contributions computes on create_contribution_dataframe
+    """
+    backend=backend if backend is not None else DEFAULT_BACKEND
+    window=window if window is not None else FULL_HISTORY
+    _check_cli_backend(backend,include,exclude,window)
+    with use_context(context):
+        check_window(repo,window)
+        if isinstance(backend,CLIBackend):
+            with tracing.stage("tracked_files"):
+                current_files,pathspecs=select_files(repo,include,exclude,only_of_files,window.ref)
+            with tracing.stage("read_contributions") as span:
+                aggregator=aggregate_blocks(iter_log_blocks(repo,window.ref,pathspecs=pathspecs,window=window))
+                span.rows=len(aggregator)
+        else:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                current_files=executor.submit(copy_context().run,backend.get_tracked_files,repo)
+                with tracing.stage("read_contributions") as span:
+                    aggregator=ContributionAggregator()
+                    for commit in backend.iter_commits(repo):
+                        aggregator.append_commit(*commit)
+                    span.rows=len(aggregator)
+            current_files=current_files.result()
+        with tracing.stage("aggregate_contributions") as span:
+            per_file=aggregator.per_file(current_files,only_of_files)
+            rows=[(fname,author,inserted,deleted) for fname in sorted(per_file) for author,(inserted,deleted) in sorted(per_file[fname].items())]
+            per_author_df=pd.DataFrame(rows,columns=["fname","author","inserted","deleted"])
+            per_author_df["tot_contributions"]=per_author_df["inserted"]+per_author_df["deleted"]
+            for column in ("fname","author"):
+                per_author_df[column]=pd.Categorical(per_author_df[column],categories=sorted(per_author_df[column].unique()))
+            span.rows=len(per_author_df)
+    return per_author_df
+
+def compute_DOA_from_aggregates(per_author_df:pd.DataFrame)->pd.DataFrame:
+    """Computes the normalized Degree Of Authorship out of per (fname, author) contribution sums.
+    FA is set for the alphabetically first author of each file rather than for its creator, as compute_DOA has always done. This is a known deviation from the DOA definition, kept for identical results
+
+    Args:
+        per_author_df (pd.DataFrame): aggregated contributions sorted by fname and author (look at aggregate_contributions)
+
+    Returns:
+        pd.DataFrame: the aggregated contributions with the DOA column added
+    """
+    #DOA=3.293 + 1.098 × FA(md, fp) + 0.164×DL(md, fp) − 0.321 × ln(1 + AC (md, fp))
+    per_author_df=per_author_df.reset_index(drop=True)
+    if per_author_df.empty:
+        per_author_df["DOA"]=pd.Series(dtype=float)
+        return per_author_df
+    files=pd.factorize(per_author_df["fname"])[0]
+    # rows are sorted by fname, so each file is a contiguous run of rows
+    is_first=np.empty(len(files),dtype=bool)
+    is_first[0]=True
+    np.not_equal(files[1:],files[:-1],out=is_first[1:])
+    starts=np.flatnonzero(is_first)
+    lengths=np.diff(np.append(starts,len(files)))
+    DL=per_author_df["tot_contributions"].to_numpy(dtype=np.int64)
+    # known deviation: FA goes to the first author in (fname, author) order, not to the file's creator
+    FA=is_first.astype(np.int64)
+    AC=np.repeat(np.add.reduceat(DL,starts),lengths) - DL
+    DOA=3.293 + 1.098 *  FA + 0.164* DL - 0.321 *  np.log1p(AC)
+    per_author_df["DOA"]=DOA/np.repeat(np.maximum.reduceat(DOA,starts),lengths)
+    return per_author_df
 
 def compute_DOA(contributions:pd.DataFrame)->pd.DataFrame:
     """Computes the Degree Of Authorship of each author for each file
@@ -52,53 +275,66 @@ def compute_DOA(contributions:pd.DataFrame)->pd.DataFrame:
     """
     if contributions.empty:
         return contributions
-    #DOA=3.293 + 1.098 × FA(md, fp) + 0.164×DL(md, fp) − 0.321 × ln(1 + AC (md, fp))
-    df=contributions.sort_values("date")
-    df=df.groupby(["fname","author","date"]).sum().reset_index(drop=False)
-    #drop all 0 contributions
-    df=df.loc[df["tot_contributions"]!=0]
-    df["DOA"]=0
-    tracked_files=df["fname"].unique()
-    per_author_df=df.groupby(["fname","author"]).sum(True).reset_index(drop=False)
-    per_file_df=per_author_df.groupby(["fname"]).sum(True)
-    first_authors=df.groupby("fname").first()
-    per_author_df_tmp=per_author_df.set_index("fname").join(first_authors,rsuffix="_FA",on="fname")
-    per_author_df_tmp=per_author_df_tmp.join(per_file_df,rsuffix="_TOT",on="fname").reset_index(inplace=False)
-    per_author_df["DOA"]=per_author_df_tmp.apply(_compute_DOA,axis=1)
-    per_author_df["DOA"]=per_author_df.groupby("fname",as_index=False)["DOA"].transform(lambda x: x/x.max())
+    with tracing.stage("aggregate_contributions") as span:
+        per_author_df=aggregate_contributions(contributions)
+        span.rows=len(per_author_df)
+    with tracing.stage("compute_DOA") as span:
+        per_author_df=compute_DOA_from_aggregates(per_author_df)
+        span.rows=len(per_author_df)
     return per_author_df
 
-def compute_truck_factor(repo:str,orphan_files_threashold:float=0.5,authorship_threshold:float=0.7)->int:
+def compute_truck_factor(repo:str,orphan_files_threashold:float=0.5,authorship_threshold:float=0.7,cache_dir:Optional[str]=None,backend:Optional[GitBackend]=None,tracer:Optional[Tracer]=None,context:Optional[ExecutionContext]=None,streaming:bool=False,include:Optional[Iterable[str]]=None,exclude:Optional[Iterable[str]]=None,window:Optional[HistoryWindow]=None)->int:
     """Compute the truck factor from a git repository
 
     Args:
-        repo (str): The path to the repository
+        repo (str): The path to the repository, or a RepoSession to reuse (look at RepoSession). A session is opened for the call otherwise
         orphan_files_threashold (float, optional): Value between 0 and 1 which determines when to stop calculating the truck factor. 1 means all files must be orphans, 0 no file must be orphan. Defaults to 0.5.
         authorship_threshold (float, optional):  Value between 0 and 1 which determines the value from which an author with a normalized DOA over a file can be considered a major file contributor. Defaults to 0.7.
+        cache_dir (Optional[str], optional): Directory of the persistent contribution cache (look at create_contribution_dataframe). Defaults to None.
+        backend (Optional[GitBackend], optional): Backend used to read the repository. Defaults to CLIBackend.
+        tracer (Optional[Tracer], optional): Records time, memory and rows of every stage of the computation, look at Tracer.report. Defaults to None.
+        context (Optional[ExecutionContext], optional): Workers and git subprocesses limits. Defaults to the current execution context.
+        streaming (bool, optional): Sum contributions while the history streams instead of building the contributions dataframe (look at aggregate_contributions_streaming), for histories too long to fit in memory. Defaults to False.
+        include (Optional[Iterable[str]], optional): globs of the files to analyze (look at create_contribution_dataframe). Defaults to every file.
+        exclude (Optional[Iterable[str]], optional): globs of the files to leave out. Defaults to None.
+        window (Optional[HistoryWindow], optional): Revision to analyze, branches, dates and number of commits to read (look at create_contribution_dataframe). Defaults to the whole history of every ref.
 
     Raises:
         ValueError: Whether the thresholds are not in the range limit or the repository is not suited for truck factor calculation
         Exception: If git CLI is not on PATH
         ValueError: If submitted repo does not point to a git repository
+        ValueError: If streaming is requested along with cache_dir, the cache stores every contribution
 
     Returns:
         int: The integer representing the truck factor for the repository
     """
     if not( (orphan_files_threashold >0 and orphan_files_threashold <=1 ) and (authorship_threshold >0 and authorship_threshold <=1 )):
         raise ValueError("All threshold values must have a value between 0 and 1")
+    if streaming and cache_dir is not None:
+        raise ValueError("Streaming aggregation does not use the contribution cache")
     #https://arxiv.org/abs/1604.06766
-    if not is_git_available():
+    backend=backend if backend is not None else DEFAULT_BACKEND
+    if (isinstance(backend,CLIBackend) or cache_dir is not None) and not is_git_available():
         raise Exception("No git CLI found on PATH")
-    if not is_dir_a_repo(repo):
-        raise ValueError(f"Path {repo} is not a git directory")
-    df=create_contribution_dataframe(repo)
-    if not( (orphan_files_threashold >0 and orphan_files_threashold <=1 ) and (authorship_threshold >0 and authorship_threshold <=1 )):
-        raise ValueError("All threshold values must have a value between 0 and 1")
-    #https://arxiv.org/abs/1604.06766
-    if df.empty:
-        raise ValueError("Repository not suited for truck factor calculation, no source code found")
-    df=compute_DOA(df)
-    return compute_truck_factor_from_contributions(df)
+    with tracing.profile(tracer) if tracer is not None else nullcontext(),use_context(context),open_session(repo) as session:
+        if not backend.is_repo(session):
+            raise ValueError(f"Path {repo} is not a git directory")
+        if streaming:
+            per_author_df=aggregate_contributions_streaming(session,backend=backend,include=include,exclude=exclude,window=window)
+            if per_author_df.empty:
+                raise ValueError("Repository not suited for truck factor calculation, no source code found")
+            with tracing.stage("compute_DOA") as span:
+                df=compute_DOA_from_aggregates(per_author_df)
+                span.rows=len(df)
+            return compute_truck_factor_from_contributions(df,orphan_files_threashold,authorship_threshold)
+        df=create_contribution_dataframe(session,cache_dir=cache_dir,backend=backend,include=include,exclude=exclude,window=window)
+        if not( (orphan_files_threashold >0 and orphan_files_threashold <=1 ) and (authorship_threshold >0 and authorship_threshold <=1 )):
+            raise ValueError("All threshold values must have a value between 0 and 1")
+        #https://arxiv.org/abs/1604.06766
+        if df.empty:
+            raise ValueError("Repository not suited for truck factor calculation, no source code found")
+        df=compute_DOA(df)
+        return compute_truck_factor_from_contributions(df,orphan_files_threashold,authorship_threshold)
     
 def compute_truck_factor_from_contributions(df:pd.DataFrame,orphan_files_threashold:float=0.5,authorship_threshold:float=0.7)->int:
     """Compute the truck factor from a contribution dataframe (Look at compute_DOA function)
@@ -114,19 +350,179 @@ def compute_truck_factor_from_contributions(df:pd.DataFrame,orphan_files_threash
     Returns:
         int: The integer representing the truck factor for the repository
     """
+    return compute_truck_factor_details(df,orphan_files_threashold,authorship_threshold).truck_factor
+
+def compute_truck_factor_details(df:pd.DataFrame,orphan_files_threashold:float=0.5,authorship_threshold:float=0.7)->TruckFactorResult:
+    """Compute the truck factor from a contribution dataframe (Look at compute_DOA function), keeping track of the removed authors
+
+    Args:
+        df (pd.DataFrame): contribution dataframe
+        orphan_files_threashold (float, optional): Value between 0 and 1 which determines when to stop calculating the truck factor. 1 means all files must be orphans, 0 no file must be orphan. Defaults to 0.5.
+        authorship_threshold (float, optional):  Value between 0 and 1 which determines the value from which an author with a normalized DOA over a file can be considered a major file contributor. Defaults to 0.7.
+
+    Returns:
+        TruckFactorResult: truck factor, ordered list of removed authors and files orphaned by each removal
+    """
+    with tracing.stage("truck_factor") as span:
+        df=df.loc[df["DOA"]>=authorship_threshold]
+        files,file_names=pd.factorize(df["fname"])
+        authors,author_names=pd.factorize(df["author"],sort=True)
+        # author codes follow the sorted names, so ties are broken by name
+        result=greedy_truck_factor(zip(files.tolist(),authors.tolist()),orphan_files_threashold)
+        span.rows=len(df)
+    result.removed_authors=[author_names[a] for a in result.removed_authors]
+    result.orphaned_files=[sorted(file_names[f] for f in step) for step in result.orphaned_files]
+    return result
+
+def compute_truck_factor_sweep(df:pd.DataFrame,orphan_files_thresholds:Iterable[float],authorship_thresholds:Iterable[float])->pd.DataFrame:
+    """Compute the truck factor for a grid of thresholds from a single contribution dataframe (Look at compute_DOA function).
+    The greedy removal order is computed once per authorship threshold and shared by all the orphan files thresholds (look at truck_factor_sweep)
+
+    Args:
+        df (pd.DataFrame): contribution dataframe
+        orphan_files_thresholds (Iterable[float]): values of orphan_files_threashold, look at compute_truck_factor_from_contributions
+        authorship_thresholds (Iterable[float]): values of authorship_threshold, look at compute_truck_factor_from_contributions
+
+    Raises:
+        ValueError: Whether a threshold is not in the range limit
+
+    Returns:
+        pd.DataFrame: truck factors indexed by authorship_threshold, with a column per orphan_files_threshold
+    """
+    orphan_files_thresholds=list(orphan_files_thresholds)
+    authorship_thresholds=list(authorship_thresholds)
+    scored=zip(df["fname"].astype(str),df["author"].astype(str),df["DOA"].tolist())
+    matrix=truck_factor_sweep(scored,orphan_files_thresholds,authorship_thresholds)
+    return pd.DataFrame(matrix,index=pd.Index(authorship_thresholds,name="authorship_threshold"),
+                        columns=pd.Index(orphan_files_thresholds,name="orphan_files_threshold"))
+
+def compute_truck_factor_by_directory(df:pd.DataFrame,depth:int=1,orphan_files_threashold:float=0.5,authorship_threshold:float=0.7)->pd.DataFrame:
+    """Compute the truck factor of every directory up to depth levels from a single contribution dataframe (Look at compute_DOA function).
+    Major authors of each file are rolled up to its enclosing directories (look at rollup_truck_factor), so the DOA is never recomputed per directory
+
+    Args:
+        df (pd.DataFrame): contribution dataframe
+        depth (int, optional): deepest directory level, 0 computes the repository truck factor only. Defaults to 1.
+        orphan_files_threashold (float, optional): Value between 0 and 1 which determines when to stop calculating the truck factor. 1 means all files must be orphans, 0 no file must be orphan. Defaults to 0.5.
+        authorship_threshold (float, optional):  Value between 0 and 1 which determines the value from which an author with a normalized DOA over a file can be considered a major file contributor. Defaults to 0.7.
+
+    Returns:
+        pd.DataFrame: directory ("." is the repository root), truck_factor, authors (in removal order) and n_files of every directory holding files with a major author, sorted by directory
+    """
     df=df.loc[df["DOA"]>=authorship_threshold]
-    orig_size=len(df["fname"].unique())
-    quorum=orig_size*orphan_files_threashold
-    per_author_files=pd.DataFrame()
-    tmp_df=df.groupby("author").count().reset_index(drop=False)
-    per_author_files["author"]=tmp_df["author"]
-    per_author_files["fname"]=tmp_df["fname"]
-    per_author_files.sort_values("fname",ascending=False,inplace=True)
-    tf=0
-    for row in per_author_files.itertuples(index=False,name="Author"):
-        author=row.author
-        df=df.loc[df["author"]!=author]
-        tf+=1
-        if len(df["fname"].unique())<=quorum:
-            break
-    return tf
\ No newline at end of file
+    results=rollup_truck_factor(zip(df["fname"].astype(str),df["author"].astype(str)),depth,orphan_files_threashold)
+    return pd.DataFrame([(directory,r.truck_factor,r.removed_authors,r.n_files) for directory,r in results.items()],
+                        columns=["directory","truck_factor","authors","n_files"])
+
+def _resolve_checkpoint(repo:str,checkpoint)->tuple[Optional[str],pd.Timestamp]:
+    """Returns the commit whose history and tree are read at a checkpoint and the date used to order checkpoints"""
+    if isinstance(checkpoint,str):
+        commit=resolve_commit(repo,checkpoint)
+        if commit is not None:
+            return commit,pd.Timestamp(get_commit_date(repo,commit))
+    date=pd.Timestamp(checkpoint).normalize()
+    return find_commit_before(repo,f"{date:%Y-%m-%d} 23:59:59"),date
+
+def compute_truck_factor_history(repo:str,checkpoints:Iterable,orphan_files_threashold:float=0.5,authorship_threshold:float=0.7,only_of_files:bool=True,context:Optional[ExecutionContext]=None)->pd.DataFrame:
+    """Computes the truck factor at several points in time out of a single log pass.
+    Every contribution is tagged with its commit; a checkpoint sums the contributions of the commits reachable from its commit, as if the history was read at that commit.
+    Checkpoints are visited in chronological order and running sums only add the commits between a checkpoint and the previous one, only a checkpoint which does not contain the previous one (e.g. a commit of another branch) regroups its whole history.
+    At each checkpoint only files alive at that time are considered, as create_contribution_dataframe does for the current files
+
+    Args:
+        repo (str): The path to the repository, or a RepoSession to reuse (look at RepoSession)
+        checkpoints (Iterable): dates (anything accepted by pd.Timestamp) or commits (revision strings). A date stands for the last commit before its end on the first-parent history of HEAD
+        orphan_files_threashold (float, optional): Look at compute_truck_factor. Defaults to 0.5.
+        authorship_threshold (float, optional): Look at compute_truck_factor. Defaults to 0.7.
+        only_of_files (bool, optional): Keep only files written in a known programming language. Defaults to True.
+        context (Optional[ExecutionContext], optional): Workers and git subprocesses limits. Defaults to the current execution context.
+
+    Raises:
+        ValueError: Whether the thresholds are not in the range limit
+
+    Returns:
+        pd.DataFrame: one row per checkpoint, in chronological order, with columns checkpoint, commit, date, truck_factor, authors (removed authors, most important first) and n_files
+    """
+    if not( (orphan_files_threashold >0 and orphan_files_threashold <=1 ) and (authorship_threshold >0 and authorship_threshold <=1 )):
+        raise ValueError("All threshold values must have a value between 0 and 1")
+    with use_context(context),open_session(repo) as session:
+        return _compute_truck_factor_history(session,checkpoints,orphan_files_threashold,authorship_threshold,only_of_files)
+
+def _read_commit_contributions(repo:str)->tuple[ContributionColumns,list[str],np.ndarray]:
+    """Reads contributions from a single log pass, returning them with the hash of every commit and the commit index of every row"""
+    columns=ContributionColumns()
+    commits:list[str]=[]
+    row_commits=array("i")
+    for block in iter_log_blocks(repo,pretty=r'%H|%an|%ad'):
+        sha,_,block=block.partition("|")
+        commit=parse_commit_block(block)
+        if commit is None:
+            continue
+        n_rows=len(columns)
+        columns.append_commit(*commit)
+        row_commits.extend([len(commits)]*(len(columns)-n_rows))
+        commits.append(sha)
+    return columns,commits,np.frombuffer(row_commits,dtype=np.int32)
+
+def _compute_truck_factor_history(repo:str,checkpoints:Iterable,orphan_files_threashold:float,authorship_threshold:float,only_of_files:bool)->pd.DataFrame:
+    points=sorted(((checkpoint,*_resolve_checkpoint(repo,checkpoint)) for checkpoint in checkpoints),key=lambda p:p[2])
+    columns,commits,row_commits=_read_commit_contributions(repo)
+    alias_map=resolve_aliases(columns.renames,get_tracked_files(repo))
+    df=_apply_aliases(columns_to_dataframe(columns),alias_map)
+    df["commit"]=row_commits
+    if only_of_files:
+        df=filter_files_of_interest(df)
+    files=df["fname"].cat.categories
+    authors=df["author"].cat.categories
+    n_authors=max(len(authors),1)
+    # pair keys sort as (fname, author), the order expected by compute_DOA_from_aggregates
+    keys=df["fname"].cat.codes.to_numpy(dtype=np.int64)*n_authors+df["author"].cat.codes.to_numpy(dtype=np.int64)
+    pairs,pair_index=np.unique(keys,return_inverse=True)
+    values=df[["inserted","deleted","tot_contributions"]].to_numpy(dtype=np.int64)
+    # rows of the i-th commit are order[bounds[i]:bounds[i+1]]
+    row_commits=df["commit"].to_numpy()
+    order=np.argsort(row_commits,kind="stable")
+    bounds=np.searchsorted(row_commits[order],np.arange(len(commits)+1))
+    commit_ids={sha:i for i,sha in enumerate(commits)}
+    def rows_of(shas:Iterable[str])->np.ndarray:
+        ids=[commit_ids[sha] for sha in shas if sha in commit_ids]
+        return np.concatenate([order[bounds[i]:bounds[i+1]] for i in ids]) if ids else np.empty(0,dtype=np.int64)
+    # running per (fname, author) sums of the commits reachable from the previous checkpoint
+    totals=np.zeros((len(pairs),3),dtype=np.int64)
+    reachable:set[str]=set()
+    live_files:set[str]=set()
+    previous=None
+    records=[]
+    for checkpoint,commit,date in points:
+        if commit is None:
+            # the history starts after the checkpoint
+            totals[:]=0
+            reachable,live_files,previous=set(),set(),None
+        else:
+            added,removed=get_commit_delta(repo,commit,previous)
+            if removed:
+                # the checkpoint does not contain the previous one, sums are regrouped from its whole history
+                reachable=(reachable-set(removed))|set(added)
+                totals[:]=0
+                rows=rows_of(reachable)
+            else:
+                reachable.update(added)
+                rows=rows_of(added)
+            np.add.at(totals,pair_index[rows],values[rows])
+            if previous is None:
+                live_files=get_tracked_files(repo,commit)
+            else:
+                new_files,deleted_files=get_tree_delta(repo,commit,previous)
+                live_files=(live_files-deleted_files)|new_files
+            previous=commit
+        live_codes=files.get_indexer(list({alias_map.get(f,f) for f in live_files}))
+        mask=np.isin(pairs//n_authors,live_codes[live_codes>=0]) & (totals[:,2]!=0)
+        key_values=pairs[mask]
+        per_author_df=pd.DataFrame({
+            "fname":pd.Categorical.from_codes(key_values//n_authors,categories=files),
+            "author":pd.Categorical.from_codes(key_values%n_authors,categories=authors),
+        })
+        per_author_df[["inserted","deleted","tot_contributions"]]=totals[mask]
+        result=compute_truck_factor_details(compute_DOA_from_aggregates(per_author_df),orphan_files_threashold,authorship_threshold)
+        records.append(dict(checkpoint=checkpoint,commit=commit,date=date,truck_factor=result.truck_factor,authors=[str(a) for a in result.removed_authors],n_files=result.n_files))
+    return pd.DataFrame(records,columns=["checkpoint","commit","date","truck_factor","authors","n_files"])
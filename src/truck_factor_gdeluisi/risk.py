@@ -0,0 +1,164 @@
+"""Precomputed index answering what-if questions on author departures ("which files become orphaned if Alice and Bob leave?") without recomputing the DOA"""
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterable,Iterator,Union
+import json
+
+INDEX_VERSION=1
+
+def _bits(mask:int)->Iterator[int]:
+    """Positions of the set bits of mask, lowest first"""
+    while mask:
+        low=mask & -mask
+        yield low.bit_length()-1
+        mask^=low
+
+class BusRiskIndex:
+    """Major authorship of the files of a repository stored as int bitsets: one bitset of file ids per author and one of author ids per file.
+    Files and authors are sorted, so ids follow their names
+
+    Args:
+        files (list[str]): sorted file paths
+        authors (list[str]): sorted author names
+        author_files (list[int]): bitset of the files each author is a major author of, by author id
+        authorship_threshold (float): normalized DOA from which an author is a major author of a file
+    """
+    def __init__(self,files:list[str],authors:list[str],author_files:list[int],authorship_threshold:float):
+        self.files=files
+        self.authors=authors
+        self.author_files=author_files
+        self.authorship_threshold=authorship_threshold
+        self._file_ids={f:i for i,f in enumerate(files)}
+        self._author_ids={a:i for i,a in enumerate(authors)}
+        self.file_authors=[0]*len(files)
+        for author,mask in enumerate(author_files):
+            for fname in _bits(mask):
+                self.file_authors[fname]|=1<<author
+        # files left without a major author by the departure of a single author
+        self._sole_files=[0]*len(authors)
+        for fname,mask in enumerate(self.file_authors):
+            if mask and mask&(mask-1)==0:
+                self._sole_files[mask.bit_length()-1]|=1<<fname
+
+    @classmethod
+    def from_pairs(cls,authorship:Iterable[tuple[str,str]],authorship_threshold:float=0.7)->"BusRiskIndex":
+        """Builds the index out of (file, major author) pairs
+
+        Args:
+            authorship (Iterable[tuple[str,str]]): (file path, author name) pairs
+            authorship_threshold (float, optional): threshold the pairs were selected with. Defaults to 0.7.
+
+        Returns:
+            BusRiskIndex: the index
+        """
+        pairs=set(authorship)
+        files=sorted({f for f,_ in pairs})
+        authors=sorted({a for _,a in pairs})
+        file_ids={f:i for i,f in enumerate(files)}
+        author_ids={a:i for i,a in enumerate(authors)}
+        author_files=[0]*len(authors)
+        for fname,author in pairs:
+            author_files[author_ids[author]]|=1<<file_ids[fname]
+        return cls(files,authors,author_files,authorship_threshold)
+
+    @classmethod
+    def from_doa(cls,doa,authorship_threshold:float=0.7)->"BusRiskIndex":
+        """Builds the index out of a DOA table
+
+        Args:
+            doa: output of compute_DOA (a dataframe with fname, author and DOA columns) or of core.compute_doa (file -> author -> DOA)
+            authorship_threshold (float, optional): normalized DOA from which an author is a major author of a file. Defaults to 0.7.
+
+        Returns:
+            BusRiskIndex: the index
+        """
+        if isinstance(doa,dict):
+            pairs=((f,a) for f,per_author in doa.items() for a,v in per_author.items() if v>=authorship_threshold)
+        else:
+            doa=doa.loc[doa["DOA"]>=authorship_threshold]
+            pairs=zip(doa["fname"].astype(str),doa["author"].astype(str))
+        return cls.from_pairs(pairs,authorship_threshold)
+
+    def _names(self,mask:int)->list[str]:
+        return [self.files[f] for f in _bits(mask)]
+
+    def files_of(self,author:str)->list[str]:
+        """Files author is a major author of, sorted. Empty for unknown authors"""
+        author_id=self._author_ids.get(author)
+        return self._names(self.author_files[author_id]) if author_id is not None else []
+
+    def orphaned_files(self,authors:Iterable[str])->list[str]:
+        """Files left without any major author if all the given authors leave
+
+        Args:
+            authors (Iterable[str]): departing authors, unknown ones are ignored
+
+        Returns:
+            list[str]: sorted file paths
+        """
+        ids={self._author_ids[a] for a in authors if a in self._author_ids}
+        if len(ids)==1:
+            return self._names(self._sole_files[ids.pop()])
+        departed=0
+        files=0
+        for author in ids:
+            departed|=1<<author
+            files|=self.author_files[author]
+        orphaned=0
+        for fname in _bits(files):
+            # every major author of the file is leaving
+            if self.file_authors[fname]&~departed==0:
+                orphaned|=1<<fname
+        return self._names(orphaned)
+
+    def key_authors(self,path:str)->list[str]:
+        """Major authors of a file, or of any file under a directory
+
+        Args:
+            path (str): file or directory path relative to the repository root, "." is the whole repository
+
+        Returns:
+            list[str]: sorted author names, a single one means path depends on one author only
+        """
+        file_id=self._file_ids.get(path)
+        if file_id is not None:
+            mask=self.file_authors[file_id]
+        else:
+            prefix="" if path in (".","") else path.rstrip("/")+"/"
+            mask=0
+            # files under the directory are a contiguous range of the sorted paths
+            for fname in range(bisect_left(self.files,prefix),len(self.files)):
+                if not self.files[fname].startswith(prefix):
+                    break
+                mask|=self.file_authors[fname]
+        return [self.authors[a] for a in _bits(mask)]
+
+    def save(self,path:Union[str,Path]):
+        """Writes the index as JSON, bitsets are stored as hexadecimal strings
+
+        Args:
+            path (Union[str,Path]): destination file
+        """
+        content=dict(version=INDEX_VERSION,authorship_threshold=self.authorship_threshold,files=self.files,authors=self.authors,
+                     author_files=[format(mask,"x") for mask in self.author_files])
+        with Path(path).open("w",encoding="utf-8") as f:
+            json.dump(content,f)
+
+    @classmethod
+    def load(cls,path:Union[str,Path])->"BusRiskIndex":
+        """Reads an index written by save
+
+        Args:
+            path (Union[str,Path]): index file
+
+        Raises:
+            ValueError: If the file was written by an incompatible version
+
+        Returns:
+            BusRiskIndex: the index
+        """
+        with Path(path).open("r",encoding="utf-8") as f:
+            content=json.load(f)
+        if content.get("version")!=INDEX_VERSION:
+            raise ValueError(f"Unsupported bus risk index version {content.get('version')}, expected {INDEX_VERSION}")
+        return cls(content["files"],content["authors"],[int(mask,16) for mask in content["author_files"]],content["authorship_threshold"])
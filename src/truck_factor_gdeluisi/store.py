@@ -0,0 +1,112 @@
+"""Columnar persistence of the contribution and DOA tables, so downstream analyses reload them instead of reading the history from git again.
+Tables are written as uncompressed Feather (Arrow IPC) files with dictionary encoded author and file name columns, which are memory mapped when loaded.
+Requires pyarrow
+"""
+from pathlib import Path
+from typing import Union
+import json
+import os
+import pandas as pd
+from .main import CONTRIBUTION_COLUMNS
+
+TABLE_VERSION=1
+# key of the schema metadata written along with the pandas one
+_METADATA_KEY=b"truck_factor_gdeluisi"
+DOA_COLUMNS=["fname","author","inserted","deleted","tot_contributions","DOA"]
+
+class StaleTableError(ValueError):
+    """Raised when a table file was written by an incompatible release or holds another kind of table, it has to be computed again"""
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError as e:
+        raise ImportError("Saving tables requires pyarrow, install it with 'pip install pyarrow'") from e
+    return pa,feather
+
+def _save_table(df:pd.DataFrame,path:Union[str,Path],kind:str,columns:list[str]):
+    pa,feather=_pyarrow()
+    missing=[c for c in columns if c not in df.columns]
+    if missing:
+        raise ValueError(f"Not a {kind} table, missing columns {missing}")
+    table=pa.Table.from_pandas(df,preserve_index=False)
+    # categorical columns are already dictionary encoded, the others keep their type
+    metadata=dict(table.schema.metadata or {})
+    metadata[_METADATA_KEY]=json.dumps(dict(version=TABLE_VERSION,kind=kind,columns=list(df.columns))).encode()
+    table=table.replace_schema_metadata(metadata)
+    path=Path(path)
+    tmp=path.with_name(path.name+".tmp")
+    # compressed buffers can not be memory mapped
+    feather.write_feather(table,tmp,compression="uncompressed")
+    os.replace(tmp,path)
+
+def _load_table(path:Union[str,Path],kind:str,columns:list[str],memory_map:bool)->pd.DataFrame:
+    _,feather=_pyarrow()
+    table=feather.read_table(Path(path).as_posix(),memory_map=memory_map)
+    raw=(table.schema.metadata or {}).get(_METADATA_KEY)
+    meta=json.loads(raw) if raw is not None else {}
+    if meta.get("version")!=TABLE_VERSION or meta.get("kind")!=kind:
+        raise StaleTableError(f"{path} is not a {kind} table of version {TABLE_VERSION} (found {meta.get('kind')} version {meta.get('version')})")
+    if not set(columns)<=set(table.column_names):
+        raise StaleTableError(f"{path} lacks columns {sorted(set(columns)-set(table.column_names))}")
+    # numeric columns without nulls are views of the mapped file
+    return table.to_pandas(split_blocks=True)
+
+def save_contributions(df:pd.DataFrame,path:Union[str,Path]):
+    """Writes a contributions dataframe (look at create_contribution_dataframe) as a Feather file
+
+    Args:
+        df (pd.DataFrame): contributions dataframe
+        path (Union[str,Path]): destination file, replaced atomically
+
+    Raises:
+        ValueError: If df lacks the contribution columns
+        ImportError: If pyarrow is not installed
+    """
+    _save_table(df,path,"contributions",CONTRIBUTION_COLUMNS)
+
+def load_contributions(path:Union[str,Path],memory_map:bool=True)->pd.DataFrame:
+    """Reads a contributions dataframe written by save_contributions
+
+    Args:
+        path (Union[str,Path]): table file
+        memory_map (bool, optional): Map the file instead of reading it. Defaults to True.
+
+    Raises:
+        StaleTableError: If the file was written by an incompatible release or does not hold contributions
+        ImportError: If pyarrow is not installed
+
+    Returns:
+        pd.DataFrame: contributions dataframe, author and fname are categorical
+    """
+    return _load_table(path,"contributions",CONTRIBUTION_COLUMNS,memory_map)
+
+def save_doa(df:pd.DataFrame,path:Union[str,Path]):
+    """Writes a DOA dataframe (look at compute_DOA) as a Feather file
+
+    Args:
+        df (pd.DataFrame): DOA dataframe
+        path (Union[str,Path]): destination file, replaced atomically
+
+    Raises:
+        ValueError: If df lacks the DOA columns
+        ImportError: If pyarrow is not installed
+    """
+    _save_table(df,path,"doa",DOA_COLUMNS)
+
+def load_doa(path:Union[str,Path],memory_map:bool=True)->pd.DataFrame:
+    """Reads a DOA dataframe written by save_doa
+
+    Args:
+        path (Union[str,Path]): table file
+        memory_map (bool, optional): Map the file instead of reading it. Defaults to True.
+
+    Raises:
+        StaleTableError: If the file was written by an incompatible release or does not hold a DOA table
+        ImportError: If pyarrow is not installed
+
+    Returns:
+        pd.DataFrame: DOA dataframe, ready for compute_truck_factor_from_contributions
+    """
+    return _load_table(path,"doa",DOA_COLUMNS,memory_map)
@@ -0,0 +1,193 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass,asdict
+from typing import Callable,Iterable,Iterator,Optional
+import threading
+import time
+import sys
+import os
+try:
+    import resource
+except ImportError:
+    # not available on Windows, peak memory is not reported there
+    resource=None
+
+# per thread (and task), so concurrent computations each record into their own tracer
+_tracer:ContextVar[Optional["Tracer"]]=ContextVar("tracer",default=None)
+
+@dataclass
+class StageRecord:
+    """Measures of one execution of a pipeline stage. process_peak_rss_mb is the peak memory of the whole process up to the end of the stage, not of the stage alone"""
+    name:str
+    wall_seconds:float
+    cpu_seconds:float
+    bytes_read:int=0
+    rows:Optional[int]=None
+    process_peak_rss_mb:Optional[float]=None
+    workers:int=1
+    start_seconds:float=0.0
+
+class Span:
+    """Open stage, set rows and workers before it ends"""
+    __slots__=("tracer","name","rows","bytes_read","workers","_wall","_cpu")
+    def __init__(self,tracer:"Tracer",name:str):
+        self.tracer=tracer
+        self.name=name
+        self.rows=None
+        self.bytes_read=0
+        self.workers=1
+
+    def __enter__(self)->"Span":
+        self.tracer._push(self)
+        self._cpu=_cpu_time()
+        self._wall=time.perf_counter()
+        return self
+
+    def __exit__(self,*exc):
+        wall=time.perf_counter()-self._wall
+        cpu=_cpu_time()-self._cpu
+        self.tracer._pop(self)
+        self.tracer._record(StageRecord(self.name,wall,cpu,self.bytes_read,self.rows,_process_peak_rss_mb(),self.workers,self._wall-self.tracer.origin))
+        return False
+
+class _NullSpan:
+    """Span handed out when tracing is disabled, every operation is a no-op"""
+    __slots__=()
+    rows=None
+    bytes_read=0
+    workers=1
+    def __enter__(self)->"_NullSpan":
+        return self
+
+    def __exit__(self,*exc):
+        return False
+
+    def __setattr__(self,name,value):
+        pass
+
+_NULL_SPAN=_NullSpan()
+
+def _cpu_time()->float:
+    # includes terminated child processes, i.e. git and parsing workers
+    t=os.times()
+    return t.user+t.system+t.children_user+t.children_system
+
+def _process_peak_rss_mb()->Optional[float]:
+    if resource is None:
+        return None
+    maxrss=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return maxrss/(1024*1024) if sys.platform=="darwin" else maxrss/1024
+
+class Tracer:
+    """Collects the measures of the pipeline stages run while it is active (look at profile)
+
+    Args:
+        callback (Optional[Callable[[StageRecord],None]], optional): Called with every stage execution as soon as it ends. Defaults to None.
+    """
+    def __init__(self,callback:Optional[Callable[[StageRecord],None]]=None):
+        self.callback=callback
+        self.records:list[StageRecord]=[]
+        self._lock=threading.Lock()
+        self._local=threading.local()
+        self.origin=time.perf_counter()
+
+    def stage(self,name:str)->Span:
+        return Span(self,name)
+
+    def _stack(self)->list[Span]:
+        stack=getattr(self._local,"stack",None)
+        if stack is None:
+            stack=self._local.stack=[]
+        return stack
+
+    def _push(self,span:Span):
+        self._stack().append(span)
+
+    def _pop(self,span:Span):
+        stack=self._stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+
+    def _record(self,record:StageRecord):
+        with self._lock:
+            self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def add_bytes(self,n:int):
+        """Adds bytes read from git to the innermost stage open in the calling thread"""
+        stack=self._stack()
+        if stack:
+            stack[-1].bytes_read+=n
+
+    def report(self)->dict:
+        """Summarizes the recorded stages, executions of the same stage are summed up
+
+        Returns:
+            dict: stages in order of first execution, each with calls, wall_seconds, cpu_seconds, bytes_read, rows, process_peak_rss_mb, workers and
+            worker_utilization (cpu time over the wall time of all workers), and the list of raw executions
+        """
+        stages:dict[str,dict]=dict()
+        with self._lock:
+            records=list(self.records)
+        # records are appended when stages end, inner stages would come before the outer ones
+        for r in sorted(records,key=lambda r:r.start_seconds):
+            s=stages.setdefault(r.name,dict(stage=r.name,calls=0,wall_seconds=0.0,cpu_seconds=0.0,bytes_read=0,rows=None,process_peak_rss_mb=None,workers=1))
+            s["calls"]+=1
+            s["wall_seconds"]+=r.wall_seconds
+            s["cpu_seconds"]+=r.cpu_seconds
+            s["bytes_read"]+=r.bytes_read
+            if r.rows is not None:
+                s["rows"]=(s["rows"] or 0)+r.rows
+            if r.process_peak_rss_mb is not None:
+                s["process_peak_rss_mb"]=max(s["process_peak_rss_mb"] or 0,r.process_peak_rss_mb)
+            s["workers"]=max(s["workers"],r.workers)
+        for s in stages.values():
+            s["worker_utilization"]=s["cpu_seconds"]/(s["wall_seconds"]*s["workers"]) if s["wall_seconds"]>0 else None
+        return dict(stages=list(stages.values()),records=[asdict(r) for r in records])
+
+@contextmanager
+def profile(tracer:Optional[Tracer]=None)->Iterator[Tracer]:
+    """Enables tracing of the pipeline stages for the duration of the with block, in the calling thread only
+
+    Args:
+        tracer (Optional[Tracer], optional): Tracer receiving the measures. Defaults to a new Tracer.
+
+    Yields:
+        Iterator[Tracer]: the active tracer
+    """
+    tracer=tracer if tracer is not None else Tracer()
+    token=_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _tracer.reset(token)
+
+def stage(name:str)->Span:
+    """Context manager measuring a pipeline stage, a shared no-op when tracing is disabled
+
+    Args:
+        name (str): stage name
+
+    Returns:
+        Span: the open stage
+    """
+    tracer=_tracer.get()
+    return tracer.stage(name) if tracer is not None else _NULL_SPAN
+
+def count_bytes(lines:Iterable[bytes])->Iterator[bytes]:
+    """Wraps raw output of git, adding its size to the current stage once consumed. Returns lines untouched when tracing is disabled"""
+    tracer=_tracer.get()
+    if tracer is None:
+        return iter(lines)
+    return _count_bytes(tracer,lines)
+
+def _count_bytes(tracer:Tracer,lines:Iterable[bytes])->Iterator[bytes]:
+    n=0
+    try:
+        for line in lines:
+            n+=len(line)
+            yield line
+    finally:
+        tracer.add_bytes(n)
@@ -0,0 +1,67 @@
+from src.truck_factor_gdeluisi.aio import *
+from src.truck_factor_gdeluisi.aio import _astream_command
+from src.truck_factor_gdeluisi.main import create_contribution_dataframe,compute_truck_factor
+from src.truck_factor_gdeluisi import aio
+from pytest import raises
+from pathlib import Path
+import time
+
+def test_acreate_contribution_dataframe():
+    path=Path.cwd().as_posix()
+    df=asyncio.run(acreate_contribution_dataframe(path))
+    pd.testing.assert_frame_equal(df,create_contribution_dataframe(path))
+    df=asyncio.run(acreate_contribution_dataframe(path,include=["tests/**"]))
+    pd.testing.assert_frame_equal(df,create_contribution_dataframe(path,include=["tests/**"]))
+    window=HistoryWindow(ref="HEAD~1",all_refs=False,max_count=10)
+    pd.testing.assert_frame_equal(asyncio.run(acreate_contribution_dataframe(path,window=window)),create_contribution_dataframe(path,window=window))
+    with raises(ValueError):
+        asyncio.run(acreate_contribution_dataframe(path,window=HistoryWindow(ref="no-such-ref")))
+
+def test_acompute_truck_factor(tmp_path):
+    path=Path.cwd().as_posix()
+    assert asyncio.run(acompute_truck_factor(path,0.3,0.5))==compute_truck_factor(path,0.3,0.5)
+    with raises(ValueError):
+        asyncio.run(acompute_truck_factor(tmp_path.as_posix()))
+    with raises(ValueError):
+        asyncio.run(acompute_truck_factor(path,2))
+
+def test_git_processes_cap(monkeypatch):
+    running=[0,0]
+    create,kill=asyncio.create_subprocess_shell,aio._kill
+    async def counting_create(*args,**kwargs):
+        running[0]+=1
+        running[1]=max(running)
+        return await create(*args,**kwargs)
+    async def counting_kill(proc):
+        # called once git exited, before the slot is released
+        await kill(proc)
+        running[0]-=1
+    monkeypatch.setattr(aio.asyncio,"create_subprocess_shell",counting_create)
+    monkeypatch.setattr(aio,"_kill",counting_kill)
+    async def analyses():
+        context=ExecutionContext(workers=1,max_git_processes=2)
+        return await asyncio.gather(*(acompute_truck_factor(Path.cwd().as_posix(),context=context) for _ in range(6)))
+    results=asyncio.run(analyses())
+    assert len(set(results))==1
+    assert running==[0,2]
+
+def test_cancellation():
+    async def read():
+        async for _ in _astream_command("sleep 5"):
+            pass
+    start=time.perf_counter()
+    with raises(asyncio.TimeoutError):
+        asyncio.run(asyncio.wait_for(read(),0.2))
+    assert time.perf_counter()-start<4
+    with raises(asyncio.TimeoutError):
+        asyncio.run(acompute_truck_factor(Path.cwd().as_posix(),timeout=0.001))
+
+def test_preconditions(tmp_path,monkeypatch):
+    with raises(ValueError):
+        asyncio.run(acreate_contribution_dataframe(tmp_path.as_posix()))
+    with raises(ValueError):
+        asyncio.run(acreate_contribution_dataframe(tmp_path.joinpath("missing").as_posix()))
+    monkeypatch.setattr(aio,"is_git_available",lambda:False)
+    for call in (acreate_contribution_dataframe,acompute_truck_factor):
+        with raises(Exception,match="No git CLI"):
+            asyncio.run(call(Path.cwd().as_posix()))
@@ -0,0 +1,43 @@
+from src.truck_factor_gdeluisi.main import *
+from src.truck_factor_gdeluisi.backends import *
+from tests.utility import init_repo,commit_files,git
+from pytest import fixture,importorskip,mark
+from pathlib import Path
+
+@fixture(scope="module")
+def repo(tmp_path_factory):
+    path=tmp_path_factory.mktemp("backends").joinpath("repo")
+    init_repo(path)
+    commit_files(path,{"src/a/x.py":"1\n2\n3\n4\n","top.py":"q\n","tèst.py":"é\n"},author="Alice",date="2021-01-01T23:30:00+05:00")
+    Path(path).joinpath("blob.bin").write_bytes(b"\x00\x01\x02")
+    commit_files(path,{"src/a/x.py":"1\n2\n3\n4\n5\n"},author="Bob")
+    git(path,"checkout","-q","-b","feature")
+    git(path,"mv","src/a","src/b")
+    commit_files(path,{"src/b/x.py":"1\n2\n3\n4\n5\n6\n"},author="Carol")
+    git(path,"checkout","-q","main")
+    commit_files(path,{"top.py":"q\nr\n"},author="Bob")
+    git(path,"merge","-q","--no-edit","feature")
+    git(path,"branch","-q","side","HEAD~1")
+    return path.as_posix()
+
+def _sorted(df:pd.DataFrame)->pd.DataFrame:
+    return df.sort_values(CONTRIBUTION_COLUMNS).reset_index(drop=True)
+
+@mark.parametrize("path",[Path.cwd().as_posix(),"repo"])
+def test_backends_produce_identical_frames(path,request):
+    importorskip("pygit2")
+    if path=="repo":
+        path=request.getfixturevalue("repo")
+    cli,in_process=CLIBackend(),PyGit2Backend()
+    assert isinstance(in_process,GitBackend)
+    assert cli.get_head_commit(path)==in_process.get_head_commit(path)
+    assert cli.count_commits(path)==in_process.count_commits(path)
+    assert cli.get_tracked_files(path)==in_process.get_tracked_files(path)
+    assert cli.get_renames(path)==in_process.get_renames(path)
+    expected=create_contribution_dataframe(path,only_of_files=False,backend=cli)
+    actual=create_contribution_dataframe(path,only_of_files=False,backend=in_process)
+    pd.testing.assert_frame_equal(_sorted(actual),_sorted(expected))
+
+def test_backend_is_repo(tmp_path):
+    assert not CLIBackend().is_repo(tmp_path.as_posix())
+    assert CLIBackend().is_repo(Path.cwd().as_posix())
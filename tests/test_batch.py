@@ -0,0 +1,54 @@
+from src.truck_factor_gdeluisi.batch import *
+from tests.utility import init_repo,commit_files,git
+from pytest import fixture,importorskip
+import json
+
+@fixture
+def mirrors(tmp_path):
+    root=tmp_path.joinpath("mirrors")
+    root.mkdir()
+    for name,authors in (("one",["Alice"]),("two",["Alice","Bob"])):
+        repo=tmp_path.joinpath(name)
+        init_repo(repo)
+        for i,author in enumerate(authors):
+            commit_files(repo,{f"{author}.py":"a\n"*(i+1)},author=author)
+        git(tmp_path,"clone","-q","--mirror",repo.as_posix(),root.joinpath(f"{name}.git").as_posix())
+    root.joinpath("not_a_repo").mkdir()
+    return root
+
+def test_find_repositories(mirrors):
+    assert [Path(r).name for r in find_repositories(mirrors.as_posix())]==["one.git","two.git"]
+
+def test_compute_truck_factor_batch(mirrors):
+    repos=find_repositories(mirrors.as_posix())+[mirrors.joinpath("not_a_repo").as_posix()]
+    results={Path(r["repo"]).name:r for r in compute_truck_factor_batch(repos,workers=2)}
+    assert set(results)=={"one.git","two.git","not_a_repo"}
+    assert results["one.git"]["truck_factor"]==1 and results["one.git"]["error"] is None
+    assert results["two.git"]["authors"]==["Alice","Bob"][:results["two.git"]["truck_factor"]]
+    assert results["not_a_repo"]["truck_factor"] is None and results["not_a_repo"]["error"]
+
+def test_batch_cli_jsonl(mirrors,tmp_path):
+    out=tmp_path.joinpath("out.jsonl")
+    assert main(["--mirrors",mirrors.as_posix(),"-w","1","-o",out.as_posix()])==0
+    records=[json.loads(l) for l in out.read_text().splitlines()]
+    assert len(records)==2
+    assert all(list(r)==RESULT_FIELDS for r in records)
+
+def test_batch_cli_parquet(mirrors,tmp_path):
+    pq=importorskip("pyarrow.parquet")
+    out=tmp_path.joinpath("out.parquet")
+    assert main([mirrors.joinpath("not_a_repo").as_posix(),"--mirrors",mirrors.as_posix(),"--format","parquet","-o",out.as_posix()])==1
+    table=pq.read_table(out)
+    assert table.num_rows==3
+    assert table.column_names==RESULT_FIELDS
+
+def test_batch_profile(mirrors):
+    records=list(compute_truck_factor_batch(find_repositories(mirrors.as_posix()),workers=1,profile=True))
+    assert all(r["error"] is None and {s["stage"] for s in r["profile"]}>={"read_contributions","compute_DOA"} for r in records)
+
+def test_batch_cli_invalid_workers(mirrors,capsys):
+    from pytest import raises
+    for option in ("--workers","--max-git-processes"):
+        with raises(SystemExit) as e:
+            main(["--mirrors",mirrors.as_posix(),option,"0"])
+        assert e.value.code==2 and "usage:" in capsys.readouterr().err
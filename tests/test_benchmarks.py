@@ -0,0 +1,32 @@
+from benchmarks.synthetic import *
+from benchmarks.run_benchmarks import run_pipeline,main
+from subprocess import check_output
+from pathlib import Path
+import json
+
+def test_generate_repository(tmp_path:Path):
+    shape=SHAPES["tiny"]
+    repo=generate_repository(tmp_path.joinpath("repo").as_posix(),shape)
+    git=lambda *args:check_output(["git","-C",repo,*args],text=True).splitlines()
+    assert len(git("log","--all","--format=%H"))==shape.commits+shape.merges
+    assert len(git("log","--all","--merges","--format=%H"))==shape.merges
+    assert len(set(git("log","--all","--format=%an")))<=shape.authors
+    assert git("log","--all","-M","--diff-filter=R","--name-only","--format=")
+    # same shape, same repository
+    other=generate_repository(tmp_path.joinpath("other").as_posix(),shape)
+    assert git("rev-parse","HEAD")==check_output(["git","-C",other,"rev-parse","HEAD"],text=True).splitlines()
+
+def test_run_pipeline(tmp_path:Path):
+    repo=generate_repository(tmp_path.joinpath("repo").as_posix(),SHAPES["tiny"])
+    stages=run_pipeline(repo)
+    assert [s.stage for s in stages]==["iter_log_blocks","get_tracked_files","parse_blocks_columnar","columns_to_dataframe",
+                                       "create_contribution_dataframe","compute_DOA","compute_truck_factor_from_contributions"]
+    assert all(s.wall_seconds>=0 and s.rows>0 for s in stages)
+
+def test_benchmark_cli(tmp_path:Path,capsys):
+    results=tmp_path.joinpath("results.json")
+    assert main(["--shape","tiny","--commits","20","-o",results.as_posix()])==0
+    report=json.loads(results.read_text())
+    assert report["shape"]["commits"]==20 and len(report["stages"])==7
+    assert main(["--shape","tiny","--commits","20","--compare",results.as_posix()])==0
+    assert "wall x" in capsys.readouterr().out
@@ -0,0 +1,83 @@
+from src.truck_factor_gdeluisi.main import *
+from src.truck_factor_gdeluisi.cache import *
+from tests.utility import init_repo,commit_files,git
+from pytest import fixture,importorskip,raises
+import pandas as pd
+from pathlib import Path
+
+# cache entries are Feather files
+importorskip("pyarrow")
+
+@fixture
+def repo(tmp_path):
+    path=tmp_path.joinpath("repo")
+    init_repo(path)
+    commit_files(path,{"a.py":"a\nb\n","b.py":"c\n"},author="Alice")
+    commit_files(path,{"a.py":"a\nb\nc\n"},author="Bob")
+    return path.as_posix()
+
+def _sorted(df:pd.DataFrame)->pd.DataFrame:
+    return df.sort_values(CONTRIBUTION_COLUMNS).reset_index(drop=True)
+
+def test_cache_incremental_update(repo,tmp_path):
+    cache_dir=tmp_path.joinpath("cache").as_posix()
+    df,_=update_contribution_cache(repo,cache_dir)
+    assert len(df)==3
+    commit_files(repo,{"b.py":"c\nd\n"},author="Carol")
+    git(repo,"mv","a.py","c.py")
+    git(repo,"commit","-q","-m","rename")
+    df,renames=update_contribution_cache(repo,cache_dir)
+    assert renames=={"a.py":"c.py"}
+    expected=create_contribution_dataframe(repo,only_of_files=False)
+    cached=create_contribution_dataframe(repo,only_of_files=False,cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(_sorted(cached),_sorted(expected))
+
+def test_cache_invalidated_on_rewrite(repo,tmp_path):
+    cache_dir=tmp_path.joinpath("cache").as_posix()
+    update_contribution_cache(repo,cache_dir)
+    git(repo,"reset","-q","--hard","HEAD~1")
+    commit_files(repo,{"b.py":"x\n"},author="Dave")
+    df,_=update_contribution_cache(repo,cache_dir)
+    assert set(df["author"])=={"Alice","Dave"}
+    clear_contribution_cache(repo,cache_dir)
+    df,_=update_contribution_cache(repo,cache_dir)
+    assert set(df["author"])=={"Alice","Dave"}
+
+def test_cache_reads_only_new_commits(repo,tmp_path,monkeypatch):
+    import src.truck_factor_gdeluisi.cache as cache_module
+    cache_dir=tmp_path.joinpath("cache").as_posix()
+    update_contribution_cache(repo,cache_dir)
+    old_tips=get_ref_tips(repo)
+    commit_files(repo,{"b.py":"c\nd\n"},author="Carol")
+    calls=[]
+    read_history=cache_module._read_history
+    def spy(repo,tips,exclude=None):
+        calls.append(exclude)
+        return read_history(repo,tips,exclude)
+    monkeypatch.setattr(cache_module,"_read_history",spy)
+    df,_=update_contribution_cache(repo,cache_dir)
+    assert calls==[old_tips]
+    assert len(df)==4
+
+def test_default_cache_dir(monkeypatch,tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME",tmp_path.as_posix())
+    assert default_cache_dir()==tmp_path.joinpath("truck_factor_gdeluisi").as_posix()
+    monkeypatch.setenv("XDG_CACHE_HOME","relative")
+    assert default_cache_dir()==Path.home().joinpath(".cache","truck_factor_gdeluisi").as_posix()
+
+def test_cache_dir_is_private(repo,tmp_path):
+    import os
+    import pickle
+    cache_dir=tmp_path.joinpath("cache")
+    df,_=update_contribution_cache(repo,cache_dir.as_posix())
+    entries=list(cache_dir.iterdir())
+    assert len(entries)==1 and (cache_dir.stat().st_mode&0o777,entries[0].stat().st_mode&0o777)==(0o700,0o700)
+    # a pickle planted in the entry is never loaded
+    entries[0].joinpath("contributions.pkl").write_bytes(pickle.dumps(pd.DataFrame()))
+    cached,_=update_contribution_cache(repo,cache_dir.as_posix())
+    pd.testing.assert_frame_equal(cached,df)
+    shared=tmp_path.joinpath("shared")
+    shared.mkdir()
+    os.chmod(shared,0o777)
+    with raises(ValueError):
+        update_contribution_cache(repo,shared.as_posix())
@@ -0,0 +1,52 @@
+from src.truck_factor_gdeluisi.cli import *
+from pathlib import Path
+import subprocess
+import json
+import sys
+
+# startup budget of the command line tool, the import of pandas alone takes longer
+IMPORT_BUDGET_SECONDS=0.25
+
+def test_cli_does_not_import_pandas():
+    script="import sys,time;start=time.perf_counter();import truck_factor_gdeluisi.cli;print(time.perf_counter()-start);print('pandas' in sys.modules)"
+    out=subprocess.check_output([sys.executable,"-c",script],cwd=Path.cwd().joinpath("src")).decode().split()
+    assert out[1]=="False"
+    assert float(out[0])<IMPORT_BUDGET_SECONDS
+
+def test_cli_json(capsys):
+    assert main([Path.cwd().as_posix(),"--json"])==0
+    record=json.loads(capsys.readouterr().out)
+    assert record["truck_factor"]==len(record["authors"])>0
+    assert record["n_files"]>0 and record["seconds"]>0
+
+def test_cli_plain(capsys):
+    assert main([Path.cwd().as_posix(),"--authorship-threshold","0.5"])==0
+    assert int(capsys.readouterr().out)>0
+
+def test_cli_by_directory(capsys):
+    assert main([Path.cwd().as_posix(),"--by-directory","1","--json"])==0
+    directories={d["directory"]:d for d in json.loads(capsys.readouterr().out)["directories"]}
+    assert {".","src","tests"}<=set(directories)
+    assert main([Path.cwd().as_posix(),"--by-directory","-1"])==1
+
+def test_cli_errors(capsys,tmp_path):
+    assert main([tmp_path.as_posix()])==1
+    assert "not a git directory" in capsys.readouterr().err
+    assert main([Path.cwd().as_posix(),"--orphan-files-threshold","2"])==1
+
+def test_cli_module():
+    out=subprocess.check_output([sys.executable,"-m","truck_factor_gdeluisi","--workers","1","--profile",Path.cwd().as_posix()],cwd=Path.cwd().joinpath("src"),stderr=subprocess.PIPE)
+    assert int(out)>0
+
+def test_cli_history_window(capsys):
+    assert main([Path.cwd().as_posix(),"--json","--single-ref","--since","2000-01-01","--max-count","5"])==0
+    assert json.loads(capsys.readouterr().out)["truck_factor"]>0
+    assert main([Path.cwd().as_posix(),"--ref","no-such-ref"])==1
+    assert "no-such-ref" in capsys.readouterr().err
+
+def test_cli_invalid_workers(capsys):
+    from pytest import raises
+    for workers in ("0","-1","two"):
+        with raises(SystemExit) as e:
+            main([Path.cwd().as_posix(),"--workers",workers])
+        assert e.value.code==2 and "usage:" in capsys.readouterr().err
@@ -0,0 +1,82 @@
+from src.truck_factor_gdeluisi.execution import *
+from src.truck_factor_gdeluisi.execution import _cgroup_cpu_quota
+from src.truck_factor_gdeluisi.helper import parse_blocks_columnar,iter_log_blocks,is_dir_a_repo
+from src.truck_factor_gdeluisi.main import create_contribution_dataframe
+from tests.utility import init_repo,commit_files
+from pytest import mark,raises
+from pathlib import Path
+import pickle
+import subprocess
+import sys
+import os
+
+@mark.parametrize("files,expected",[
+    ({"cpu.max":"150000 100000\n"},1.5),
+    ({"cpu.max":"max 100000\n"},None),
+    ({"cpu/cpu.cfs_quota_us":"200000\n","cpu/cpu.cfs_period_us":"100000\n"},2),
+    ({"cpu,cpuacct/cpu.cfs_quota_us":"-1\n","cpu,cpuacct/cpu.cfs_period_us":"100000\n"},None),
+    ({},None),
+])
+def test_cgroup_cpu_quota(tmp_path:Path,files,expected):
+    for name,content in files.items():
+        tmp_path.joinpath(name).parent.mkdir(parents=True,exist_ok=True)
+        tmp_path.joinpath(name).write_text(content)
+    assert _cgroup_cpu_quota(tmp_path.as_posix())==expected
+
+def test_available_cpus(tmp_path:Path):
+    tmp_path.joinpath("cpu.max").write_text("50000 100000\n")
+    assert available_cpus(tmp_path.as_posix())==1
+    assert available_cpus(tmp_path.joinpath("missing").as_posix())>=1
+
+def test_execution_context():
+    with raises(ValueError):
+        ExecutionContext(mode="fiber")
+    with raises(ValueError):
+        ExecutionContext(workers=0)
+    context=ExecutionContext(workers=3,max_git_processes=2)
+    single=context.single_worker()
+    assert single.workers==1 and single._git_slots is context._git_slots
+    restored=pickle.loads(pickle.dumps(context))
+    assert restored==context and restored._git_slots is not context._git_slots
+    with context.git_slot(),context.git_slot():
+        # both slots are taken
+        assert not context._git_slots.acquire(blocking=False)
+
+def test_use_context():
+    context=ExecutionContext(workers=1)
+    with use_context(context):
+        assert current_context() is context
+        with use_context(None):
+            assert current_context() is context
+    assert current_context() is not context
+
+def test_thread_mode_parsing():
+    path=Path.cwd().as_posix()
+    sequential=parse_blocks_columnar(iter_log_blocks(path),workers=1)
+    with use_context(ExecutionContext(workers=2,mode="thread")):
+        threaded=parse_blocks_columnar(iter_log_blocks(path),chunk_size=64)
+    assert len(threaded)==len(sequential) and threaded.renames==sequential.renames
+
+def test_single_git_process(tmp_path:Path):
+    init_repo(tmp_path)
+    commit_files(tmp_path,{"a.py":"a\n"},author="Alice")
+    # the tracked files are listed by another thread while the log is read, one slot must not deadlock
+    df=create_contribution_dataframe(tmp_path.as_posix(),context=ExecutionContext(workers=1,max_git_processes=1))
+    assert df["fname"].tolist()==["a.py"]
+
+def test_is_dir_a_repo(tmp_path:Path):
+    assert not is_dir_a_repo(tmp_path.as_posix())
+    init_repo(tmp_path)
+    commit_files(tmp_path,{"a.py":"a\n"},author="Alice")
+    assert is_dir_a_repo(tmp_path.as_posix())
+
+def test_parsing_in_process_by_default(tmp_path:Path):
+    assert ExecutionContext(workers=4).parse_workers==1
+    assert ExecutionContext(workers=4,parallel_parsing=True).parse_workers==4
+    # no __main__ guard: spawned workers would fail to bootstrap
+    script=tmp_path.joinpath("script.py")
+    script.write_text("from src.truck_factor_gdeluisi.helper import *\n"
+                      f"columns=parse_blocks_columnar(iter_log_blocks({Path.cwd().as_posix()!r}),chunk_size=64)\n"
+                      "print(len(columns))\n")
+    output=subprocess.check_output([sys.executable,script.as_posix()],cwd=Path.cwd(),env={**os.environ,"PYTHONPATH":Path.cwd().as_posix()},text=True)
+    assert int(output)>0
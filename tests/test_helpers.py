@@ -1,5 +1,5 @@
 from src.truck_factor_gdeluisi.helper import *
-from pytest import mark,raises
+from pytest import mark,raises,fixture
 from pathlib import Path
 import pandas as pd
 from logging import getLogger
@@ -132,4 +132,140 @@ def test_parse_logs(path,expected):
     else:
         with raises(Exception):
             parse_logs(write_logs(Path.cwd().as_posix(),commit))
-            
\ No newline at end of file
+            
+@mark.parametrize("path,expected",git_repos)
+def test_iter_log_blocks(path,expected):
+    if expected:
+        blocks=list(iter_log_blocks(path))
+        assert len(blocks)==count_commits(path)
+        for block in blocks:
+            assert "|" in block.split("\n",1)[0]
+    else:
+        with raises(Exception):
+            list(iter_log_blocks(path))
+
+@mark.parametrize("path,expected",git_repos)
+def test_stream_contributions(path,expected):
+    if expected:
+        streamed=[c for contributions in stream_contributions(path) for c in contributions]
+        assert streamed==parse_logs(write_logs(path))
+    else:
+        with raises(Exception):
+            list(stream_contributions(path))
+
+@mark.parametrize("workers,chunk_size",[(1,PARSE_CHUNK_SIZE),(2,64)])
+def test_parse_logs_columnar(workers,chunk_size):
+    logs=write_logs(Path.cwd().as_posix())
+    columns=parse_logs_columnar(logs,workers,chunk_size)
+    authors={v:k for k,v in columns.authors.items()}
+    files={v:k for k,v in columns.files.items()}
+    rows=[(authors[a],files[f],i,d) for a,f,i,d in zip(columns.author,columns.fname,columns.inserted,columns.deleted)]
+    expected=[(c["author"],c["fname"],c["inserted"],c["deleted"]) for c in parse_logs(logs)]
+    assert sorted(rows)==sorted(expected)
+
+def test_parse_blocks_columnar_parallel():
+    path=Path.cwd().as_posix()
+    sequential=parse_blocks_columnar(iter_log_blocks(path),workers=1)
+    parallel=parse_blocks_columnar(iter_log_blocks(path),workers=2,chunk_size=64)
+    assert len(parallel)==len(sequential)
+    assert parallel.files.keys()==sequential.files.keys()
+
+def test_greedy_truck_factor():
+    authorship=[("a.py","Alice"),("b.py","Alice"),("c.py","Alice"),("c.py","Bob"),("d.py","Bob"),("e.py","Carol")]
+    result=greedy_truck_factor(authorship,0.5)
+    assert result.truck_factor==2
+    assert result.removed_authors==["Alice","Bob"]
+    assert result.orphaned_files==[["a.py","b.py"],["c.py","d.py"]]
+    assert result.n_files==5
+    assert greedy_truck_factor([],0.5).truck_factor==0
+
+@mark.parametrize("fname,expected",[
+    ("a.py",None),
+    ("a.py => b.py",("a.py","b.py")),
+    ("src/{a => b}/x.py",("src/a/x.py","src/b/x.py")),
+    ("src/{ => b}/x.py",("src/x.py","src/b/x.py")),
+    ("{a => }/x.py",("a/x.py","x.py")),
+    ("src/{x.py => y.py}",("src/x.py","src/y.py")),
+])
+def test_parse_rename(fname,expected):
+    assert parse_rename(fname)==expected
+
+def test_contribution_aggregator():
+    aggregator=ContributionAggregator()
+    aggregator.append_block("Bob|2021-01-02\n4\t1\tsrc/{a => b}/x.py\n2\t0\tREADME")
+    aggregator.append_block("Alice|2021-01-01\n10\t0\tsrc/a/x.py\n3\t3\tdead.py")
+    aggregator.append_block("Bob|2021-01-01\n0\t0\tsrc/a/x.py")
+    # one accumulator per (path, author), dates are not kept
+    assert len(aggregator)==5
+    assert aggregator.per_file(["src/b/x.py","README"])=={"src/b/x.py":{"Alice":(10,0),"Bob":(4,1)}}
+    assert aggregator.per_file(["src/b/x.py","README"],only_of_files=False)["README"]=={"Bob":(2,0)}
+
+def test_build_pathspecs():
+    assert build_pathspecs()==[]
+    assert build_pathspecs(["src/**"],["**/test_*.py"],{".md",".json"})==[":(glob)src/**",":(glob,exclude)**/test_*.py",":(glob,exclude)**/*.json",":(glob,exclude)**/*.md"]
+    assert non_source_extensions(["a.py","b.md","c/d.json","Makefile"])=={".md",".json"}
+
+def test_select_files():
+    path=Path.cwd().as_posix()
+    tracked=get_tracked_files(path)
+    files,pathspecs=select_files(path,include=["src/**"],exclude=["**/__init__.py"])
+    assert files=={f for f in tracked if f.startswith("src/") and not f.endswith("__init__.py")}
+    assert ":(glob,exclude)**/*.json" in pathspecs
+    blocks=list(iter_log_blocks(path,pathspecs=pathspecs))
+    names={line.split("\t")[2] for block in blocks for line in block.split("\n")[1:]}
+    assert names and all(name.endswith(".py") and not name.endswith("__init__.py") for name in names)
+    assert get_tracked_files(path,pathspecs=[":(glob)no/such/dir/**"])==set()
+    from src.truck_factor_gdeluisi.helper import _programming_language_extensions
+    resolve_programming_languages([".py"])
+    # ext.json is read once
+    assert resolve_programming_languages([".py",".md"])=={".py"} and _programming_language_extensions.cache_info().misses==1
+
+@fixture
+def branched_repo(tmp_path):
+    from tests.utility import init_repo,commit_files,git
+    init_repo(tmp_path)
+    commit_files(tmp_path,{"a.py":"a\n"},author="Alice",date="2020-01-01T10:00:00")
+    commit_files(tmp_path,{"b.py":"b\n"},author="Bob",date="2021-01-01T10:00:00")
+    git(tmp_path,"checkout","-q","-b","side","HEAD~1")
+    commit_files(tmp_path,{"c.py":"c\n"},author="Carol",date="2021-06-01T10:00:00")
+    git(tmp_path,"checkout","-q","main")
+    commit_files(tmp_path,{"a.py":"a\nb\n"},author="Alice",date="2022-01-01T10:00:00")
+    return tmp_path.as_posix()
+
+def test_history_window(branched_repo):
+    def authors(window):
+        return [block.split("|")[0] for block in iter_log_blocks(branched_repo,window=window)]
+    assert count_commits(branched_repo)==len(authors(None))==4
+    windows=[(HistoryWindow(all_refs=False),["Alice","Bob","Alice"]),(HistoryWindow(since="2020-06-01"),["Alice","Carol","Bob"]),
+             (HistoryWindow(until="2021-03-01"),["Bob","Alice"]),(HistoryWindow(all_refs=False,max_count=2),["Alice","Bob"])]
+    for window,expected in windows:
+        assert authors(window)==expected and count_commits(branched_repo,window=window)==len(expected)
+    assert count_commits(branched_repo,"side",window=HistoryWindow(all_refs=False))==2
+    # revisions read from standard input honour the window as well
+    assert count_commits(branched_repo,exclude=["side"],window=HistoryWindow(all_refs=False))==2
+    assert count_commits(branched_repo,revisions=["main","side"],window=HistoryWindow(since="2021-03-01"))==2
+    check_window(branched_repo,HistoryWindow(ref="side"))
+    with raises(ValueError):
+        check_window(branched_repo,HistoryWindow(ref="missing"))
+    with raises(ValueError):
+        HistoryWindow(max_count=-1)
+
+def test_repo_session(branched_repo,tmp_path_factory,monkeypatch):
+    import pickle
+    from src.truck_factor_gdeluisi import helper
+    with RepoSession(branched_repo) as session:
+        assert is_dir_a_repo(session) and Path(session).as_posix()==str(session)==branched_repo
+        assert get_head_commit(session)==get_head_commit(branched_repo)
+        assert resolve_commit(session,"side~1")==resolve_commit(branched_repo,"side~1") and resolve_commit(session,"missing") is None
+        assert get_tracked_files(session)==get_tracked_files(branched_repo)=={"a.py","b.py"}
+        assert count_commits(session)==count_commits(branched_repo) and get_ref_tips(session)==get_ref_tips(branched_repo)
+        get_tracked_files(session).clear()
+        # later lookups are served by the session without running git
+        monkeypatch.setattr(helper,"_check_output",None)
+        assert get_tracked_files(session)=={"a.py","b.py"} and count_commits(session)==4
+        assert len(list(iter_log_blocks(session)))==4
+        assert pickle.loads(pickle.dumps(session)).path==session.path
+    with RepoSession(tmp_path_factory.mktemp("empty").as_posix()) as session:
+        assert not is_dir_a_repo(session)
+        with raises(subprocess.CalledProcessError):
+            get_head_commit(session)
@@ -0,0 +1,46 @@
+from src.truck_factor_gdeluisi.risk import *
+from src.truck_factor_gdeluisi.main import create_contribution_dataframe,compute_DOA
+from pathlib import Path
+from pytest import fixture,raises
+import json
+
+@fixture
+def index():
+    return BusRiskIndex.from_pairs([("a.py","Alice"),("a.py","Bob"),("src/b.py","Bob"),("src/c.py","Carol"),("src/c.py","Alice"),("src/d/e.py","Alice")])
+
+def test_queries(index):
+    assert index.files_of("Alice")==["a.py","src/c.py","src/d/e.py"] and index.files_of("Nobody")==[]
+    assert index.orphaned_files(["Alice"])==["src/d/e.py"]
+    assert index.orphaned_files(["Alice","Bob"])==["a.py","src/b.py","src/d/e.py"]
+    assert index.orphaned_files(["Alice","Bob","Carol","Nobody"])==index.files
+    assert index.orphaned_files([])==[]
+    assert index.key_authors("src/b.py")==["Bob"]
+    assert index.key_authors("src")==["Alice","Bob","Carol"] and index.key_authors("src/d/")==["Alice"]
+    assert index.key_authors(".")==index.authors and index.key_authors("missing")==[]
+
+def test_save_load(index,tmp_path):
+    path=tmp_path.joinpath("index.json")
+    index.save(path)
+    loaded=BusRiskIndex.load(path)
+    assert (loaded.files,loaded.authors,loaded.author_files)==(index.files,index.authors,index.author_files)
+    assert loaded.orphaned_files(["Alice","Bob"])==index.orphaned_files(["Alice","Bob"])
+    content=json.loads(path.read_text())
+    path.write_text(json.dumps(dict(content,version=0)))
+    with raises(ValueError):
+        BusRiskIndex.load(path)
+
+def test_from_doa():
+    doa=compute_DOA(create_contribution_dataframe(Path.cwd().as_posix()))
+    index=BusRiskIndex.from_doa(doa,0.7)
+    major=doa.loc[doa["DOA"]>=0.7]
+    for author in index.authors:
+        assert index.files_of(author)==sorted(major.loc[major["author"]==author,"fname"].astype(str))
+    counts=major.groupby("fname",observed=True)["author"].nunique()
+    for author in index.authors:
+        # a single departure orphans the files it is the only major author of
+        sole=major.loc[major["fname"].isin(counts[counts==1].index)&(major["author"]==author),"fname"].astype(str)
+        assert index.orphaned_files([author])==sorted(sole)
+    doa_dict={}
+    for row in doa.itertuples():
+        doa_dict.setdefault(str(row.fname),{})[str(row.author)]=row.DOA
+    assert BusRiskIndex.from_doa(doa_dict,0.7).author_files==index.author_files
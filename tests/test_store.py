@@ -0,0 +1,46 @@
+from src.truck_factor_gdeluisi.store import *
+from src.truck_factor_gdeluisi.main import create_contribution_dataframe,compute_DOA,compute_truck_factor_from_contributions
+from pathlib import Path
+from pytest import fixture,importorskip,raises
+import pandas as pd
+
+@fixture(scope="module")
+def contributions():
+    importorskip("pyarrow")
+    return create_contribution_dataframe(Path.cwd().as_posix())
+
+def test_contributions_round_trip(contributions,tmp_path):
+    path=tmp_path.joinpath("contributions.feather")
+    save_contributions(contributions,path)
+    for memory_map in (True,False):
+        pd.testing.assert_frame_equal(load_contributions(path,memory_map),contributions)
+
+def test_doa_round_trip(contributions,tmp_path):
+    import pyarrow.feather as feather
+    doa=compute_DOA(contributions)
+    path=tmp_path.joinpath("doa.feather")
+    save_doa(doa,path)
+    loaded=load_doa(path)
+    pd.testing.assert_frame_equal(loaded,doa)
+    assert compute_truck_factor_from_contributions(loaded)==compute_truck_factor_from_contributions(doa)
+    # author and file names are stored once
+    schema=feather.read_table(path).schema
+    assert all(str(schema.field(c).type).startswith("dictionary") for c in ("fname","author"))
+
+def test_stale_tables(contributions,tmp_path):
+    import pyarrow.feather as feather
+    path=tmp_path.joinpath("contributions.feather")
+    save_contributions(contributions,path)
+    with raises(StaleTableError):
+        load_doa(path)
+    table=feather.read_table(path)
+    table=table.replace_schema_metadata({**table.schema.metadata,b"truck_factor_gdeluisi":b'{"version":0,"kind":"contributions"}'})
+    feather.write_feather(table,path)
+    with raises(StaleTableError):
+        load_contributions(path)
+    # files written by other tools carry no metadata
+    feather.write_feather(contributions,path)
+    with raises(StaleTableError):
+        load_contributions(path)
+    with raises(ValueError):
+        save_doa(contributions,path)
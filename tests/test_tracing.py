@@ -0,0 +1,53 @@
+from src.truck_factor_gdeluisi.tracing import *
+from src.truck_factor_gdeluisi import tracing
+from src.truck_factor_gdeluisi.main import compute_truck_factor
+from tests.utility import init_repo,commit_files
+
+def test_stage_disabled():
+    assert tracing._tracer.get() is None
+    with stage("noop") as span:
+        span.rows=10
+    assert span.rows is None
+
+def test_profile_nested_stages():
+    events=[]
+    with profile(Tracer(callback=events.append)) as tracer:
+        with stage("outer") as outer:
+            with stage("inner") as inner:
+                tracer.add_bytes(7)
+                inner.rows=3
+            with stage("inner"):
+                pass
+            outer.rows=1
+    assert tracing._tracer.get() is None
+    assert [e.name for e in events]==["inner","inner","outer"]
+    report=tracer.report()
+    assert [s["stage"] for s in report["stages"]]==["outer","inner"]
+    inner=report["stages"][1]
+    assert inner["calls"]==2 and inner["rows"]==3 and inner["bytes_read"]==7
+
+def test_compute_truck_factor_tracer(tmp_path):
+    init_repo(tmp_path)
+    commit_files(tmp_path,{"a.py":"a\n"*10,"b.py":"b\n"},author="Alice")
+    commit_files(tmp_path,{"b.py":"b\n"*10},author="Bob")
+    tracer=Tracer()
+    assert compute_truck_factor(tmp_path.as_posix(),tracer=tracer)>=1
+    stages={s["stage"]:s for s in tracer.report()["stages"]}
+    assert {"read_contributions","parse_logs","to_dataframe","compute_DOA","truck_factor"}<=set(stages)
+    assert stages["parse_logs"]["bytes_read"]>0
+    assert stages["parse_logs"]["rows"]==3
+
+def test_concurrent_tracers():
+    from concurrent.futures import ThreadPoolExecutor
+    from threading import Barrier
+    barrier=Barrier(2)
+    def run(name):
+        with profile() as tracer:
+            barrier.wait()
+            with stage(name):
+                barrier.wait()
+        return tracer
+    with ThreadPoolExecutor(2) as executor:
+        first,second=executor.map(run,["first","second"])
+    assert [r.name for r in first.records]==["first"]
+    assert [r.name for r in second.records]==["second"]
@@ -1,6 +1,6 @@
 from src.truck_factor_gdeluisi.helper import *
 from src.truck_factor_gdeluisi.main import *
-from pytest import mark,raises
+from pytest import mark,raises,fixture
 from pathlib import Path
 import pandas as pd
 import subprocess
@@ -31,4 +31,281 @@ def test_compute_tf(path,expected):
         print(tf)
     else:
         with raises(Exception):
-            compute_truck_factor(path)
\ No newline at end of file
+            compute_truck_factor(path)
+def test_columns_to_dataframe():
+    columns=parse_blocks_columnar(iter_log_blocks(Path.cwd().as_posix()),workers=1)
+    df=columns_to_dataframe(columns)
+    assert list(df.columns)==CONTRIBUTION_COLUMNS
+    assert isinstance(df["author"].dtype,pd.CategoricalDtype) and isinstance(df["fname"].dtype,pd.CategoricalDtype)
+    assert df["inserted"].dtype==np.int32 and df["deleted"].dtype==np.int32
+    assert (df["tot_contributions"]==df["inserted"]+df["deleted"]).all()
+    assert columns_to_dataframe(ContributionColumns()).empty
+
+def _reference_compute_DOA_row(row:pd.Series):
+    from math import log1p
+    DL=row["tot_contributions"]
+    FA=1 if row["author"] == row["author_FA"] else 0
+    AC=row["tot_contributions_TOT"] - DL
+    return 3.293 + 1.098 *  FA + 0.164* DL - 0.321 *  log1p(AC)
+
+def _reference_compute_DOA(contributions:pd.DataFrame)->pd.DataFrame:
+    # row by row implementation compute_DOA must stay identical to
+    df=contributions.sort_values("date")
+    df=df.groupby(["fname","author","date"],observed=True).sum().reset_index(drop=False)
+    df=df.loc[df["tot_contributions"]!=0]
+    df["DOA"]=0
+    per_author_df=df.groupby(["fname","author"],observed=True).sum(True).reset_index(drop=False)
+    per_file_df=per_author_df.groupby(["fname"],observed=True).sum(True)
+    first_authors=df.groupby("fname",observed=True).first()
+    per_author_df_tmp=per_author_df.set_index("fname").join(first_authors,rsuffix="_FA",on="fname")
+    per_author_df_tmp=per_author_df_tmp.join(per_file_df,rsuffix="_TOT",on="fname").reset_index(inplace=False)
+    per_author_df["DOA"]=per_author_df_tmp.apply(_reference_compute_DOA_row,axis=1)
+    per_author_df["DOA"]=per_author_df.groupby("fname",as_index=False,observed=True)["DOA"].transform(lambda x: x/x.max())
+    return per_author_df
+
+@fixture(scope="module")
+def multi_author_repo(tmp_path_factory):
+    import random
+    from tests.utility import init_repo,commit_files
+    rng=random.Random(42)
+    path=tmp_path_factory.mktemp("multi").joinpath("repo")
+    init_repo(path)
+    authors=["Alice","Bob","Carol","Dave","Eve"]
+    files=[f"pkg{i%3}/m{i}.py" for i in range(15)]+["README.md"]
+    state={}
+    for c in range(60):
+        author=rng.choice(authors)
+        changes={}
+        for f in rng.sample(files,rng.randint(1,3)):
+            lines=[l for l in state.get(f,[]) if rng.random()>0.2]+[f"{author}{rng.random()}" for _ in range(rng.randint(0,12))]
+            state[f]=lines
+            changes[f]="\n".join(lines)+"\n"
+        commit_files(path,changes,author=author,date=f"2020-{1+c//6:02d}-{1+c%6:02d}T10:00:00")
+    return path.as_posix()
+
+def test_compute_DOA_matches_reference(multi_author_repo):
+    df=create_contribution_dataframe(multi_author_repo)
+    assert df["author"].nunique()>1
+    expected=_reference_compute_DOA(df)
+    pd.testing.assert_frame_equal(compute_DOA(df),expected,check_exact=True)
+
+def _reference_truck_factor(df:pd.DataFrame,orphan_files_threashold:float,authorship_threshold:float)->int:
+    df=df.loc[df["DOA"]>=authorship_threshold]
+    quorum=df["fname"].nunique()*orphan_files_threashold
+    counts=df.groupby("author",observed=True)["fname"].count().reset_index()
+    counts=counts.sort_values(["fname","author"],ascending=[False,True])
+    tf=0
+    for author in counts["author"]:
+        df=df.loc[df["author"]!=author]
+        tf+=1
+        if df["fname"].nunique()<=quorum:
+            break
+    return tf
+
+@mark.parametrize("orphan_files_threashold",[0.2,0.5,0.8,1])
+@mark.parametrize("authorship_threshold",[0.3,0.7,1])
+def test_truck_factor_matches_reference(multi_author_repo,orphan_files_threashold,authorship_threshold):
+    doa=compute_DOA(create_contribution_dataframe(multi_author_repo))
+    result=compute_truck_factor_details(doa,orphan_files_threashold,authorship_threshold)
+    assert result.truck_factor==_reference_truck_factor(doa,orphan_files_threashold,authorship_threshold)
+    assert result.truck_factor==len(result.removed_authors)==len(result.orphaned_files)
+    assert result.n_files==doa.loc[doa["DOA"]>=authorship_threshold,"fname"].nunique()
+
+@mark.parametrize("repo",["multi","cwd"])
+@mark.parametrize("orphan_files_threashold,authorship_threshold",[(0.5,0.7),(0.2,0.3),(1,1)])
+def test_core_matches_dataframes(multi_author_repo,repo,orphan_files_threashold,authorship_threshold):
+    from src.truck_factor_gdeluisi.core import compute_truck_factor_result
+    path=multi_author_repo if repo=="multi" else Path.cwd().as_posix()
+    expected=compute_truck_factor_details(compute_DOA(create_contribution_dataframe(path)),orphan_files_threashold,authorship_threshold)
+    assert compute_truck_factor_result(path,orphan_files_threashold,authorship_threshold)==expected
+
+@mark.parametrize("repo",["multi","cwd"])
+def test_streaming_aggregation_matches_dataframes(multi_author_repo,repo):
+    path=multi_author_repo if repo=="multi" else Path.cwd().as_posix()
+    expected=aggregate_contributions(create_contribution_dataframe(path))
+    streamed=aggregate_contributions_streaming(path)
+    for df in (expected,streamed):
+        df[["fname","author"]]=df[["fname","author"]].astype(str)
+    pd.testing.assert_frame_equal(streamed,expected,check_dtype=False)
+    assert compute_truck_factor(path,streaming=True)==compute_truck_factor(path)
+
+def test_streaming_aggregation_workers(multi_author_repo):
+    from src.truck_factor_gdeluisi.execution import ExecutionContext,use_context
+    expected=aggregate_blocks(iter_log_blocks(multi_author_repo),workers=1)
+    with use_context(ExecutionContext(workers=3,mode="thread")):
+        aggregator=aggregate_blocks(iter_log_blocks(multi_author_repo),workers=3,chunk_size=256)
+    live=get_tracked_files(multi_author_repo)
+    assert aggregator.per_file(live)==expected.per_file(live)
+    with raises(ValueError):
+        compute_truck_factor(multi_author_repo,cache_dir="cache",streaming=True)
+
+def test_truck_factor_by_directory(multi_author_repo):
+    from src.truck_factor_gdeluisi.core import compute_truck_factor_by_directory_result,directory_prefixes
+    assert directory_prefixes("a/b/c/x.py",2)==[".","a","a/b"] and directory_prefixes("x.py",3)==["."]
+    doa=compute_DOA(create_contribution_dataframe(multi_author_repo))
+    by_directory=compute_truck_factor_by_directory(doa,depth=1,authorship_threshold=0.5)
+    assert by_directory["directory"].tolist()==[".","pkg0","pkg1","pkg2"]
+    for row in by_directory.itertuples():
+        # the same as filtering the DOA table to the directory
+        files=doa["fname"].astype(str)
+        expected=compute_truck_factor_details(doa if row.directory=="." else doa.loc[files.str.startswith(row.directory+"/")],authorship_threshold=0.5)
+        assert (row.truck_factor,row.authors,row.n_files)==(expected.truck_factor,expected.removed_authors,expected.n_files)
+    results=compute_truck_factor_by_directory_result(multi_author_repo,1,authorship_threshold=0.5)
+    assert [(d,r.truck_factor,r.removed_authors,r.n_files) for d,r in results.items()]==list(by_directory.itertuples(index=False,name=None))
+    assert compute_truck_factor_by_directory(doa,depth=0).shape==(1,4)
+
+def test_path_globs(multi_author_repo):
+    from src.truck_factor_gdeluisi.core import compute_truck_factor_result
+    df=create_contribution_dataframe(multi_author_repo)
+    selected=create_contribution_dataframe(multi_author_repo,include=["pkg*/**"],exclude=["pkg1/**"])
+    expected=df.loc[~df["fname"].astype(str).str.startswith("pkg1/")].reset_index(drop=True)
+    pd.testing.assert_frame_equal(selected.astype({"fname":str,"author":str}),expected.astype({"fname":str,"author":str}))
+    details=compute_truck_factor_details(compute_DOA(selected))
+    assert compute_truck_factor_result(multi_author_repo,include=["pkg*/**"],exclude=["pkg1/**"])==details
+    assert compute_truck_factor(multi_author_repo,exclude=["pkg1/**"],streaming=True)==compute_truck_factor(multi_author_repo,exclude=["pkg1/**"])
+    with raises(ValueError):
+        create_contribution_dataframe(multi_author_repo,include=["pkg0/**"],backend=object())
+
+def test_filter_files_of_interest():
+    df=pd.DataFrame({"fname":["a.py","README.md","b/c.py","Makefile","a.py"],"tot_contributions":[1,2,3,4,5]})
+    filtered=filter_files_of_interest(df)
+    assert filtered["fname"].tolist()==["a.py","b/c.py","a.py"] and filtered["ext"].tolist()==[".py"]*3
+    filtered=filter_files_of_interest(df.astype({"fname":"category"}))
+    assert filtered["fname"].astype(str).tolist()==["a.py","b/c.py","a.py"]
+
+def test_truck_factor_sweep(multi_author_repo):
+    doa=compute_DOA(create_contribution_dataframe(multi_author_repo))
+    orphans=[0.1,0.2,0.5,0.8,1]
+    authorships=[0.3,0.5,0.7,0.9,1]
+    sweep=compute_truck_factor_sweep(doa,orphans,authorships)
+    assert sweep.shape==(5,5)
+    for authorship in authorships:
+        for orphan in orphans:
+            assert sweep.loc[authorship,orphan]==compute_truck_factor_from_contributions(doa,orphan,authorship)
+    with raises(ValueError):
+        compute_truck_factor_sweep(doa,[0],[0.5])
+
+def test_compute_truck_factor_thresholds(multi_author_repo):
+    doa=compute_DOA(create_contribution_dataframe(multi_author_repo))
+    for streaming in (False,True):
+        assert compute_truck_factor(multi_author_repo,0.1,0.3,streaming=streaming)==compute_truck_factor_from_contributions(doa,0.1,0.3)
+        assert compute_truck_factor(multi_author_repo,1,1,streaming=streaming)==compute_truck_factor_from_contributions(doa,1,1)
+
+def test_truck_factor_history(multi_author_repo):
+    checkpoints=["HEAD~40","2020-05-03",pd.Timestamp("2020-08-01"),"HEAD"]
+    history=compute_truck_factor_history(multi_author_repo,checkpoints)
+    assert len(history)==len(checkpoints)
+    assert history["date"].is_monotonic_increasing
+    df=compute_DOA(create_contribution_dataframe(multi_author_repo))
+    head=history.loc[history["checkpoint"]=="HEAD"].iloc[0]
+    assert head["truck_factor"]==compute_truck_factor_from_contributions(df)
+    for row in history.itertuples():
+        assert (row.truck_factor,row.authors,row.n_files)==_history_at(multi_author_repo,row.commit)
+
+def _history_at(repo,commit):
+    """Truck factor of the history as read at commit"""
+    contributions=filter_files_of_interest(columns_to_dataframe(parse_blocks_columnar(iter_log_blocks(repo,revisions=[commit]))))
+    live=get_tracked_files(repo,commit)
+    expected=compute_truck_factor_details(compute_DOA(contributions.loc[contributions["fname"].isin(live)]))
+    return expected.truck_factor,expected.removed_authors,expected.n_files
+
+def test_truck_factor_history_branches(tmp_path):
+    from tests.utility import init_repo,commit_files,git
+    init_repo(tmp_path)
+    commit_files(tmp_path,{"a.py":"a\n"*10,"old.py":"o\n"},author="Alice",date="2021-01-01T09:00:00")
+    git(tmp_path,"rm","-q","old.py")
+    commit_files(tmp_path,{"b.py":"b\n"*30},author="Bob",date="2021-02-01T09:00:00")
+    git(tmp_path,"checkout","-q","-b","side","HEAD~1")
+    commit_files(tmp_path,{"a.py":"c\n"*50},author="Carol",date="2021-03-01T09:00:00")
+    git(tmp_path,"checkout","-q","main")
+    commit_files(tmp_path,{"a.py":"d\n"*5},author="Dave",date="2021-04-01T09:00:00")
+    # main, then a side branch commit which does not contain it, then main again
+    checkpoints=["HEAD~2","HEAD~1","side","HEAD"]
+    history=compute_truck_factor_history(tmp_path.as_posix(),checkpoints)
+    assert list(history["checkpoint"])==checkpoints
+    for row in history.itertuples():
+        assert (row.truck_factor,row.authors,row.n_files)==_history_at(tmp_path.as_posix(),row.commit)
+
+def test_truck_factor_history_same_day_commits(tmp_path):
+    from tests.utility import init_repo,commit_files,git
+    init_repo(tmp_path)
+    commit_files(tmp_path,{"a.py":"a\n"*10},author="Alice",date="2021-03-01T09:00:00")
+    commit_files(tmp_path,{"a.py":"b\n"*30,"b.py":"b\n"*30},author="Bob",date="2021-03-01T18:00:00")
+    git(tmp_path,"checkout","-q","-b","side","HEAD~1")
+    commit_files(tmp_path,{"a.py":"c\n"*50},author="Carol",date="2021-03-01T12:00:00")
+    git(tmp_path,"checkout","-q","main")
+    history=compute_truck_factor_history(tmp_path.as_posix(),["HEAD~1","HEAD"])
+    first,last=history.itertuples()
+    # neither Bob's later commit of the same day nor Carol's branch are part of HEAD~1
+    assert (first.truck_factor,first.authors,first.n_files)==(1,["Alice"],1)
+    assert "Carol" not in last.authors
+
+def test_renames_tracked_in_log_stream(tmp_path):
+    from tests.utility import init_repo,commit_files,git
+    repo=tmp_path.joinpath("repo")
+    init_repo(repo)
+    commit_files(repo,{"src/a/x.py":"1\n2\n3\n","top.py":"q\n"},author="Alice")
+    git(repo,"mv","src/a","src/b")
+    git(repo,"commit","-q","-m","move dir")
+    git(repo,"mv","top.py","src/top2.py")
+    commit_files(repo,{"src/top2.py":"q\nr\n"},author="Bob")
+    git(repo,"mv","src/b/x.py","y.py")
+    git(repo,"commit","-q","-m","move file")
+    columns=parse_blocks_columnar(iter_log_blocks(repo.as_posix()),workers=1)
+    assert columns.renames=={"src/a/x.py":"src/b/x.py","src/b/x.py":"y.py","top.py":"src/top2.py"}
+    df=create_contribution_dataframe(repo.as_posix())
+    assert set(df["fname"])=={"y.py","src/top2.py"}
+    per_file=df.groupby("fname",observed=True)["tot_contributions"].sum()
+    assert per_file["y.py"]==3 and per_file["src/top2.py"]==2
+
+def test_history_window(tmp_path):
+    from tests.utility import init_repo,commit_files,git
+    from src.truck_factor_gdeluisi.core import read_doa
+    repo=tmp_path.joinpath("repo")
+    init_repo(repo)
+    commit_files(repo,{"a.py":"a\n"*10},author="Alice",date="2020-01-01T10:00:00")
+    git(repo,"checkout","-q","-b","side")
+    commit_files(repo,{"a.py":"b\n"*10,"c.py":"c\n"},author="Carol",date="2021-06-01T10:00:00")
+    git(repo,"checkout","-q","main")
+    commit_files(repo,{"b.py":"b\n"*5},author="Bob",date="2022-01-01T10:00:00")
+    path=repo.as_posix()
+    assert set(create_contribution_dataframe(path)["author"])=={"Alice","Bob","Carol"}
+    window=HistoryWindow(all_refs=False)
+    df=create_contribution_dataframe(path,window=window)
+    assert set(df["author"])=={"Alice","Bob"}
+    df=create_contribution_dataframe(path,window=HistoryWindow(since="2021-01-01"))
+    assert set(df["author"])=={"Carol","Bob"} and set(df["fname"])=={"a.py","b.py"}
+    # the files tracked at the window's ref are analyzed
+    df=create_contribution_dataframe(path,window=HistoryWindow(ref="side",all_refs=False,max_count=1))
+    assert set(df["author"])=={"Carol"} and set(df["fname"])=={"a.py","c.py"}
+    expected=aggregate_contributions(create_contribution_dataframe(path,window=window))
+    streamed=aggregate_contributions_streaming(path,window=window)
+    for df in (expected,streamed):
+        df[["fname","author"]]=df[["fname","author"]].astype(str)
+    pd.testing.assert_frame_equal(streamed,expected,check_dtype=False)
+    assert set(read_doa(path,window=window)["a.py"])=={"Alice"}
+    assert compute_truck_factor(path,window=window)==compute_truck_factor(path,window=window,streaming=True)
+    with raises(ValueError):
+        create_contribution_dataframe(path,window=HistoryWindow(ref="missing"))
+    with raises(ValueError):
+        create_contribution_dataframe(path,cache_dir=tmp_path.joinpath("cache").as_posix(),window=window)
+    with raises(ValueError):
+        create_contribution_dataframe(path,backend=object(),window=window)
+
+def test_repo_session_processes(multi_author_repo,monkeypatch):
+    from src.truck_factor_gdeluisi.core import compute_truck_factor_result
+    expected=compute_truck_factor(multi_author_repo)
+    commands=[]
+    class CountingPopen(subprocess.Popen):
+        def __init__(self,args,*a,**kw):
+            commands.append(args)
+            super().__init__(args,*a,**kw)
+    monkeypatch.setattr(subprocess,"Popen",CountingPopen)
+    # HEAD is resolved once by the session, then the tracked files are listed and the log is read
+    assert compute_truck_factor(multi_author_repo)==expected and len(commands)==3
+    commands.clear()
+    assert compute_truck_factor_result(multi_author_repo).truck_factor==expected and len(commands)==3
+    with RepoSession(multi_author_repo) as session:
+        commands.clear()
+        assert compute_truck_factor(session)==expected
+        assert compute_truck_factor(session,streaming=True)==expected and len(commands)==4
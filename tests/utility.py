@@ -8,4 +8,25 @@ def timer(func):
         print(f"{func} execution time: {duration}")
         return result
 
-    return wrapper
\ No newline at end of file
+    return wrapper
+def git(repo,*args,author="Alice",date=None)->str:
+    import subprocess
+    import os
+    env=dict(os.environ,GIT_AUTHOR_NAME=author,GIT_AUTHOR_EMAIL=f"{author.lower()}@example.com",GIT_COMMITTER_NAME=author,GIT_COMMITTER_EMAIL=f"{author.lower()}@example.com")
+    if date:
+        env["GIT_AUTHOR_DATE"]=env["GIT_COMMITTER_DATE"]=date
+    return subprocess.check_output(["git","-C",str(repo),*args],env=env).decode()
+
+def commit_files(repo,files:dict,author="Alice",date=None,message="update"):
+    from pathlib import Path
+    for name,content in files.items():
+        f=Path(repo).joinpath(name)
+        f.parent.mkdir(parents=True,exist_ok=True)
+        f.write_text(content)
+    git(repo,"add","-A")
+    git(repo,"commit","-q","-m",message,author=author,date=date)
+
+def init_repo(repo):
+    from pathlib import Path
+    Path(repo).mkdir(parents=True,exist_ok=True)
+    git(repo,"init","-q","-b","main")